@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# SPDX-License-Identifier: MIT-0
+
+DOCUMENTATION = r"""
+name: task_timing
+type: aggregate
+short_description: Write per-host, per-task wall time as JSON lines
+description:
+  - Records how long every task took on every host (fact gathering, role tasks, includes
+    and handlers included) and writes one compact JSON object per result to a file,
+    plus one record per play and one for the whole run.
+  - Records have the same fields as the ones C(scripts/ansible_timing.py) builds from
+    AWX job events, so local runs and AWX jobs can be compared with each other.
+  - One file per run, named after the playbook and the start time (and the AWX job ID
+    when C(JOB_ID) is set).
+author:
+  - Dan Iverson (@daniverson)
+version_added: 1.1.0
+requirements:
+  - Enabled in configuration, for example with
+    C(ANSIBLE_CALLBACKS_ENABLED=dji_ansible.dji_administration.task_timing)
+options:
+  output_dir:
+    description: Directory the JSON lines files are written to.
+    type: path
+    default: ~/.ansible/timing
+    env:
+      - name: ANSIBLE_TASK_TIMING_DIR
+    ini:
+      - section: callback_task_timing
+        key: output_dir
+"""
+
+EXAMPLES = r"""
+# Enable the callback in ansible.cfg:
+#   [defaults]
+#   callbacks_enabled = dji_ansible.dji_administration.task_timing
+#
+# or for one local run:
+#   ANSIBLE_CALLBACKS_ENABLED=dji_ansible.dji_administration.task_timing \
+#     ansible-playbook -i inventory/wsl_instances.yml playbooks/service_management.yml
+#
+# Slowest tasks and hosts of that run, then a comparison with an earlier one:
+#   python3 scripts/ansible_timing.py ~/.ansible/timing/service_management-20261017T101500.jsonl
+#   python3 scripts/ansible_timing.py before.jsonl after.jsonl --threshold 0.2
+"""
+
+import json
+import os
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    """Per-host task timing written as JSON lines"""
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'dji_ansible.dji_administration.task_timing'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super().__init__()
+        self._file = None
+        self._path = None
+        self._playbook = None
+        self._run_start = None
+        self._play = None
+        self._play_start = None
+        self._task_starts = {}
+        self._host_starts = {}
+        self._handlers = set()
+        self._hosts = set()
+
+    def _write(self, record):
+        if self._file:
+            record = {key: value for key, value in record.items() if value is not None}
+            self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def v2_playbook_on_start(self, playbook):
+        self._playbook = os.path.basename(playbook._file_name)
+        self._run_start = time.time()
+        job = os.environ.get('JOB_ID')
+        name = os.path.splitext(self._playbook)[0] + time.strftime(
+            '-%Y%m%dT%H%M%S', time.localtime(self._run_start)) + (f'-job{job}' if job else '')
+        directory = self.get_option('output_dir')
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self._path = os.path.join(directory, name + '.jsonl')
+            self._file = open(self._path, 'w', encoding='utf-8')  # pylint: disable=R1732
+        except OSError as error:
+            self._display.warning(f"task_timing: cannot write to {directory}: {error}")
+
+    def _end_play(self):
+        if self._play is not None:
+            self._write({'type': 'play', 'play': self._play, 'start': round(self._play_start, 3),
+                         'seconds': round(time.time() - self._play_start, 3)})
+            self._play = None
+
+    def v2_playbook_on_play_start(self, play):
+        self._end_play()
+        self._play = play.get_name().strip()
+        self._play_start = time.time()
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._task_starts[task._uuid] = time.time()
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._task_starts[task._uuid] = time.time()
+        self._handlers.add(task._uuid)
+
+    def v2_runner_on_start(self, host, task):
+        self._host_starts[(host.get_name(), task._uuid)] = time.time()
+
+    def _record(self, result, status):
+        now = time.time()
+        task = result._task
+        host = result._host.get_name()
+        start = self._host_starts.pop((host, task._uuid), None) or self._task_starts.get(
+            task._uuid, now)
+        if status == 'ok' and result._result.get('changed'):
+            status = 'changed'
+        self._hosts.add(host)
+        self._write({
+            'type': 'task',
+            'play': self._play,
+            'role': task._role.get_name(include_role_fqcn=False) if task._role else None,
+            'task': (task.name or task.action).strip(),
+            'action': task.action,
+            'host': host,
+            'status': status,
+            'handler': True if task._uuid in self._handlers else None,
+            'start': round(start, 3),
+            'seconds': round(now - start, 3),
+        })
+
+    def v2_runner_on_ok(self, result):
+        self._record(result, 'ok')
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record(result, 'failed')
+
+    def v2_runner_on_skipped(self, result):
+        self._record(result, 'skipped')
+
+    def v2_runner_on_unreachable(self, result):
+        self._record(result, 'unreachable')
+
+    def v2_playbook_on_stats(self, stats):
+        self._end_play()
+        self._write({'type': 'run', 'playbook': self._playbook, 'job': os.environ.get('JOB_ID'),
+                     'start': round(self._run_start, 3),
+                     'seconds': round(time.time() - self._run_start, 3),
+                     'hosts': len(self._hosts)})
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._display.display(f"Task timing written to {self._path}")
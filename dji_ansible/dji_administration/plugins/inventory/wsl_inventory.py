@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# SPDX-License-Identifier: MIT-0
+
+DOCUMENTATION = r"""
+name: wsl_inventory
+short_description: WSL hosts, groups and vars from the inventory file or from AWX
+description:
+  - Builds hosts, groups and variables from one source of truth, either the
+    Ansible YAML inventory file (C(inventory/wsl_instances.yml)) or an AWX
+    inventory read over the AWX v2 API.
+  - The AWX source looks the inventory up by name with a server-side filter and
+    then reads every group, host and variable with a single C(script/) request.
+  - Results go through Ansible's inventory cache. With a persistent cache plugin
+    (for example C(ansible.builtin.jsonfile)) warm runs skip the file or API
+    entirely until C(cache_timeout) expires. A file source is also re-read as
+    soon as the file changes.
+  - Config files must end in C(wsl_inventory.yml) or C(wsl_inventory.yaml).
+author:
+  - Dan Iverson (@daniverson)
+extends_documentation_fragment:
+  - ansible.builtin.constructed
+  - ansible.builtin.inventory_cache
+options:
+  plugin:
+    description: Marks the file as a config for this plugin.
+    required: true
+    choices: ['dji_ansible.dji_administration.wsl_inventory']
+  source:
+    description: Where hosts, groups and variables come from.
+    type: str
+    default: file
+    choices: ['file', 'awx']
+  inventory_file:
+    description:
+      - Ansible YAML inventory read when O(source=file).
+      - Relative paths are resolved from the directory of the config file.
+    type: str
+    default: ../inventory/wsl_instances.yml
+  awx_host:
+    description: AWX base URL, used when O(source=awx).
+    type: str
+    default: https://localhost
+    env:
+      - name: AWX_HOST
+  awx_token:
+    description: AWX bearer token, used when O(source=awx).
+    type: str
+    env:
+      - name: AWX_TOKEN
+  awx_inventory:
+    description: Name of the AWX inventory to read.
+    type: str
+    default: WSL Lab
+  validate_certs:
+    description: Verify the AWX TLS certificate (the local AWX uses a self-signed one).
+    type: bool
+    default: false
+  timeout:
+    description: Seconds to wait for each AWX API response.
+    type: int
+    default: 30
+"""
+
+EXAMPLES = r"""
+# inventory/local.wsl_inventory.yml - hosts from the inventory file, cached for an hour
+plugin: dji_ansible.dji_administration.wsl_inventory
+source: file
+inventory_file: wsl_instances.yml
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.cache/ansible/inventory
+cache_timeout: 3600
+
+# awx.wsl_inventory.yml - the AWX inventory "WSL Lab" (AWX_HOST and AWX_TOKEN from the environment)
+# plugin: dji_ansible.dji_administration.wsl_inventory
+# source: awx
+# awx_inventory: WSL Lab
+# cache: true
+# cache_plugin: ansible.builtin.jsonfile
+# cache_connection: ~/.cache/ansible/inventory
+# cache_timeout: 600
+# keyed_groups:
+#   - key: ansible_port | string
+#     prefix: port
+"""
+
+import json
+import os
+from urllib.parse import urlencode
+
+from ansible.errors import AnsibleParserError
+from ansible.module_utils.common.text.converters import to_native
+from ansible.module_utils.urls import open_url
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+    """Host, group and variable source for the WSL lab"""
+
+    NAME = 'dji_ansible.dji_administration.wsl_inventory'
+
+    def verify_file(self, path):
+        """Accept only config files named *wsl_inventory.yml/.yaml"""
+        return super().verify_file(path) and path.endswith(
+            ('wsl_inventory.yml', 'wsl_inventory.yaml'))
+
+    def parse(self, inventory, loader, path, cache=True):
+        super().parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        use_cache = self.get_option('cache') and cache
+        update_cache = self.get_option('cache') and not cache
+
+        stamp = self._source_stamp(path)
+        data = None
+        if use_cache:
+            try:
+                cached = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+            else:
+                if cached.get('stamp') == stamp:
+                    data = cached['data']
+                else:
+                    update_cache = True
+
+        if data is None:
+            data = self._load_awx() if self.get_option('source') == 'awx' else self._load_file(
+                path)
+        if update_cache:
+            self._cache[cache_key] = {'stamp': stamp, 'data': data}
+
+        self._populate(data)
+
+    def _inventory_file(self, config_path):
+        inventory_file = os.path.expanduser(self.get_option('inventory_file'))
+        return os.path.join(os.path.dirname(os.path.abspath(config_path)), inventory_file)
+
+    def _source_stamp(self, config_path):
+        """Changes whenever a file source is edited; None for AWX (the timeout decides)"""
+        if self.get_option('source') != 'file':
+            return None
+        try:
+            return os.stat(self._inventory_file(config_path)).st_mtime
+        except OSError:
+            return None
+
+    def _load_file(self, config_path):
+        """Read the YAML inventory file into script-style inventory data"""
+        inventory_file = self._inventory_file(config_path)
+        try:
+            raw = self.loader.load_from_file(inventory_file, cache='none') or {}
+        except Exception as error:
+            raise AnsibleParserError(
+                f"Unable to read {inventory_file}: {to_native(error)}") from error
+
+        data = {'_meta': {'hostvars': {}}}
+
+        def walk(name, group):
+            group = group or {}
+            entry = data.setdefault(name, {'hosts': [], 'vars': {}, 'children': []})
+            for host_name, host_vars in (group.get('hosts') or {}).items():
+                if host_name not in entry['hosts']:
+                    entry['hosts'].append(host_name)
+                data['_meta']['hostvars'].setdefault(host_name, {}).update(host_vars or {})
+            entry['vars'].update(group.get('vars') or {})
+            for child_name, child in (group.get('children') or {}).items():
+                if child_name not in entry['children']:
+                    entry['children'].append(child_name)
+                walk(child_name, child)
+
+        for name, group in raw.items():
+            walk(name, group)
+        return data
+
+    def _get(self, path, **params):
+        """GET an AWX v2 API path and return the decoded JSON"""
+        token = self.get_option('awx_token')
+        if not token:
+            raise AnsibleParserError("awx_token (or AWX_TOKEN) is required for source: awx")
+        url = f"{self.get_option('awx_host').rstrip('/')}/api/v2/{path}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        try:
+            response = open_url(url, headers={'Authorization': f'Bearer {token}'},
+                                validate_certs=self.get_option('validate_certs'),
+                                timeout=self.get_option('timeout'))
+            return json.loads(response.read())
+        except Exception as error:
+            raise AnsibleParserError(f"AWX request {url} failed: {to_native(error)}") from error
+
+    def _load_awx(self):
+        """Read an AWX inventory (groups, hosts, vars) in two requests"""
+        name = self.get_option('awx_inventory')
+        found = self._get('inventories/', name=name, page_size=1)['results']
+        if not found:
+            raise AnsibleParserError(f"AWX inventory '{name}' not found")
+        data = self._get(f"inventories/{found[0]['id']}/script/", hostvars=1)
+        data.setdefault('_meta', {}).setdefault('hostvars', {})
+        return data
+
+    def _populate(self, data):
+        """Add groups, hosts and variables, then apply the constructed options"""
+        hostvars = data.get('_meta', {}).get('hostvars', {})
+        for name, entry in data.items():
+            if name == '_meta':
+                continue
+            # AWX's script output may list an ungrouped group as a plain host list
+            if isinstance(entry, list):
+                entry = {'hosts': entry}
+            group = 'all' if name == 'all' else self.inventory.add_group(name)
+            for host_name in entry.get('hosts') or []:
+                self.inventory.add_host(host_name, group=group)
+            for child in entry.get('children') or []:
+                self.inventory.add_group(child)
+                self.inventory.add_child(group, child)
+            for key, value in (entry.get('vars') or {}).items():
+                self.inventory.set_variable(group, key, value)
+
+        strict = self.get_option('strict')
+        for host_name, host_vars in hostvars.items():
+            self.inventory.add_host(host_name)
+            for key, value in host_vars.items():
+                self.inventory.set_variable(host_name, key, value)
+            self._set_composite_vars(self.get_option('compose'), host_vars, host_name, strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), host_vars, host_name,
+                                              strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), host_vars,
+                                           host_name, strict)
@@ -0,0 +1,205 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# SPDX-License-Identifier: MIT-0
+
+DOCUMENTATION = r"""
+module: services
+short_description: Manage several systemd services in one module run
+description:
+  - Applies a list of O(services) entries (C(name) and C(state)) on the target host in a single
+    module execution, instead of one M(ansible.builtin.service) task per service.
+  - Unit state is read for all services with one C(systemctl show) call before and one after
+    the changes, and returned per service (C(ActiveState), C(SubState), ...).
+author:
+  - Dan Iverson (@daniverson)
+version_added: 1.1.0
+options:
+  services:
+    description: Services to manage, applied in order.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description: Unit name; C(.service) is implied.
+        type: str
+        required: true
+      state:
+        description:
+          - C(started) and C(stopped) only act when the unit is not already in that state.
+          - C(restarted) and C(reloaded) always act.
+        type: str
+        default: started
+        choices: ['started', 'stopped', 'restarted', 'reloaded']
+      enabled:
+        description: Whether the unit starts on boot; left alone when omitted.
+        type: bool
+  daemon_reload:
+    description: Run C(systemctl daemon-reload) before changing any service.
+    type: bool
+    default: false
+attributes:
+  check_mode:
+    support: full
+requirements:
+  - systemd on the target host
+"""
+
+EXAMPLES = r"""
+- name: Restart the lab services in one module run
+  dji_ansible.dji_administration.services:
+    services:
+      - name: sshd
+        state: restarted
+      - name: cron
+        state: started
+        enabled: true
+  register: services_result
+
+- name: Show each service's state
+  ansible.builtin.debug:
+    msg: "{{ item.name }}: {{ item.status.ActiveState }}/{{ item.status.SubState }}"
+  loop: "{{ services_result.results }}"
+  loop_control:
+    label: "{{ item.name }}"
+"""
+
+RETURN = r"""
+results:
+  description: One entry per requested service, in request order.
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: Service name as requested.
+      type: str
+    state:
+      description: Requested state.
+      type: str
+    changed:
+      description: Whether this service was (or in check mode would be) changed.
+      type: bool
+    failed:
+      description: Whether managing this service failed.
+      type: bool
+    msg:
+      description: Error from systemctl when RV(results[].failed) is true.
+      type: str
+    status:
+      description: Unit properties after the change.
+      type: dict
+      sample:
+        ActiveState: active
+        SubState: running
+        LoadState: loaded
+        UnitFileState: enabled
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Unit properties read before and after the changes
+PROPERTIES = ('Id', 'ActiveState', 'SubState', 'LoadState', 'UnitFileState')
+
+# systemctl verb per requested state
+ACTIONS = {'started': 'start', 'stopped': 'stop', 'restarted': 'restart', 'reloaded': 'reload'}
+
+
+def show_units(module, systemctl, names):
+    """Read PROPERTIES for every unit with one systemctl call; return a list of dicts"""
+    rc, out, err = module.run_command(
+        [systemctl, 'show', '--property=' + ','.join(PROPERTIES), '--'] + list(names))
+    if rc != 0:
+        module.fail_json(msg=f"systemctl show failed: {err.strip() or out.strip()}", rc=rc)
+
+    # One block of Key=Value lines per unit, separated by blank lines, in argument order
+    units = []
+    for block in out.strip().split('\n\n'):
+        unit = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition('=')
+            if sep:
+                unit[key] = value
+        units.append(unit)
+    return units
+
+
+def needs_action(state, unit):
+    """Return True if reaching the requested state means running systemctl"""
+    active = unit.get('ActiveState') in ('active', 'activating', 'reloading')
+    if state == 'started':
+        return not active
+    if state == 'stopped':
+        return active
+    return True
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec={
+            'services': {
+                'type': 'list', 'elements': 'dict', 'required': True,
+                'options': {
+                    'name': {'type': 'str', 'required': True},
+                    'state': {'type': 'str', 'default': 'started', 'choices': list(ACTIONS)},
+                    'enabled': {'type': 'bool'},
+                },
+            },
+            'daemon_reload': {'type': 'bool', 'default': False},
+        },
+        supports_check_mode=True,
+    )
+    services = module.params['services']
+    systemctl = module.get_bin_path('systemctl', required=True)
+
+    if module.params['daemon_reload'] and not module.check_mode:
+        rc, out, err = module.run_command([systemctl, 'daemon-reload'])
+        if rc != 0:
+            module.fail_json(msg=f"systemctl daemon-reload failed: {err.strip() or out.strip()}")
+
+    names = [service['name'] for service in services]
+    before = show_units(module, systemctl, names)
+
+    results = []
+    for service, unit in zip(services, before):
+        result = {'name': service['name'], 'state': service['state'], 'changed': False,
+                  'failed': False}
+        results.append(result)
+        if unit.get('LoadState') == 'not-found':
+            result.update(failed=True, msg=f"Could not find the requested service "
+                                           f"{service['name']}")
+            continue
+
+        commands = []
+        if needs_action(service['state'], unit):
+            commands.append([systemctl, ACTIONS[service['state']], service['name']])
+        if service['enabled'] is not None:
+            enabled = unit.get('UnitFileState') in ('enabled', 'enabled-runtime')
+            if enabled != service['enabled']:
+                verb = 'enable' if service['enabled'] else 'disable'
+                commands.insert(0, [systemctl, verb, service['name']])
+
+        result['changed'] = bool(commands)
+        if module.check_mode:
+            continue
+        for command in commands:
+            rc, out, err = module.run_command(command)
+            if rc != 0:
+                result.update(failed=True, msg=err.strip() or out.strip(), rc=rc)
+                break
+
+    # Report every unit's state after the changes (or the current state in check mode)
+    after = before if module.check_mode else show_units(module, systemctl, names)
+    for result, unit in zip(results, after):
+        result['status'] = {key: unit.get(key) for key in PROPERTIES if key != 'Id'}
+
+    changed = any(result['changed'] for result in results)
+    failed = [result['name'] for result in results if result['failed']]
+    if failed:
+        module.fail_json(msg=f"Failed to manage: {', '.join(failed)}", changed=changed,
+                         results=results)
+    module.exit_json(changed=changed, results=results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Where playbook time goes, and whether it got worse
+
+Reads runs recorded by the dji_administration.task_timing callback (a JSON
+lines file) or an AWX job (job:ID, rebuilt from its job events into the same
+records). With one run it prints the slowest tasks, hosts and roles; with two
+it compares them and exits 1 if anything slowed down by more than the
+threshold.
+
+Every level is reported as the slowest host's total: a task that takes 2 s on
+one host and 0.1 s on the others costs the play 2 s.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from awx_auth import DEFAULT_CACHE_FILE, TokenProvider
+
+# Relative slowdown reported as a regression
+DEFAULT_THRESHOLD = 0.20
+
+# Slowdowns smaller than this many seconds are noise, whatever the ratio
+DEFAULT_MIN_SECONDS = 0.5
+
+# Rows shown per level
+DEFAULT_TOP = 10
+
+LEVELS = ('run', 'play', 'role', 'task', 'host')
+
+# AWX job events that finish a task on one host, and the status they map to
+EVENT_STATUSES = {'runner_on_ok': 'ok', 'runner_on_failed': 'failed',
+                  'runner_on_skipped': 'skipped', 'runner_on_unreachable': 'unreachable'}
+
+
+def load_file(path):
+    """Read a task_timing JSON lines file into a list of records"""
+    with open(path, encoding='utf-8') as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _timestamp(value):
+    """AWX event start/end (ISO 8601) as epoch seconds; None if missing"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def records_from_events(events):
+    """Build task_timing records from AWX job events"""
+    records = []
+    handlers = set()
+    for event in events:
+        data = event.get('event_data') or {}
+        if event.get('event') == 'playbook_on_handler_task_start':
+            handlers.add(data.get('task_uuid'))
+        status = EVENT_STATUSES.get(event.get('event'))
+        if status is None:
+            continue
+        if status == 'ok' and event.get('changed'):
+            status = 'changed'
+        role = event.get('role') or data.get('role') or None
+        task = event.get('task') or data.get('task') or ''
+        # Task names may carry the "role : " prefix; the callback keeps role and name apart
+        if role and task.startswith(f"{role} : "):
+            task = task[len(role) + 3:]
+        start = _timestamp(data.get('start'))
+        seconds = data.get('duration')
+        if seconds is None and start is not None and data.get('end'):
+            seconds = _timestamp(data['end']) - start
+        records.append({
+            'type': 'task',
+            'play': event.get('play') or data.get('play'),
+            'role': role,
+            'task': task,
+            'action': data.get('resolved_action') or data.get('task_action'),
+            'host': event.get('host_name') or data.get('host'),
+            'status': status,
+            'handler': True if data.get('task_uuid') in handlers else None,
+            'start': start,
+            'seconds': seconds or 0.0,
+        })
+    return records
+
+
+def load_job(job_id, url, token_cache):
+    """Read an AWX job's events into task_timing records"""
+    # Imported here so reading local files needs no AWX modules
+    from awx_inventory_manager import AWXInventoryManager  # pylint: disable=C0415
+    from awx_jobs import JobRunner  # pylint: disable=import-outside-toplevel
+
+    try:
+        manager = AWXInventoryManager(base_url=url,
+                                      token_provider=TokenProvider(cache_file=token_cache))
+    except LookupError as error:
+        sys.exit(str(error))
+    return records_from_events(JobRunner(manager).events(job_id))
+
+
+def load_run(source, url=None, token_cache=None):
+    """Records for a file path or job:ID"""
+    if source.startswith('job:'):
+        return load_job(int(source[len('job:'):]), url, token_cache)
+    return load_file(source)
+
+
+def totals(records):
+    """Return {level: {key: slowest host's seconds}} for one run"""
+    per_host = {level: {} for level in LEVELS}
+    tasks = [record for record in records if record.get('type') == 'task']
+    for record in tasks:
+        host, seconds = record['host'], record['seconds']
+        keys = {
+            'play': record.get('play') or '-',
+            'role': record.get('role'),
+            'task': ' : '.join(part for part in (record.get('role'), record['task']) if part)
+            + (' (handler)' if record.get('handler') else ''),
+            'host': host,
+        }
+        for level, key in keys.items():
+            if key is not None:
+                bucket = per_host[level].setdefault(key, {})
+                bucket[host] = bucket.get(host, 0.0) + seconds
+
+    result = {level: {key: max(hosts.values()) for key, hosts in entries.items()}
+              for level, entries in per_host.items()}
+
+    # Wall time: the callback's run record, or the span of an AWX job's task events
+    run = [record for record in records if record.get('type') == 'run']
+    if run:
+        result['run']['total'] = run[-1]['seconds']
+    elif tasks:
+        starts = [record['start'] for record in tasks if record.get('start') is not None]
+        if starts:
+            result['run']['total'] = max(record['start'] + record['seconds'] for record in tasks
+                                         if record.get('start') is not None) - min(starts)
+    return result
+
+
+def report(records, top=DEFAULT_TOP):
+    """Print the slowest entries of every level for one run"""
+    run_totals = totals(records)
+    for level in LEVELS:
+        entries = sorted(run_totals[level].items(), key=lambda item: item[1], reverse=True)
+        if not entries:
+            continue
+        print(f"\n=== {level} ===")
+        for key, seconds in entries[:top]:
+            print(f"  {seconds:>9.2f}s  {key}")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_seconds=DEFAULT_MIN_SECONDS,
+            top=DEFAULT_TOP):
+    """Print changes per level between two runs; return the regressions"""
+    before, after = totals(baseline), totals(current)
+    regressions = []
+    print(f"Regression threshold {threshold:.0%} and at least {min_seconds}s")
+    for level in LEVELS:
+        rows = []
+        for key in set(before[level]) | set(after[level]):
+            old, new = before[level].get(key), after[level].get(key)
+            if old is None or new is None:
+                rows.append((0.0, key, old, new, ' NEW' if old is None else ' GONE'))
+                continue
+            delta = (new - old) / old if old else 0.0
+            flag = ''
+            if delta > threshold and new - old >= min_seconds:
+                flag = ' REGRESSION'
+                regressions.append((level, key, old, new))
+            rows.append((new - old, key, old, new, flag))
+        if not rows:
+            continue
+
+        print(f"\n=== {level} ===")
+        print(f"  {'before':>9} {'after':>9} {'change':>8}  name")
+        rows.sort(key=lambda row: (row[4] != ' REGRESSION', -row[0]))
+        for shown, (_, key, old, new, flag) in enumerate(rows):
+            if shown >= top and flag != ' REGRESSION':
+                break
+            old_text = '-' if old is None else f"{old:.2f}s"
+            new_text = '-' if new is None else f"{new:.2f}s"
+            change = f"{(new - old) / old:+.0%}" if old and new is not None else ''
+            print(f"  {old_text:>9} {new_text:>9} {change:>8}  {key}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report or compare playbook timing (task_timing JSON lines or job:ID)")
+    parser.add_argument('runs', nargs='+', metavar='RUN',
+                        help="a task_timing .jsonl file or job:ID; two runs are compared "
+                             "(baseline first)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown reported as a regression (default: 0.20)")
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help="ignore slowdowns smaller than this (default: 0.5)")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP,
+                        help="rows shown per level (regressions are always shown)")
+    parser.add_argument('--url', default=os.environ.get('AWX_HOST', 'https://localhost'),
+                        help="AWX base URL for job:ID runs (default: $AWX_HOST)")
+    parser.add_argument('--token-cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='FILE',
+                        default=os.environ.get('AWX_TOKEN_CACHE'),
+                        help="cache the AWX token for job:ID runs")
+    args = parser.parse_args(argv)
+    if len(args.runs) > 2:
+        parser.error("give one run to report or two to compare")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    runs = [load_run(source, args.url, args.token_cache) for source in args.runs]
+    if len(runs) == 1:
+        report(runs[0], args.top)
+    else:
+        found = compare(runs[0], runs[1], args.threshold, args.min_seconds, args.top)
+        print(f"\n{len(found)} regression(s)")
+        sys.exit(1 if found else 0)
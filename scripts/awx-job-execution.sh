@@ -15,8 +15,11 @@
 # Activate AWX virtual environment
 source ~/awx-venv/bin/activate
 
-# Extract stored OAuth2 token
-export AWX_TOKEN=$(kubectl get secret awx-admin-password -n awx -o jsonpath='{.data.password}' | base64 -d)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
+# Extract stored OAuth2 token once (kept in ~/.cache/awx/token.json, mode 0600, for an hour);
+# an AWX_TOKEN already set in the environment is used as is
+export AWX_TOKEN="${AWX_TOKEN:-$(python3 "$SCRIPT_DIR/awx_auth.py" --cache)}"
 
 # AWX Configuration Parameters
 export JOB_TEMPLATE_NAME="WSL Service Management"
@@ -31,6 +34,9 @@ export DEBUG_EXTRA=false
 # Extra Variables JSON
 export EXTRA_VARS="{\"service_name\": \"$SERVICE_NAME\", \"service_state\": \"$SERVICE_STATE\", \"debug_extra\": $DEBUG_EXTRA}"
 
+# Launch, monitor and output go through the Python manager (one pooled session per call)
+AWX_MANAGER=(python3 "$SCRIPT_DIR/awx_setup.py")
+
 echo "=== AWX Job Execution Script ==="
 echo "Configuration:"
 echo "  Job Template: $JOB_TEMPLATE_NAME"
@@ -50,10 +56,10 @@ launch_job() {
     echo "=== Launching Job ==="
     echo "Launching job with extra variables: $EXTRA_VARS"
     
-    JOB_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job_templates launch \
-      --job_template "$JOB_TEMPLATE_NAME" \
-      --credentials 9 \
-      --extra_vars "$EXTRA_VARS" | jq -r .id)
+    JOB_ID=$("${AWX_MANAGER[@]}" --launch \
+      --template "$JOB_TEMPLATE_NAME" \
+      --credential 9 \
+      --extra-vars "$EXTRA_VARS") || return 1
     
     echo "Job ID: $JOB_ID"
     export JOB_ID
@@ -65,11 +71,11 @@ launch_job_with_limit() {
     echo "=== Launching Job with Host Limit ==="
     echo "Launching job with limit: $HOST_GROUP"
     
-    JOB_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job_templates launch \
-      --job_template "$JOB_TEMPLATE_NAME" \
-      --credentials 9 \
+    JOB_ID=$("${AWX_MANAGER[@]}" --launch \
+      --template "$JOB_TEMPLATE_NAME" \
+      --credential 9 \
       --limit "$HOST_GROUP" \
-      --extra_vars "$EXTRA_VARS" | jq -r .id)
+      --extra-vars "$EXTRA_VARS") || return 1
     
     echo "Job ID: $JOB_ID"
     export JOB_ID
@@ -79,15 +85,14 @@ launch_job_with_limit() {
 # Function to launch job with explicit inventory
 launch_job_with_inventory() {
     echo "=== Launching Job with Explicit Inventory ==="
-    INVENTORY_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" inventory list --name "WSL Lab" --format json | jq -r '.results[0].id')
-    echo "Using Inventory ID: $INVENTORY_ID"
+    echo "Using Inventory: WSL Lab"
     
-    JOB_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job_templates launch \
-      --job_template "$JOB_TEMPLATE_NAME" \
-      --credentials 9 \
-      --inventory "$INVENTORY_ID" \
+    JOB_ID=$("${AWX_MANAGER[@]}" --launch \
+      --template "$JOB_TEMPLATE_NAME" \
+      --credential 9 \
+      --inventory "WSL Lab" \
       --limit "$HOST_GROUP" \
-      --extra_vars "$EXTRA_VARS" | jq -r .id)
+      --extra-vars "$EXTRA_VARS") || return 1
     
     echo "Job ID: $JOB_ID"
     export JOB_ID
@@ -100,9 +105,9 @@ launch_job_defaults() {
     echo "Using playbook defaults (no extra variables passed)"
     echo "This will use: service_name=sshd, service_state=started, debug_extra=false"
     
-    JOB_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job_templates launch \
-      --job_template "$JOB_TEMPLATE_NAME" \
-      --credentials 9 | jq -r .id)
+    JOB_ID=$("${AWX_MANAGER[@]}" --launch \
+      --template "$JOB_TEMPLATE_NAME" \
+      --credential 9) || return 1
     
     echo "Job ID: $JOB_ID"
     export JOB_ID
@@ -138,10 +143,10 @@ launch_job_interactive() {
     echo "  Debug: $INTERACTIVE_DEBUG_EXTRA"
     echo
     
-    JOB_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job_templates launch \
-      --job_template "$JOB_TEMPLATE_NAME" \
-      --credentials 9 \
-      --extra_vars "$INTERACTIVE_EXTRA_VARS" | jq -r .id)
+    JOB_ID=$("${AWX_MANAGER[@]}" --launch \
+      --template "$JOB_TEMPLATE_NAME" \
+      --credential 9 \
+      --extra-vars "$INTERACTIVE_EXTRA_VARS") || return 1
     
     echo "Job ID: $JOB_ID"
     export JOB_ID
@@ -157,12 +162,8 @@ monitor_job() {
     
     echo "=== Monitoring Job $JOB_ID ==="
     
-    # Check job status
-    awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job get "$JOB_ID" | jq '{id, status, started, finished}'
-    
-    echo
-    echo "=== Job Output ==="
-    awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job stdout "$JOB_ID"
+    # Status, then output streamed incrementally until the job finishes
+    "${AWX_MANAGER[@]}" --monitor "$JOB_ID"
 }
 
 # Function to get job output only
@@ -176,16 +177,16 @@ get_job_output() {
     fi
     
     echo "=== Job Output for Job $job_id ==="
-    awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" job stdout "$job_id"
+    "${AWX_MANAGER[@]}" --output "$job_id"
 }
 
 # Function to update project
+# Syncs $PROJECT_NAME only when the branch head differs from the last synced revision (sync
+# policy "revision"); pass --force-sync to sync anyway or --sync-policy cache|always to change
+# policy
 update_project() {
     echo "=== Updating Project ==="
-    PROJECT_ID=$(awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" projects list --name "$PROJECT_NAME" --format json | jq -r '.results[0].id')
-    echo "Updating project ID: $PROJECT_ID"
-    
-    awx --conf.host https://localhost -k --conf.token "$AWX_TOKEN" projects update "$PROJECT_ID" --scm_update_revision
+    "${AWX_MANAGER[@]}" --sync-project "$PROJECT_NAME" "$@"
 }
 
 # Function to show usage
@@ -197,7 +198,7 @@ show_usage() {
     echo "  launch_job_interactive       - Launch job with interactive prompts for service name/state"
     echo "  launch_job_with_limit        - Launch job with host group limit"
     echo "  launch_job_with_inventory    - Launch job with explicit inventory"
-    echo "  monitor_job                  - Monitor the last launched job (status + output)"
+    echo "  monitor_job                  - Monitor the last launched job (status + live output)"
     echo "  get_job_output [JOB_ID]      - Get output only for a specific job"
     echo "  update_project               - Update the project repository"
     echo
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+AWX credential bootstrap
+
+Resolves the AWX admin token once and reuses it. Sources, in order: the
+AWX_TOKEN environment variable, a credentials file (`token: ...`), then the
+awx-admin-password Kubernetes secret, read with a single kubectl call and
+decoded in-process. A token read from the cluster is kept in memory for the
+life of the process and, when a cache file is given, in a 0600 file with a
+TTL so back-to-back CLI runs and the shell wrappers skip kubectl entirely.
+
+Usage (prints the token, e.g. for `export AWX_TOKEN=$(...)`):
+    python3 scripts/awx_auth.py [--cache [FILE]]
+"""
+
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+TOKEN_ENV = 'AWX_TOKEN'
+
+# Optional credentials file with a `token:` entry (AWX_CONFIG overrides the path)
+CONFIG_FILE = os.environ.get('AWX_CONFIG', '~/.config/awx/credentials.yml')
+
+# Kubernetes secret created by the AWX operator
+KUBE_SECRET = 'awx-admin-password'
+KUBE_NAMESPACE = 'awx'
+
+# Token cache file used by --token-cache / --cache without a path
+DEFAULT_CACHE_FILE = '~/.cache/awx/token.json'
+
+# Seconds a cached token is trusted before the cluster is asked again
+CACHE_TTL = 3600
+
+# Tokens read from the cluster in this process, keyed by (context, namespace, secret)
+_MEMORY = {}
+_MEMORY_LOCK = threading.Lock()
+
+
+class TokenProvider:
+    def __init__(self, token=None, env_var=TOKEN_ENV, config_file=CONFIG_FILE,
+                 secret=KUBE_SECRET, namespace=KUBE_NAMESPACE, cache_file=None, ttl=CACHE_TTL,
+                 context=None):
+        self.token = token
+        self.env_var = env_var
+        self.config_file = os.path.expanduser(config_file) if config_file else None
+        self.secret = secret
+        self.namespace = namespace
+        # kubectl context of the cluster running this AWX (None: the current context)
+        self.context = context
+        self.cache_file = os.path.expanduser(cache_file) if cache_file else None
+        self.ttl = ttl
+        self.source = None
+
+    def get(self):
+        """Return a token, resolving and caching it on first use"""
+        if self.token is None:
+            self.token, self.source = self._resolve()
+        return self.token
+
+    def refresh(self, rejected=None):
+        """Resolve a replacement for a token AWX rejected; return it, or None if there is none"""
+        rejected = rejected or self.token
+        self._forget()
+        try:
+            token, source = self._resolve(skip=rejected)
+        except LookupError:
+            return None
+        self.token, self.source = token, source
+        print(f"AWX token refreshed from {source}", file=sys.stderr)
+        return token
+
+    def _resolve(self, skip=None):
+        """Return (token, source name) from the first source that has a usable token"""
+        for name, reader in (('environment', self._from_env), ('config file', self._from_file),
+                             ('cache', self._from_cache), ('cluster', self._from_cluster)):
+            token = reader()
+            if token and token != skip:
+                return token, name
+        raise LookupError(f"No AWX token: set {self.env_var}, add `token:` to "
+                          f"{self.config_file or 'a credentials file'}, or check kubectl "
+                          f"access to secret {self._secret_name()}")
+
+    def _from_env(self):
+        return os.environ.get(self.env_var) if self.env_var else None
+
+    def _from_file(self):
+        if not self.config_file or not os.path.exists(self.config_file):
+            return None
+        import yaml  # pylint: disable=import-outside-toplevel
+
+        with open(self.config_file, encoding='utf-8') as handle:
+            config = yaml.safe_load(handle) or {}
+        return config.get('token')
+
+    def _from_cache(self):
+        """Return the token from the cache file if it is private and not expired"""
+        if not self.cache_file:
+            return None
+        try:
+            if os.stat(self.cache_file).st_mode & 0o077:
+                print(f"Ignoring {self.cache_file}: readable by other users", file=sys.stderr)
+                return None
+            with open(self.cache_file, encoding='utf-8') as handle:
+                cached = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if cached.get('secret') != self._secret_name() or cached.get('expires', 0) < time.time():
+            return None
+        return cached.get('token')
+
+    def _secret_name(self):
+        """The secret as [context:]namespace/secret, for messages and the cache"""
+        return f"{self.context + ':' if self.context else ''}{self.namespace}/{self.secret}"
+
+    def _from_cluster(self):
+        key = (self.context, self.namespace, self.secret)
+        context = ['--context', self.context] if self.context else []
+        with _MEMORY_LOCK:
+            if key in _MEMORY:
+                return _MEMORY[key]
+            try:
+                result = subprocess.run([
+                    'kubectl', *context, 'get', 'secret', self.secret,
+                    '-n', self.namespace, '-o', 'jsonpath={.data.password}'
+                ], capture_output=True, text=True, check=True)
+            except (OSError, subprocess.CalledProcessError) as error:
+                print(f"kubectl could not read {self._secret_name()}: "
+                      f"{getattr(error, 'stderr', '') or error}".strip(), file=sys.stderr)
+                return None
+            token = base64.b64decode(result.stdout).decode().strip()
+            _MEMORY[key] = token
+        self._save_cache(token)
+        return token
+
+    def _save_cache(self, token):
+        """Write the token to the cache file, readable by the owner only"""
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(self.cache_file), mode=0o700, exist_ok=True)
+        descriptor = os.open(self.cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        # O_CREAT's mode only applies to new files
+        os.fchmod(descriptor, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+            json.dump({'secret': self._secret_name(), 'token': token,
+                       'expires': time.time() + self.ttl}, handle)
+
+    def _forget(self):
+        """Drop the in-memory and on-disk copies of the cluster token"""
+        with _MEMORY_LOCK:
+            _MEMORY.pop((self.context, self.namespace, self.secret), None)
+        if self.cache_file and os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the AWX admin token")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='FILE',
+                        help="reuse/store the token in a 0600 file "
+                             f"(default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument('--ttl', type=int, default=CACHE_TTL, help="cache lifetime in seconds")
+    cli_args = parser.parse_args()
+    try:
+        print(TokenProvider(cache_file=cli_args.cache, ttl=cli_args.ttl).get())
+    except LookupError as error:
+        sys.exit(str(error))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Fan-out launcher for service_management.yml
+
+Launches one job per (extra_vars, limit) combination of a service matrix with
+bounded concurrency, waits on all of them together, and prints one outcome
+row per host and service plus the overall throughput in jobs/min. With
+slices > 1 the template's job_slice_count is set first, so each launch is
+split by AWX into parallel slices over the inventory.
+"""
+
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from awx_jobs import DEFAULT_CREDENTIAL, DEFAULT_TEMPLATE
+from awx_reconcile import load_yaml
+from awx_waiter import TERMINAL_STATUSES
+
+# Launch requests in flight at once
+DEFAULT_LAUNCH_WORKERS = 5
+
+# Seconds to wait for every job of a batch to finish
+BATCH_TIMEOUT = 3600
+
+TABLE_COLUMNS = ('job', 'limit', 'host', 'service', 'requested', 'changed', 'failed',
+                 'active_state')
+
+
+def build_matrix(services, states, limits=None, debug_extra=False):
+    """Return one {'extra_vars', 'limit'} entry per service x state x limit"""
+    return [{'extra_vars': {'service_name': service, 'service_state': state,
+                            'debug_extra': debug_extra},
+             'limit': limit}
+            for service, state, limit in itertools.product(services, states, limits or [None])]
+
+
+def load_matrix(path):
+    """Load a matrix file: a list of {extra_vars, limit} entries"""
+    with open(path, encoding='utf-8') as handle:
+        return load_yaml(handle) or []
+
+
+class BatchLauncher:
+    def __init__(self, manager, template_name=DEFAULT_TEMPLATE,
+                 credentials=(DEFAULT_CREDENTIAL,), workers=DEFAULT_LAUNCH_WORKERS):
+        self.manager = manager
+        self.template_name = template_name
+        self.credentials = credentials
+        self.workers = workers
+
+    def set_slices(self, slices):
+        """Make the template split each launch into this many slices"""
+        template = self.manager.find_resource('job_templates', self.template_name)
+        if template is None:
+            raise LookupError(f"Job template '{self.template_name}' not found")
+        if template.get('job_slice_count', 1) != slices:
+            response = self.manager.client.patch(f"job_templates/{template['id']}/",
+                                                 json={'job_slice_count': slices})
+            response.raise_for_status()
+            template.update(response.json())
+            print(f"Job template {template['name']}: job_slice_count = {slices}")
+
+    def run(self, matrix, slices=None, timeout=BATCH_TIMEOUT):
+        """Launch every matrix entry, wait for all of them, return the outcome rows"""
+        if slices:
+            self.set_slices(slices)
+
+        # One project check for the whole batch instead of one per launch
+        template = self.manager.find_resource('job_templates', self.template_name)
+        if template:
+            self.manager.jobs.sync_template_project(template)
+
+        started = time.time()
+        launched = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._launch, entry): index
+                       for index, entry in enumerate(matrix)}
+            for future in as_completed(futures):
+                entry = matrix[futures[future]]
+                try:
+                    launched[futures[future]] = future.result()
+                except (OSError, ValueError) as error:
+                    # One bad launch must not strand the jobs already running
+                    print(f"Launch failed ({entry.get('limit') or 'all'}, "
+                          f"{entry.get('extra_vars')}): {error}")
+
+        units = {launched[index]: matrix[index] for index in sorted(launched)
+                 if launched[index]}
+        failed = [entry for index, entry in enumerate(matrix) if not launched.get(index)]
+        print(f"Launched {len(units)} of {len(matrix)} jobs, waiting...")
+
+        def show(kind, unit_id, status):
+            if status in TERMINAL_STATUSES:
+                print(f"  {kind[:-1]} {unit_id}: {status}")
+
+        statuses = self.manager.waiter.wait_all(list(units), timeout=timeout, on_status=show)
+        elapsed = time.time() - started
+
+        rows = [self._entry_row(entry, None, 'launch failed', True) for entry in failed]
+        for unit, entry in units.items():
+            rows.extend(self._rows(unit, entry, statuses[unit]))
+
+        finished = sum(1 for status in statuses.values() if status)
+        return {'rows': rows, 'statuses': statuses, 'failed_launches': len(failed),
+                'elapsed': elapsed,
+                'jobs_per_minute': finished / (elapsed / 60) if elapsed else 0.0}
+
+    def _launch(self, entry):
+        return self.manager.jobs.launch(self.template_name, extra_vars=entry.get('extra_vars'),
+                                        limit=entry.get('limit'), credentials=self.credentials)
+
+    def _rows(self, unit, entry, status):
+        """Outcome rows for one launched unit (all slices of a sliced launch)"""
+        kind, unit_id = unit
+        job_ids = self.manager.jobs.slice_jobs(unit_id) if kind == 'workflow_jobs' else [unit_id]
+        rows = []
+        for job_id in job_ids:
+            for outcome in self.manager.jobs.service_outcomes(job_id):
+                rows.append({**self._entry_row(entry, unit_id, outcome['active_state'],
+                                               outcome['failed']),
+                             'host': outcome['host'], 'service': outcome['service'],
+                             'changed': outcome['changed']})
+        if not rows:
+            # No per-host results (launch error, timeout, unreachable inventory)
+            rows.append(self._entry_row(entry, unit_id, status or 'timeout',
+                                        status != 'successful'))
+        return rows
+
+    @staticmethod
+    def _entry_row(entry, job_id, active_state, failed):
+        """A row for a matrix entry without per-host results (job_id None: not launched)"""
+        extra_vars = entry.get('extra_vars') or {}
+        return {'job': job_id, 'limit': entry.get('limit') or 'all', 'host': '-',
+                'service': extra_vars.get('service_name'),
+                'requested': extra_vars.get('service_state'), 'changed': None,
+                'failed': failed, 'active_state': active_state}
+
+
+def print_table(result):
+    """Print outcome rows as an aligned table followed by the throughput"""
+    rows = sorted(result['rows'],
+                  key=lambda r: (str(r['host']), str(r['service']), r['job'] or 0))
+    cells = [['-' if row.get(column) is None else str(row[column]) for column in TABLE_COLUMNS]
+             for row in rows]
+    widths = [max([len(column)] + [len(cell[i]) for cell in cells])
+              for i, column in enumerate(TABLE_COLUMNS)]
+    print('  '.join(column.ljust(width) for column, width in zip(TABLE_COLUMNS, widths)))
+    for cell in cells:
+        print('  '.join(value.ljust(width) for value, width in zip(cell, widths)))
+
+    failed = sum(1 for row in result['rows'] if row['failed'])
+    print(f"\n{len(result['statuses'])} jobs, {len(rows)} host results, {failed} failed"
+          + (f", {result['failed_launches']} launches failed"
+             if result['failed_launches'] else ""))
+    print(f"Elapsed: {result['elapsed']:.1f}s, throughput: "
+          f"{result['jobs_per_minute']:.1f} jobs/min")
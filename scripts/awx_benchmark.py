@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the inventory manager, run against the fake AWX
+
+For each inventory size the fake AWX (scripts/awx_fake.py) is started in a
+child process and these scenarios run in order, each with a fresh manager
+as a separate CLI run would:
+
+  setup      main() against an empty AWX
+  reconcile  first --reconcile of config/awx_state.yml after setup
+  rerun      the same reconcile again, with nothing left to change
+  snapshot   the rerun with a new local snapshot (built by listing everything)
+  warm       the rerun again from that snapshot, refreshed incrementally
+  cleanup    cleanup_all()
+
+Each scenario records wall time, API requests and retries, and peak Python
+memory of the manager (tracemalloc, which also slows allocation a little;
+baseline and current runs pay the same cost). Results can be saved as JSON
+and compared with a saved baseline:
+
+    python3 scripts/awx_benchmark.py --sizes 10 1000 --save benchmarks/baseline.json
+    python3 scripts/awx_benchmark.py --sizes 10 1000 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from awx_fake import FAKE_TOKEN, FakeAWX
+from awx_inventory_manager import AWXInventoryManager
+from awx_setup import main
+from awx_reconcile import DEFAULT_STATE_FILE, load_yaml, reconcile
+from awx_snapshot import Snapshot
+
+DEFAULT_SIZES = (10, 1000, 10000)
+SCENARIOS = ('setup', 'reconcile', 'rerun', 'snapshot', 'warm', 'cleanup')
+
+# Seconds the fake adds to every request (a real AWX answers in roughly 10-50 ms)
+DEFAULT_LATENCY = 0.01
+
+# Relative increase over the baseline reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+# Metrics compared against the baseline; lower is better for all of them
+METRICS = ('wall_s', 'requests', 'peak_mb')
+
+
+def write_fixtures(directory, size):
+    """Write an Ansible inventory with `size` hosts and a state file that points at it"""
+    hosts = {f"bench{i:05d}": {'ansible_host': '172.22.192.129', 'ansible_port': 2200 + i}
+             for i in range(size)}
+    inventory_file = os.path.join(directory, 'inventory.yml')
+    with open(inventory_file, 'w', encoding='utf-8') as handle:
+        json.dump({'all': {'children': {'all_servers': {'hosts': hosts}},
+                           'vars': {'ansible_user': 'daniv'}}}, handle)
+
+    with open(DEFAULT_STATE_FILE, encoding='utf-8') as handle:
+        state = load_yaml(handle)
+    state['inventory']['source'] = inventory_file
+    state_file = os.path.join(directory, 'state.json')
+    with open(state_file, 'w', encoding='utf-8') as handle:
+        json.dump(state, handle)
+
+    return state_file
+
+
+def measure(url, action):
+    """Run action(manager) with output silenced; return its metrics"""
+    manager = AWXInventoryManager(base_url=url, token=FAKE_TOKEN)
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull), \
+            contextlib.redirect_stderr(devnull):
+        action(manager)
+    wall = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    stats = manager.client.stats()
+    manager.client.close()
+    return {'wall_s': round(wall, 3), 'requests': stats['requests'],
+            'retries': stats['retries'], 'peak_mb': round(peak / 2 ** 20, 2)}
+
+
+def run_size(size, latency, scenarios=SCENARIOS):
+    """Run the scenarios for one inventory size against a fresh fake AWX"""
+    fake = FakeAWX(latency=latency).start(process=True)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = write_fixtures(directory, size)
+            snapshot_file = os.path.join(directory, 'snapshot.db')
+
+            def from_snapshot(manager):
+                manager.snapshot = Snapshot(snapshot_file, controller=fake.url)
+                reconcile(manager, state_file)
+                manager.snapshot.close()
+
+            actions = {
+                'setup': lambda manager: main(manager, state_file),
+                'reconcile': lambda manager: reconcile(manager, state_file),
+                'rerun': lambda manager: reconcile(manager, state_file),
+                'snapshot': from_snapshot,
+                'warm': from_snapshot,
+                'cleanup': lambda manager: manager.cleanup_all(),
+            }
+            for scenario in SCENARIOS:
+                if scenario not in scenarios:
+                    continue
+                result = {'size': size, 'scenario': scenario,
+                          **measure(fake.url, actions[scenario])}
+                print_row(result)
+                results.append(result)
+    finally:
+        fake.stop()
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print each metric's change against the baseline; return the regressions"""
+    previous = {(row['size'], row['scenario']): row for row in baseline['results']}
+    regressions = []
+    print(f"\nCompared with baseline from {baseline.get('created', '?')} "
+          f"(regression threshold {threshold:.0%}):")
+    for row in results:
+        before = previous.get((row['size'], row['scenario']))
+        if before is None:
+            continue
+        changes = []
+        for metric in METRICS:
+            old, new = before[metric], row[metric]
+            delta = (new - old) / old if old else 0.0
+            flag = ''
+            if delta > threshold:
+                flag = ' REGRESSION'
+                regressions.append((row['size'], row['scenario'], metric, old, new))
+            changes.append(f"{metric} {old} -> {new} ({delta:+.0%}){flag}")
+        print(f"  {row['size']:>6} {row['scenario']:<10} " + ', '.join(changes))
+    return regressions
+
+
+def print_row(result):
+    print(f"{result['size']:>6} {result['scenario']:<10} {result['wall_s']:>9.2f}s "
+          f"{result['requests']:>8} requests ({result['retries']} retries) "
+          f"{result['peak_mb']:>8.2f} MB peak")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inventory manager at scale "
+                                                 "against an in-process fake AWX")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="host counts to run (default: 10 1000 10000)")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help="run only these scenarios (repeatable; later ones need earlier)")
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help="seconds the fake adds to every request")
+    parser.add_argument('--save', metavar='FILE', help="write the results as JSON")
+    parser.add_argument('--baseline', metavar='FILE', help="compare with saved results")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative increase reported as a regression (default: 0.10)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    tracemalloc.start()
+    print(f"{'hosts':>6} {'scenario':<10} {'wall':>10} {'requests':>8}")
+    all_results = []
+    for bench_size in args.sizes:
+        all_results.extend(run_size(bench_size, args.latency, args.scenario or SCENARIOS))
+
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'latency': args.latency,
+              'python': platform.python_version(), 'results': all_results}
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as save_handle:
+            json.dump(report, save_handle, indent=2)
+        print(f"\nResults saved to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_handle:
+            found = compare(all_results, json.load(baseline_handle), args.threshold)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the AWX API
+
+One keep-alive requests.Session per AWX target, so every call made by the
+inventory manager reuses pooled TLS connections and prebuilt auth headers.
+Transient failures (429/502/503/504 and dropped connections) are retried
+with jittered exponential backoff, and a token AWX rejects with 401 is
+replaced once through the token provider, if one is given. An optional rate
+limit spaces requests to this AWX evenly, across every thread using the
+client.
+
+requests is imported when the first client is created, so `--help` and
+other offline code paths start without it. Its exceptions are OSErrors,
+which is what callers catch.
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urljoin
+
+# Request timeout in seconds
+REQUEST_TIMEOUT = 30
+
+# Connections kept alive per host; match this to the widest thread pool in use
+DEFAULT_POOL_SIZE = 10
+
+# Retry settings for transient failures
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# POST is not idempotent: only retry it when AWX refused the request outright,
+# or when the connection was never established (so nothing was sent)
+POST_RETRY_STATUSES = (429, 503)
+
+
+class AWXClient:
+    def __init__(self, base_url, token, pool_size=DEFAULT_POOL_SIZE,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 timeout=REQUEST_TIMEOUT, verify=False, token_provider=None, rate_limit=None):
+        # pylint: disable=import-outside-toplevel
+        import requests
+        import urllib3
+        from requests.adapters import HTTPAdapter
+        from urllib3.exceptions import NewConnectionError
+
+        # Suppress SSL warnings for localhost
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.token = token
+        self.token_provider = token_provider
+        self._token_lock = threading.Lock()
+        self._transport_errors = (requests.ConnectionError, requests.Timeout)
+        self._connect_timeout = requests.ConnectTimeout
+        self._new_connection_error = NewConnectionError
+
+        # One pooled session for every call to this AWX
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.verify = verify
+        self.session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        })
+
+        # Objects with on_request(record), called after every HTTP attempt
+        # (see awx_metrics.Metrics)
+        self.hooks = []
+
+        # Counters so the saving from pooling and retries can be measured
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+
+        # Requests per second at most (None: unlimited); _next_slot is the
+        # earliest time the next request may start
+        self.rate_limit = rate_limit
+        self._next_slot = 0.0
+        self.throttled_seconds = 0.0
+
+    def set_token(self, token):
+        """Swap the bearer token used by every later request"""
+        self.token = token
+        self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def url(self, path):
+        """Resolve an API path (or a `next` link) against the base URL"""
+        if path.startswith(('http://', 'https://')):
+            return path
+        if not path.startswith('/'):
+            path = f"/api/v2/{path}"
+        return urljoin(self.base_url, path)
+
+    def request(self, method, path, **kwargs):
+        """Send a request, retrying transient failures with jittered backoff"""
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+        post = method.upper() == 'POST'
+        retry_statuses = POST_RETRY_STATUSES if post else RETRY_STATUSES
+        refreshed = False
+        for attempt in range(self.retries + 1):
+            self._throttle()
+            with self._lock:
+                self.request_count += 1
+            token = self.token
+            try:
+                response = self._send(method, url, attempt, **kwargs)
+            except self._transport_errors as error:
+                # A POST that may have reached AWX could have been applied
+                if attempt == self.retries or (post and not self._never_connected(error)):
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if (response.status_code == 401 and not refreshed
+                        and attempt < self.retries and self._refresh_token(token)):
+                    refreshed = True
+                    continue
+                if response.status_code not in retry_statuses or attempt == self.retries:
+                    return response
+                retry_after = response.headers.get('Retry-After', '')
+                delay = int(retry_after) if retry_after.isdigit() else self._backoff(attempt)
+            with self._lock:
+                self.retry_count += 1
+            time.sleep(delay)
+        return response
+
+    def _never_connected(self, error):
+        """True if the request failed before a connection to AWX was established"""
+        if isinstance(error, self._connect_timeout):
+            return True
+        # requests wraps urllib3's MaxRetryError, whose reason is the real failure
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, self._new_connection_error)
+
+    def _throttle(self):
+        """Wait for this request's turn under the rate limit"""
+        if not self.rate_limit:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate_limit
+            self.throttled_seconds += slot - now
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _send(self, method, url, attempt, **kwargs):
+        """Make one HTTP attempt and report it to every hook"""
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+        finally:
+            if self.hooks:
+                self._notify(method, url, attempt, response, time.perf_counter() - started)
+        return response
+
+    def _notify(self, method, url, attempt, response, seconds):
+        body = response.request.body if response is not None else None
+        record = {
+            'time': time.time(), 'method': method.upper(), 'url': url,
+            # None: the request raised (connection error, timeout)
+            'status': response.status_code if response is not None else None,
+            'seconds': seconds, 'retry': attempt > 0,
+            'bytes_sent': len(body) if body else 0,
+            'bytes_received': len(response.content) if response is not None else 0,
+        }
+        for hook in self.hooks:
+            hook.on_request(record)
+
+    def _refresh_token(self, rejected):
+        """Replace a token AWX rejected; return True if a different one is now in use"""
+        if self.token_provider is None:
+            return False
+        with self._token_lock:
+            # Another thread may already have replaced it
+            if self.token != rejected:
+                return True
+            token = self.token_provider.refresh(rejected)
+            if not token:
+                return False
+            self.set_token(token)
+            return True
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def stats(self):
+        """Return request and retry counters, and seconds spent waiting for the rate limit"""
+        return {'requests': self.request_count, 'retries': self.retry_count,
+                'throttled_seconds': round(self.throttled_seconds, 3)}
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Set up, reconcile or clean up several AWX controllers at once
+
+Controllers are listed in config/awx_controllers.yml, each with its URL and
+where its token comes from. Every controller gets its own manager, so the
+connection pool, rate limit, token and lookup indexes are per controller, and
+the controllers are worked on side by side, one thread each. Output lines are
+prefixed with the controller's name; a report at the end gives the result,
+time and API requests of each one.
+
+    python3 scripts/awx_controllers.py plan
+    python3 scripts/awx_controllers.py reconcile --only lab --only staging
+    python3 scripts/awx_controllers.py setup --controllers config/other_controllers.yml
+"""
+
+import argparse
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from awx_auth import DEFAULT_CACHE_FILE, KUBE_NAMESPACE, KUBE_SECRET, TokenProvider
+from awx_client import DEFAULT_POOL_SIZE
+from awx_inventory_manager import AWXInventoryManager
+from awx_setup import main
+from awx_jobs import DEFAULT_TEMPLATE
+from awx_reconcile import DEFAULT_STATE_FILE, REPO_ROOT, load_yaml, reconcile
+
+DEFAULT_CONTROLLERS_FILE = os.path.join(REPO_ROOT, 'config', 'awx_controllers.yml')
+
+ACTIONS = ('setup', 'reconcile', 'plan', 'cleanup')
+
+# Output prefix of the controller the current thread (or graph task) works on
+_PREFIX = contextvars.ContextVar('prefix', default=None)
+
+
+class PrefixedOutput:
+    """Stand-in for sys.stdout/stderr that prefixes each line with the controller name"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._partial = {}
+
+    def write(self, text):
+        prefix = _PREFIX.get()
+        if prefix is None:
+            return self.stream.write(text)
+        # Whole lines only, so lines of different controllers do not mix
+        with self._lock:
+            *lines, rest = (self._partial.pop(prefix, '') + text).split('\n')
+            if rest:
+                self._partial[prefix] = rest
+            for line in lines:
+                self.stream.write(f"{prefix}{line}".rstrip() + '\n')
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def load_controllers(path=DEFAULT_CONTROLLERS_FILE, only=None):
+    """Read the controller list, keeping only the named ones if `only` is given"""
+    with open(path, encoding='utf-8') as handle:
+        controllers = (load_yaml(handle) or {}).get('controllers') or []
+    names = [controller.get('name') for controller in controllers]
+    if not all(names) or not all(controller.get('url') for controller in controllers):
+        raise ValueError(f"{path}: every controller needs a name and a url")
+    if len(set(names)) != len(names):
+        raise ValueError(f"{path}: controller names must be unique")
+    if only:
+        unknown = set(only) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown controller(s): {', '.join(sorted(unknown))}")
+        controllers = [controller for controller in controllers if controller['name'] in only]
+    return controllers
+
+
+def build_manager(controller, token_cache=False):
+    """Create a manager with this controller's token source, pool size and rate limit"""
+    # Only the sources configured for this controller, so one controller's
+    # AWX_TOKEN is never sent to another
+    cache_file = None
+    if token_cache:
+        cache_file = os.path.join(os.path.dirname(DEFAULT_CACHE_FILE),
+                                  f"token-{controller['name']}.json")
+    provider = TokenProvider(env_var=controller.get('token_env'),
+                             config_file=controller.get('credentials_file'),
+                             namespace=controller.get('namespace', KUBE_NAMESPACE),
+                             secret=controller.get('secret', KUBE_SECRET),
+                             context=controller.get('context'), cache_file=cache_file)
+    return AWXInventoryManager(base_url=controller['url'], token_provider=provider,
+                               pool_size=controller.get('pool_size', DEFAULT_POOL_SIZE),
+                               rate_limit=controller.get('rate_limit'))
+
+
+def run_action(manager, action, state_file):
+    """Run one action on one controller; return (ok, one-line result)"""
+    if action == 'setup':
+        main(manager, state_file)
+        template = manager.find_resource('job_templates', DEFAULT_TEMPLATE)
+        if not template:
+            return False, "job template missing after setup"
+        return True, f"job template {template['id']}"
+    if action == 'cleanup':
+        report = manager.cleanup_all()
+        failed = sum(len(summary['failed']) for summary in report.values())
+        deleted = sum(summary['deleted'] for summary in report.values())
+        return not failed, f"{deleted} deleted, {failed} failed"
+
+    failures = {}
+    changes = reconcile(manager, state_file, plan_only=action == 'plan', failures=failures)
+    if not changes:
+        return True, "no changes"
+    if action == 'plan':
+        return True, f"{len(changes)} change(s) pending"
+    return not failures, f"{len(changes) - len(failures)} of {len(changes)} change(s) applied"
+
+
+def run_controller(controller, action, state_file, token_cache=False):
+    """Run an action on one controller; return its report row"""
+    _PREFIX.set(f"[{controller['name']}] ")
+    row = {'controller': controller['name'], 'url': controller['url'], 'ok': False,
+           'result': '', 'seconds': 0.0, 'requests': 0, 'retries': 0, 'throttled_seconds': 0.0}
+    started = time.perf_counter()
+    manager = None
+    try:
+        manager = build_manager(controller, token_cache)
+        row['ok'], row['result'] = run_action(manager, action, state_file)
+    except (LookupError, OSError, ValueError) as error:
+        row['result'] = f"error: {error}"
+        print(f"Failed: {error}")
+    finally:
+        row['seconds'] = time.perf_counter() - started
+        if manager is not None:
+            row.update(manager.client.stats())
+            manager.client.close()
+    return row
+
+
+def run_all(controllers, action, state_file=DEFAULT_STATE_FILE, workers=None,
+            token_cache=False):
+    """Run an action on every controller concurrently; return the report rows in list order"""
+    workers = workers or len(controllers)
+    with contextlib.redirect_stdout(PrefixedOutput(sys.stdout)), \
+            contextlib.redirect_stderr(PrefixedOutput(sys.stderr)), \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each controller runs in its own copy of the context, holding its prefix
+        futures = [pool.submit(contextvars.copy_context().run, run_controller, controller,
+                               action, state_file, token_cache)
+                   for controller in controllers]
+        return [future.result() for future in futures]
+
+
+def print_report(action, rows, seconds):
+    """Print one line per controller and the totals"""
+    print(f"\n=== {action}: {len(rows)} controller(s) ===")
+    print(f"{'controller':<16} {'status':<7} {'seconds':>8} {'requests':>8} {'retries':>7} "
+          f"{'throttled':>9}  result")
+    for row in rows:
+        print(f"{row['controller']:<16} {'ok' if row['ok'] else 'FAILED':<7} "
+              f"{row['seconds']:>8.2f} {row['requests']:>8} {row['retries']:>7} "
+              f"{row['throttled_seconds']:>8.1f}s  {row['result']}")
+    failed = [row['controller'] for row in rows if not row['ok']]
+    print(f"Total: {seconds:.2f}s, {sum(row['requests'] for row in rows)} requests; "
+          f"{len(rows) - len(failed)} ok, {len(failed)} failed"
+          + (f" ({', '.join(failed)})" if failed else ''))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run setup, reconcile, plan or cleanup on several AWX controllers at once")
+    parser.add_argument('action', choices=ACTIONS)
+    parser.add_argument('--controllers', default=DEFAULT_CONTROLLERS_FILE,
+                        help="controller list (default: config/awx_controllers.yml)")
+    parser.add_argument('--only', action='append', metavar='NAME',
+                        help="only this controller (repeatable)")
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE,
+                        help="desired-state file for setup, reconcile and plan "
+                             "(default: config/awx_state.yml)")
+    parser.add_argument('--workers', type=int,
+                        help="controllers worked on at once (default: all)")
+    parser.add_argument('--token-cache', action='store_true',
+                        help="cache each controller's cluster token in "
+                             "~/.cache/awx/token-<name>.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        selected = load_controllers(args.controllers, args.only)
+    except (OSError, ValueError) as error:
+        sys.exit(str(error))
+    if not selected:
+        sys.exit(f"No controllers in {args.controllers}")
+    run_started = time.perf_counter()
+    report_rows = run_all(selected, args.action, args.state, workers=args.workers,
+                          token_cache=args.token_cache)
+    print_report(args.action, report_rows, time.perf_counter() - run_started)
+    sys.exit(0 if all(row['ok'] for row in report_rows) else 1)
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for the AWX v2 API
+
+Serves the endpoints the inventory manager and the wsl_inventory plugin use
+(inventories and their script/ export, groups, hosts, group hosts,
+projects, project_updates, job_templates, jobs, job_events, workflow jobs
+of sliced launches, bulk host create) from plain dicts, with
+AWX-style pagination, `?field=`, `__in` and `__gt` filters, bearer-token
+auth, a configurable per-request latency and injectable error statuses
+(`fake.errors[('POST', 'projects')] = [400]`). Project updates, jobs and
+inventory deletes finish asynchronously after a configurable delay, like
+they do on a real controller.
+
+Run it on a thread inside a test or benchmark (`FakeAWX().start()`), in a
+child process so it doesn't share the caller's CPU and memory
+(`start(process=True)`), or standalone:
+    python3 scripts/awx_fake.py --port 8052 --latency 0.02
+    AWX_TOKEN=fake-token python3 scripts/awx_setup.py --url http://127.0.0.1:8052
+"""
+
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+FAKE_TOKEN = 'fake-token'
+
+COLLECTIONS = ('inventories', 'groups', 'hosts', 'projects', 'project_updates',
+               'job_templates', 'jobs', 'job_events', 'workflow_jobs', 'workflow_job_nodes')
+
+# AWX caps page_size at 200 and defaults to 25
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 25
+
+# Bulk host create limit (AWX's BULK_HOST_MAX_CREATE default)
+BULK_HOST_MAX = 100
+
+# Unit statuses that will not change again
+FINISHED = ('successful', 'failed', 'error', 'canceled')
+
+
+class FakeAWX:
+    def __init__(self, token=FAKE_TOKEN, latency=0.0, bulk=True, sync_seconds=0.2,
+                 job_seconds=0.5, delete_seconds=0.5, page_size_max=MAX_PAGE_SIZE):
+        self.token = token
+        self.latency = latency
+        self.bulk = bulk
+        self.sync_seconds = sync_seconds
+        self.job_seconds = job_seconds
+        self.delete_seconds = delete_seconds
+        self.page_size_max = page_size_max
+        # Commit every project update lands on (the branch head); None makes one up
+        self.scm_head = None
+        # (host, service) pairs whose service task fails in every job
+        self.failing = set()
+        # (method, collection) -> statuses answered, one each, to the next matching requests
+        self.errors = {}
+
+        self.lock = threading.Lock()
+        self.data = {name: {} for name in COLLECTIONS}
+        self.members = {}
+        self.next_id = 1
+        self.request_count = 0
+
+        self.server = None
+        self.worker = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self, port=0, process=False):
+        """Listen on 127.0.0.1:port and serve on a daemon thread or a child process"""
+        handler = type('Handler', (_Handler,), {'fake': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.server.daemon_threads = True
+        if process:
+            # fork: the child inherits the listening socket and the seeded data
+            context = multiprocessing.get_context('fork')
+            self.worker = context.Process(target=self.server.serve_forever, daemon=True)
+        else:
+            self.worker = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.worker.start()
+        return self
+
+    def stop(self):
+        if isinstance(self.worker, threading.Thread):
+            self.server.shutdown()
+        else:
+            self.worker.terminate()
+            self.worker.join()
+        self.server.server_close()
+
+    def handle(self, method, path, query, body):
+        """Serve one request; return (status, payload)"""
+        with self.lock:
+            self.request_count += 1
+            self._tick()
+            parts = [part for part in path.split('/') if part][2:]
+            queued = self.errors.get((method, parts[0] if parts else ''))
+            if queued:
+                return queued.pop(0), {'detail': 'Injected error.'}
+            return self._route(method, path, query, body)
+
+    # -- store
+
+    def add(self, collection, obj):
+        """Store a new object with the next ID and return it"""
+        now = time.time()
+        obj['id'] = self.next_id
+        self.next_id += 1
+        obj.setdefault('created', _iso(now))
+        obj['modified'] = _iso(now)
+        self.data[collection][obj['id']] = obj
+        return obj
+
+    def _tick(self):
+        """Advance asynchronous work whose delay has passed"""
+        now = time.time()
+        for inventory in list(self.data['inventories'].values()):
+            if inventory.get('pending_deletion') and (
+                    now - inventory['deleted_at'] >= self.delete_seconds):
+                self._delete_inventory(inventory['id'])
+
+        for update in self.data['project_updates'].values():
+            started = _epoch(update['created'])
+            if update['status'] not in FINISHED and now - started >= self.sync_seconds:
+                update.update(status='successful', finished=_iso(now))
+                project = self.data['projects'].get(update['project'])
+                if project:
+                    project.update(status='successful', scm_revision=update['scm_revision'],
+                                   last_job_run=_iso(now), last_updated=_iso(now))
+            elif update['status'] == 'pending':
+                update['status'] = 'running'
+
+        for job in self.data['jobs'].values():
+            finish_after = self.job_seconds + job.get('sync_seconds', 0)
+            if job['status'] not in FINISHED and now - _epoch(job['created']) >= finish_after:
+                failed = self._emit_events(job)
+                job.update(status='failed' if failed else 'successful', finished=_iso(now),
+                           elapsed=round(now - _epoch(job['created']), 3),
+                           event_processing_finished=True)
+            elif job['status'] == 'pending':
+                job.update(status='running', started=_iso(now))
+
+        for workflow in self.data['workflow_jobs'].values():
+            if workflow['status'] not in FINISHED:
+                statuses = [self.data['jobs'][job_id]['status'] for job_id in workflow['jobs']]
+                if all(status in FINISHED for status in statuses):
+                    failed = any(status != 'successful' for status in statuses)
+                    workflow.update(status='failed' if failed else 'successful',
+                                    finished=_iso(now))
+                else:
+                    workflow['status'] = 'running'
+
+    def _delete_inventory(self, inventory_id):
+        for collection in ('hosts', 'groups'):
+            doomed = [obj_id for obj_id, obj in self.data[collection].items()
+                      if obj['inventory'] == inventory_id]
+            for obj_id in doomed:
+                del self.data[collection][obj_id]
+                self.members.pop(obj_id, None)
+        del self.data['inventories'][inventory_id]
+
+    def _job_hosts(self, job):
+        """Hosts a job runs against: its inventory, narrowed by limit and slice"""
+        hosts = sorted((h for h in self.data['hosts'].values()
+                        if h['inventory'] == job['inventory']), key=lambda h: h['id'])
+        if job.get('limit'):
+            patterns = set(job['limit'].split(','))
+            if 'all' not in patterns:
+                grouped = {host_id for group_id, members in self.members.items()
+                           if self.data['groups'].get(group_id, {}).get('name') in patterns
+                           for host_id in members}
+                hosts = [h for h in hosts if h['name'] in patterns or h['id'] in grouped]
+        if job.get('job_slice_count', 1) > 1:
+            hosts = hosts[job['job_slice_number'] - 1::job['job_slice_count']]
+        return hosts
+
+    def _emit_events(self, job):
+        """Record one service result event per host, as a playbook run would; True if any failed"""
+        try:
+            extra_vars = json.loads(job.get('extra_vars') or '{}')
+        except ValueError:
+            extra_vars = {}
+        if extra_vars.get('service_list'):
+            # Batch mode: one dji_administration.services result holding every service
+            action = 'dji_ansible.dji_administration.services'
+            services = extra_vars['service_list']
+        else:
+            action = 'ansible.builtin.service'
+            services = [{'name': extra_vars.get('service_name', 'sshd'),
+                         'state': extra_vars.get('service_state', 'started')}]
+
+        counter = 0
+        any_failed = False
+        for counter, host in enumerate(self._job_hosts(job), start=1):
+            results = []
+            for service in services:
+                failed = (host['name'], service['name']) in self.failing
+                results.append({'name': service['name'], 'state': service.get('state', 'started'),
+                                'changed': not failed, 'failed': failed,
+                                'status': {'ActiveState': 'failed', 'SubState': 'failed'}
+                                if failed else _unit_status(service)})
+            failed = any(result['failed'] for result in results)
+            any_failed = any_failed or failed
+            res = {'changed': not failed, 'failed': failed, 'results': results} if len(
+                services) > 1 or action != 'ansible.builtin.service' else results[0]
+            self.add('job_events', {
+                'job': job['id'], 'counter': counter,
+                'event': 'runner_on_failed' if failed else 'runner_on_ok',
+                'host_name': host['name'], 'task': 'Manage service', 'role': 'service_mgmt',
+                'play': 'Manage services on WSL instances', 'changed': not failed,
+                'failed': failed,
+                'stdout': f"{'failed' if failed else 'changed'}: [{host['name']}]",
+                'event_data': {'task_action': action, 'duration': 0.1 + 0.01 * len(services),
+                               'res': res}})
+        self.add('job_events', {'job': job['id'], 'counter': counter + 1,
+                                'event': 'playbook_on_stats', 'host_name': None,
+                                'stdout': 'PLAY RECAP', 'event_data': {}})
+        return any_failed
+
+    # -- routing
+
+    def _route(self, method, path, query, body):
+        parts = [part for part in path.split('/') if part][2:]  # drop api/v2
+        if not parts:
+            return 200, {'description': 'AWX REST API (fake)'}
+        if parts[0] == 'bulk':
+            return self._bulk(method, parts, body)
+
+        collection = parts[0]
+        if collection not in self.data:
+            return 404, {'detail': 'Not found.'}
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, self._list(self.data[collection].values(), path, query)
+            if method == 'POST':
+                return self._create(collection, body)
+            return 405, {'detail': f'Method "{method}" not allowed.'}
+
+        obj = self.data[collection].get(int(parts[1]))
+        if obj is None:
+            return 404, {'detail': 'Not found.'}
+        if len(parts) == 2:
+            return self._detail(method, collection, obj, body)
+        return self._sub(method, collection, obj, parts[2], path, query, body)
+
+    def _bulk(self, method, parts, body):
+        if not self.bulk:
+            return 404, {'detail': 'Not found.'}
+        if parts == ['bulk']:
+            return 200, {'host_create': '/api/v2/bulk/host_create/'}
+        if parts == ['bulk', 'host_create'] and method == 'POST':
+            if len(body['hosts']) > BULK_HOST_MAX:
+                return 400, {'__all__': [f'Number of hosts exceeds system setting '
+                                         f'BULK_HOST_MAX_CREATE ({BULK_HOST_MAX})']}
+            taken = {h['name'] for h in self.data['hosts'].values()
+                     if h['inventory'] == body['inventory']}
+            if taken & {h['name'] for h in body['hosts']}:
+                return 400, {'__all__': ['Hosts already exist in the inventory']}
+            created = [self.add('hosts', {'name': h['name'], 'inventory': body['inventory'],
+                                          'variables': h.get('variables', ''),
+                                          'enabled': h.get('enabled', True)})
+                       for h in body['hosts']]
+            return 201, {'hosts': [{'id': h['id'], 'name': h['name']} for h in created]}
+        return 404, {'detail': 'Not found.'}
+
+    def _create(self, collection, body):
+        if 'name' in body:
+            scope = 'inventory' if collection in ('hosts', 'groups') else None
+            for obj in self.data[collection].values():
+                if obj.get('name') == body['name'] and (
+                        scope is None or obj.get(scope) == body.get(scope)):
+                    return 400, {'name': ['Object with this name already exists.']}
+        obj = self.add(collection, dict(body))
+        if collection == 'projects':
+            obj.update(status='pending', scm_revision='')
+            self._start_update(obj)
+        return 201, obj
+
+    def _start_update(self, project):
+        revision = self.scm_head or f"{project['id']:07x}{int(time.time()):x}"
+        return self.add('project_updates', {'project': project['id'], 'status': 'pending',
+                                            'scm_revision': revision})
+
+    def _detail(self, method, collection, obj, body):
+        if method == 'GET':
+            if collection == 'projects':
+                obj['summary_fields'] = self._project_summary(obj['id'])
+            return 200, obj
+        if method == 'PATCH':
+            obj.update(body)
+            obj['modified'] = _iso(time.time())
+            return 200, obj
+        if method == 'DELETE':
+            if collection == 'inventories':
+                # AWX deletes inventories in the background
+                obj.update(pending_deletion=True, deleted_at=time.time())
+                return 202, None
+            del self.data[collection][obj['id']]
+            if collection == 'hosts':
+                for members in self.members.values():
+                    members.discard(obj['id'])
+            elif collection == 'groups':
+                self.members.pop(obj['id'], None)
+            return 204, None
+        return 405, {'detail': f'Method "{method}" not allowed.'}
+
+    def _project_summary(self, project_id):
+        updates = [u for u in self.data['project_updates'].values()
+                   if u['project'] == project_id]
+        if not updates:
+            return {}
+        last = max(updates, key=lambda u: u['id'])
+        summary = {'last_update': {'id': last['id'], 'status': last['status']}}
+        if last['status'] not in FINISHED:
+            summary['current_update'] = summary['last_update']
+        return summary
+
+    def _sub(self, method, collection, obj, sub, path, query, body):
+        if collection == 'groups' and sub == 'hosts':
+            members = self.members.setdefault(obj['id'], set())
+            if method == 'POST':
+                if body.get('disassociate'):
+                    members.discard(body['id'])
+                elif body['id'] in self.data['hosts']:
+                    members.add(body['id'])
+                else:
+                    return 400, {'msg': 'Host does not exist.'}
+                return 204, None
+            hosts = [self.data['hosts'][h] for h in members if h in self.data['hosts']]
+            return 200, self._list(hosts, path, query)
+        if collection == 'inventories' and sub == 'script':
+            return 200, self._script(obj)
+        if collection == 'inventories' and sub in ('hosts', 'groups'):
+            items = [o for o in self.data[sub].values() if o['inventory'] == obj['id']]
+            return 200, self._list(items, path, query)
+        if collection == 'projects' and sub == 'update' and method == 'POST':
+            update = self._start_update(obj)
+            return 202, {'project_update': update['id'], 'id': update['id']}
+        if collection == 'job_templates' and sub == 'launch' and method == 'POST':
+            return self._launch(obj, body)
+        if collection == 'jobs' and sub == 'job_events':
+            items = [e for e in self.data['job_events'].values() if e['job'] == obj['id']]
+            return 200, self._list(items, path, query)
+        if collection == 'jobs' and sub == 'stdout':
+            events = sorted((e for e in self.data['job_events'].values()
+                             if e['job'] == obj['id']), key=lambda e: e['counter'])
+            return 200, {'content': '\n'.join(e['stdout'] for e in events)}
+        if collection == 'workflow_jobs' and sub == 'workflow_nodes':
+            nodes = [n for n in self.data['workflow_job_nodes'].values()
+                     if n['workflow_job'] == obj['id']]
+            return 200, self._list(nodes, path, query)
+        return 404, {'detail': 'Not found.'}
+
+    def _script(self, inventory):
+        """Whole inventory in ansible-inventory JSON form, as /script/?hostvars=1 returns it"""
+        hosts = {h['id']: h for h in self.data['hosts'].values()
+                 if h['inventory'] == inventory['id']}
+        data = {'all': {'hosts': [], 'vars': _variables(inventory.get('variables'))},
+                '_meta': {'hostvars': {h['name']: _variables(h.get('variables'))
+                                       for h in hosts.values()}}}
+        grouped = set()
+        for group in self.data['groups'].values():
+            if group['inventory'] == inventory['id']:
+                members = sorted(h for h in self.members.get(group['id'], ()) if h in hosts)
+                grouped.update(members)
+                data[group['name']] = {'hosts': [hosts[h]['name'] for h in members],
+                                       'vars': _variables(group.get('variables'))}
+        data['all']['hosts'] = [h['name'] for h_id, h in sorted(hosts.items())
+                                if h_id not in grouped]
+        return data
+
+    def _launch(self, template, body):
+        job = {'job_template': template['id'], 'status': 'pending',
+               'event_processing_finished': False,
+               'inventory': body.get('inventory', template.get('inventory')),
+               'credentials': body.get('credentials', []),
+               'extra_vars': body.get('extra_vars', ''), 'limit': body.get('limit', '')}
+        # scm_update_on_launch: the job first waits for a project sync, unless the
+        # last one is younger than scm_update_cache_timeout
+        project = self.data['projects'].get(template.get('project'))
+        if project and project.get('scm_update_on_launch'):
+            updated = project.get('last_updated')
+            age = time.time() - _epoch(updated) if updated else None
+            if age is None or age >= project.get('scm_update_cache_timeout', 0):
+                self._start_update(project)
+                job['sync_seconds'] = self.sync_seconds
+        slices = template.get('job_slice_count', 1)
+        if slices <= 1:
+            job = self.add('jobs', job)
+            return 201, {'job': job['id'], 'id': job['id']}
+
+        workflow = self.add('workflow_jobs', {'job_template': template['id'],
+                                              'status': 'pending', 'jobs': []})
+        for number in range(1, slices + 1):
+            slice_job = self.add('jobs', dict(job, job_slice_number=number,
+                                              job_slice_count=slices))
+            workflow['jobs'].append(slice_job['id'])
+            self.add('workflow_job_nodes', {'workflow_job': workflow['id'], 'summary_fields': {
+                'job': {'id': slice_job['id'], 'status': slice_job['status']}}})
+        return 201, {'workflow_job': workflow['id'], 'id': workflow['id']}
+
+    def _list(self, items, path, query):
+        """Filter, order and paginate like AWX list views"""
+        page = int(query.pop('page', 1))
+        page_size = min(int(query.pop('page_size', DEFAULT_PAGE_SIZE)), self.page_size_max)
+        order_by = query.pop('order_by', 'id')
+
+        items = list(items)
+        for key, value in query.items():
+            if key.endswith('__in'):
+                wanted = set(value.split(','))
+                items = [o for o in items if str(o.get(key[:-4])) in wanted]
+            elif key.endswith('__gt'):
+                field, bound = key[:-4], _comparable(value)
+                items = [o for o in items
+                         if o.get(field) is not None and _comparable(o[field]) > bound]
+            else:
+                items = [o for o in items if str(o.get(key)) == value]
+        field = order_by.lstrip('-')
+        items.sort(key=lambda o: (o.get(field) is None, o.get(field)),
+                   reverse=order_by.startswith('-'))
+
+        start = (page - 1) * page_size
+        next_url = None
+        if start + page_size < len(items):
+            next_url = f"{path}?" + urlencode({**query, 'order_by': order_by,
+                                                'page': page + 1, 'page_size': page_size})
+        return {'count': len(items), 'next': next_url, 'previous': None,
+                'results': items[start:start + page_size]}
+
+
+def _iso(epoch):
+    """AWX-style ISO 8601 timestamp"""
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(
+        timespec='microseconds').replace('+00:00', 'Z')
+
+
+def _epoch(text):
+    return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+
+
+def _unit_status(service):
+    """systemd properties a service ends up with after its requested state"""
+    stopped = service.get('state') == 'stopped'
+    return {'ActiveState': 'inactive' if stopped else 'active',
+            'SubState': 'dead' if stopped else 'running'}
+
+
+def _variables(text):
+    """AWX stores variables as a JSON (or YAML) string"""
+    if isinstance(text, dict):
+        return text
+    try:
+        return json.loads(text) if text else {}
+    except ValueError:
+        return {}
+
+
+def _comparable(value):
+    """Numbers compare as numbers, ISO timestamps as instants, everything else as strings"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return _epoch(str(value))
+    except ValueError:
+        return str(value)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    # Keep-alive, so the client's connection pool behaves as against a real AWX
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this, delayed ACKs add ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _serve(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        if self.headers.get('Authorization') != f"Bearer {self.fake.token}":
+            self._send(401, {'detail': 'Authentication credentials were not provided.'})
+            return
+        split = urlsplit(self.path)
+        body = json.loads(raw) if raw else {}
+        status, payload = self.fake.handle(method, split.path, dict(parse_qsl(split.query)),
+                                           body)
+        self._send(status, payload)
+
+    def _send(self, status, payload):
+        raw = b'' if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._serve('GET')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._serve('POST')
+
+    def do_PATCH(self):  # pylint: disable=invalid-name
+        self._serve('PATCH')
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self._serve('DELETE')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake AWX v2 API on 127.0.0.1")
+    parser.add_argument('--port', type=int, default=8052)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added per request")
+    parser.add_argument('--token', default=FAKE_TOKEN, help="accepted bearer token")
+    parser.add_argument('--no-bulk', action='store_true', help="hide /api/v2/bulk/")
+    cli_args = parser.parse_args()
+    fake = FakeAWX(token=cli_args.token, latency=cli_args.latency, bulk=not cli_args.no_bulk)
+    fake.start(port=cli_args.port)
+    print(f"Fake AWX at {fake.url} (token: {fake.token}), Ctrl-C to stop")
+    try:
+        fake.worker.join()
+    except KeyboardInterrupt:
+        fake.stop()
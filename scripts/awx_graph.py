@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Run setup steps as a dependency graph
+
+Each task names the tasks it needs, and starts as soon as all of them have
+finished, so independent branches run at the same time (in main(), host
+onboarding overlaps the project's SCM sync). A task fails when it returns
+None (the manager's convention for "could not create") or raises (an AWX
+request error, or any other exception); the tasks that need it are skipped
+and the others carry on.
+
+After the run, the timeline shows when each task started and how long it
+took, and marks the critical path: the chain of tasks that set the total
+time. Speeding up anything off that path does not make setup faster.
+"""
+
+import contextvars
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Tasks run at once; main() has at most two independent branches
+DEFAULT_WORKERS = 4
+
+# Width of the timeline bars, in characters
+BAR_WIDTH = 40
+
+Task = namedtuple('Task', 'name func after')
+
+
+class TaskGraph:
+    def __init__(self):
+        self.tasks = {}
+        self.results = {}
+        # name -> {'start': offset in seconds or None, 'seconds': float, 'status': str}
+        self.timings = {}
+        self.seconds = None
+
+    def add(self, name, func, after=()):
+        """Add a task; func(results) gets the results of the tasks finished so far
+
+        Dependencies must already be in the graph, so it cannot have cycles.
+        """
+        unknown = [dependency for dependency in after if dependency not in self.tasks]
+        if unknown:
+            raise ValueError(f"Task {name} needs unknown task(s): {', '.join(unknown)}")
+        self.tasks[name] = Task(name, func, tuple(after))
+
+    def run(self, workers=DEFAULT_WORKERS, phase=None):
+        """Run every task once its dependencies succeeded; return True if all succeeded
+
+        phase(name), if given, is a context manager each task runs in (the
+        manager's phase(), which reports timing to metrics hooks).
+        """
+        started = time.perf_counter()
+        pending = dict(self.tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                # Tasks are in dependency order, so one pass skips whole chains
+                for task in list(pending.values()):
+                    states = [self.timings.get(dependency, {}).get('status')
+                              for dependency in task.after]
+                    if any(state in ('failed', 'skipped') for state in states):
+                        self.timings[task.name] = {'start': None, 'seconds': 0.0,
+                                                   'status': 'skipped'}
+                        del pending[task.name]
+                    elif all(state == 'ok' for state in states):
+                        # Tasks see the caller's context variables (e.g. an output prefix)
+                        context = contextvars.copy_context()
+                        running[pool.submit(context.run, self._run_task, task, phase,
+                                            started)] = task.name
+                        del pending[task.name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+        self.seconds = time.perf_counter() - started
+        return all(timing['status'] == 'ok' for timing in self.timings.values())
+
+    def _run_task(self, task, phase, run_started):
+        start = time.perf_counter()
+        result = None
+        try:
+            if phase is None:
+                result = task.func(self.results)
+            else:
+                with phase(task.name):
+                    result = task.func(self.results)
+        except Exception as error:  # pylint: disable=broad-except
+            # Any error fails the task: unrecorded, its dependents would wait forever
+            print(f"Task {task.name} failed: {type(error).__name__}: {error}")
+        self.results[task.name] = result
+        self.timings[task.name] = {'start': start - run_started,
+                                   'seconds': time.perf_counter() - start,
+                                   'status': 'failed' if result is None else 'ok'}
+
+    def critical_path(self):
+        """Names of the tasks on the chain that finished last, first to last"""
+        ends = {name: timing['start'] + timing['seconds']
+                for name, timing in self.timings.items() if timing['start'] is not None}
+        if not ends:
+            return []
+        name = max(ends, key=ends.get)
+        path = [name]
+        while True:
+            # The dependency that finished last is the one this task waited for
+            dependencies = [dependency for dependency in self.tasks[name].after
+                            if dependency in ends]
+            if not dependencies:
+                return path[::-1]
+            name = max(dependencies, key=ends.get)
+            path.append(name)
+
+    def print_timeline(self):
+        """Print each task's start, duration and status, marking the critical path"""
+        path = self.critical_path()
+        total = self.seconds or 0.0
+        print(f"\n{'':2}{'task':<16} {'start':>8} {'seconds':>8}  {'status':<8} timeline")
+        for name in self.tasks:
+            timing = self.timings.get(name, {'start': None, 'seconds': 0.0,
+                                             'status': 'skipped'})
+            marker = '*' if name in path else ' '
+            if timing['start'] is None:
+                print(f"{marker:2}{name:<16} {'-':>8} {'-':>8}  {timing['status']}")
+                continue
+            begin = int(timing['start'] / total * BAR_WIDTH) if total else 0
+            length = max(1, round(timing['seconds'] / total * BAR_WIDTH)) if total else 1
+            print(f"{marker:2}{name:<16} {timing['start']:>7.2f}s {timing['seconds']:>7.2f}s  "
+                  f"{timing['status']:<8} |{' ' * begin}{'#' * length}")
+        in_sequence = sum(timing['seconds'] for timing in self.timings.values())
+        print(f"Critical path (*): {' -> '.join(path) or '-'}")
+        print(f"Total: {total:.2f}s (the same tasks one after another: {in_sequence:.2f}s)")
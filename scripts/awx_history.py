@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Service outcome history of the "WSL Service Management" job template
+
+`ingest` reads the job events of every finished job of the template that is
+not stored yet, keeps the per-host, per-service results of the service_mgmt
+role (requested state, changed, failed, systemd ActiveState/SubState and the
+task's duration) and writes them to a SQLite file. Each job is stored in one
+transaction, in the order the jobs finished, so an interrupted ingest resumes
+with the first job it did not finish. Jobs whose events AWX is still saving
+are left for the next ingest.
+
+The queries read only that file:
+
+    python3 scripts/awx_history.py ingest
+    python3 scripts/awx_history.py rates --by host --last 50
+    python3 scripts/awx_history.py failures --service systemd-resolved --last 50
+    python3 scripts/awx_history.py latency --service sshd --since 2026-10-01
+
+The batched services module reports one duration per host for all of its
+services, so latency per service is only meaningful for single-service runs.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from awx_auth import DEFAULT_CACHE_FILE, TokenProvider
+from awx_jobs import DEFAULT_TEMPLATE
+from awx_metrics import percentile
+from awx_waiter import TERMINAL_STATUSES
+
+DEFAULT_HISTORY_FILE = '~/.cache/awx/history.db'
+
+# Columns rates and latency can group by
+GROUPINGS = ('host', 'service', 'host,service')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    controller TEXT, id INTEGER, template INTEGER, status TEXT, started TEXT, finished TEXT,
+    elapsed REAL, job_limit TEXT, outcomes INTEGER, PRIMARY KEY (controller, id));
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (controller, template, finished);
+CREATE TABLE IF NOT EXISTS outcomes (
+    controller TEXT, job INTEGER, finished TEXT, host TEXT, service TEXT, state TEXT,
+    changed INTEGER, failed INTEGER, active_state TEXT, sub_state TEXT, duration REAL);
+CREATE INDEX IF NOT EXISTS outcomes_service ON outcomes (controller, service, host, finished);
+CREATE INDEX IF NOT EXISTS outcomes_host ON outcomes (controller, host, finished);
+CREATE INDEX IF NOT EXISTS outcomes_job ON outcomes (controller, job);
+CREATE TABLE IF NOT EXISTS templates (
+    controller TEXT, id INTEGER, name TEXT, PRIMARY KEY (controller, id));
+"""
+
+
+class History:
+    def __init__(self, path=DEFAULT_HISTORY_FILE, controller='https://localhost'):
+        self.path = os.path.expanduser(path)
+        self.controller = controller.rstrip('/')
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    # -- ingest
+
+    def last_finished(self, template_id):
+        """`finished` of the newest stored job of a template, or None"""
+        row = self._db.execute("SELECT MAX(finished) FROM jobs WHERE controller = ? AND "
+                               "template = ?", (self.controller, template_id)).fetchone()
+        return row[0]
+
+    def has_job(self, job_id):
+        return self._db.execute("SELECT 1 FROM jobs WHERE controller = ? AND id = ?",
+                                (self.controller, job_id)).fetchone() is not None
+
+    def ingest(self, manager, template_name=DEFAULT_TEMPLATE):
+        """Store the outcomes of the template's finished jobs; return (jobs, outcomes) added"""
+        template = manager.find_resource('job_templates', template_name)
+        if not template:
+            print(f"Job template '{template_name}' not found")
+            return None
+        with self._db:
+            # Queries select jobs by template name
+            self._db.execute("INSERT OR REPLACE INTO templates VALUES (?, ?, ?)",
+                             (self.controller, template['id'], template['name']))
+        filters = {'job_template': template['id'], 'status__in': ','.join(TERMINAL_STATUSES),
+                   'order_by': 'finished'}
+        mark = self.last_finished(template['id'])
+        if mark:
+            filters['finished__gt'] = mark
+
+        jobs = outcomes = 0
+        for job in manager.iter_resources('jobs', **filters):
+            if not job.get('event_processing_finished', True):
+                # Later jobs wait too, so the resume point never skips this one
+                print(f"Job {job['id']}: events still being saved, stopping here")
+                break
+            if self.has_job(job['id']):
+                continue
+            rows = [(self.controller, job['id'], job.get('finished'), outcome['host'],
+                     outcome['service'], outcome['state'], int(outcome['changed']),
+                     int(outcome['failed']), outcome['active_state'], outcome['sub_state'],
+                     outcome['duration'])
+                    for outcome in manager.jobs.service_outcomes(job['id'])]
+            with self._db:
+                self._db.executemany("INSERT INTO outcomes VALUES "
+                                     "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (self.controller, job['id'], template['id'], job['status'],
+                                  job.get('started'), job.get('finished'), job.get('elapsed'),
+                                  job.get('limit'), len(rows)))
+            jobs += 1
+            outcomes += len(rows)
+            print(f"Job {job['id']} ({job['status']}, finished {job.get('finished')}): "
+                  f"{len(rows)} service results")
+        return jobs, outcomes
+
+    # -- queries
+
+    def select(self, columns, template=None, host=None, service=None, state=None, last=None,
+               since=None, failed_only=False, tail=''):
+        """Run a query over outcomes narrowed by the common filters; tail is appended
+
+        last counts the most recent jobs of the template, if one is given.
+        """
+        query = f"SELECT {columns} FROM outcomes WHERE controller = ?"
+        params = [self.controller]
+        for column, value in (('host', host), ('service', service), ('state', state)):
+            if value:
+                query += f" AND {column} = ?"
+                params.append(value)
+        if since:
+            query += " AND finished >= ?"
+            params.append(since)
+        if template or last:
+            jobs = "SELECT id FROM jobs WHERE controller = ?"
+            params.append(self.controller)
+            if template:
+                jobs += (" AND template IN (SELECT id FROM templates WHERE controller = ? "
+                         "AND name = ?)")
+                params.extend([self.controller, template])
+            if last:
+                jobs += " ORDER BY finished DESC LIMIT ?"
+                params.append(last)
+            query += f" AND job IN ({jobs})"
+        if failed_only:
+            query += " AND failed = 1"
+        return self._db.execute(query + tail, params).fetchall()
+
+    def summary(self):
+        """Return (jobs, outcomes, first finished, last finished) stored"""
+        return self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(outcomes), 0), MIN(finished), MAX(finished) FROM jobs "
+            "WHERE controller = ?", (self.controller,)).fetchone()
+
+
+def print_rates(history, grouping='host,service', **filters):
+    """Print runs, failures and failure rate per group, worst first"""
+    columns = grouping.split(',')
+    rows = history.select(f"{grouping}, COUNT(*), SUM(failed), SUM(changed), "
+                          "MAX(CASE WHEN failed = 1 THEN job END)", **filters,
+                          tail=f" GROUP BY {grouping}")
+    if not rows:
+        print("No matching results")
+        return rows
+    rows.sort(key=lambda row: (-row[-3] / row[-4], -row[-3], [str(key) for key in row[:-4]]))
+    header = ''.join(f"{column:<24}" for column in columns)
+    print(f"{header}{'runs':>6} {'failed':>6} {'rate':>7} {'changed':>7}  last failed job")
+    for row in rows:
+        keys = ''.join(f"{str(value):<24}" for value in row[:len(columns)])
+        runs, failed, changed, last_failed = row[len(columns):]
+        print(f"{keys}{runs:>6} {failed:>6} {failed / runs:>7.1%} {changed:>7}  "
+              f"{last_failed or '-'}")
+    return rows
+
+
+def print_failures(history, **filters):
+    """Print every failed service result, newest first"""
+    rows = history.select("job, finished, host, service, state, active_state, sub_state",
+                          failed_only=True, tail=" ORDER BY finished DESC, host, service",
+                          **filters)
+    for job, finished, host, service, state, active_state, sub_state in rows:
+        print(f"{job:>6}  {finished or '-':<28} {host:<20} {service:<20} {state or '-':<10} "
+              f"{active_state or '-'}/{sub_state or '-'}")
+    hosts = sorted({row[2] for row in rows})
+    print(f"{len(rows)} failure(s) on {len(hosts)} host(s){': ' if hosts else ''}"
+          f"{', '.join(hosts)}")
+    return rows
+
+
+def print_latency(history, grouping='service', **filters):
+    """Print count, mean, p50, p95 and max task duration per group"""
+    columns = grouping.split(',')
+    groups = {}
+    for row in history.select(f"{grouping}, duration", **filters):
+        if row[-1] is not None:
+            groups.setdefault(row[:len(columns)], []).append(row[-1])
+    if not groups:
+        print("No matching results")
+        return groups
+    header = ''.join(f"{column:<24}" for column in columns)
+    print(f"{header}{'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    for key, durations in sorted(groups.items(), key=lambda item: -max(item[1])):
+        durations.sort()
+        print(''.join(f"{str(value):<24}" for value in key)
+              + f"{len(durations):>6} {sum(durations) / len(durations):>7.2f}s "
+              f"{percentile(durations, 0.5):>7.2f}s {percentile(durations, 0.95):>7.2f}s "
+              f"{durations[-1]:>7.2f}s")
+    return groups
+
+
+def build_manager(url, token_cache):
+    """Create an inventory manager for ingesting"""
+    # Imported here so queries need no AWX modules
+    from awx_inventory_manager import AWXInventoryManager  # pylint: disable=C0415
+
+    try:
+        return AWXInventoryManager(base_url=url,
+                                   token_provider=TokenProvider(cache_file=token_cache))
+    except LookupError as error:
+        sys.exit(str(error))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ingest service results of AWX jobs and query them offline")
+    parser.add_argument('command', choices=('ingest', 'rates', 'failures', 'latency'))
+    parser.add_argument('--db', default=os.environ.get('AWX_HISTORY', DEFAULT_HISTORY_FILE),
+                        help=f"history file (default: {DEFAULT_HISTORY_FILE}; env: AWX_HISTORY)")
+    parser.add_argument('--template', default=DEFAULT_TEMPLATE,
+                        help=f"job template to ingest and query (default: {DEFAULT_TEMPLATE})")
+    parser.add_argument('--host', help="only this host")
+    parser.add_argument('--service', help="only this service")
+    parser.add_argument('--state', help="only this requested state (e.g. restarted)")
+    parser.add_argument('--last', type=int, metavar='N', help="only the N most recent jobs")
+    parser.add_argument('--since', metavar='DATE',
+                        help="only jobs finished at or after this ISO date/time (UTC)")
+    parser.add_argument('--by', choices=GROUPINGS,
+                        help="group rates (default: host,service) or latency (default: service)")
+    parser.add_argument('--url', default=os.environ.get('AWX_HOST', 'https://localhost'),
+                        help="AWX base URL (default: $AWX_HOST); also keys the stored history")
+    parser.add_argument('--token-cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='FILE',
+                        default=os.environ.get('AWX_TOKEN_CACHE'),
+                        help="cache the AWX token for ingest")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    outcome_history = History(args.db, controller=args.url)
+    if args.command == 'ingest':
+        added = outcome_history.ingest(build_manager(args.url, args.token_cache), args.template)
+        if added is None:
+            sys.exit(1)
+        stored = outcome_history.summary()
+        print(f"Ingested {added[0]} job(s), {added[1]} service results; {stored[0]} job(s) "
+              f"stored, {stored[2] or '-'} to {stored[3] or '-'}")
+        sys.exit(0)
+
+    query_filters = {'template': args.template, 'host': args.host, 'service': args.service,
+                     'state': args.state, 'last': args.last, 'since': args.since}
+    if args.command == 'failures':
+        print_failures(outcome_history, **query_filters)
+    elif args.command == 'rates':
+        sys.exit(0 if print_rates(outcome_history, args.by or 'host,service', **query_filters)
+                 else 1)
+    else:
+        sys.exit(0 if print_latency(outcome_history, args.by or 'service', **query_filters)
+                 else 1)
@@ -2,6 +2,9 @@
 """
 AWX Inventory Management Script
 
+AWXInventoryManager creates, looks up and deletes AWX resources; its command
+line (setup, reconcile, jobs, batches, cleanup) is scripts/awx_setup.py.
+
 IMPORTANT: SSH Credential Setup
 This script creates AWX resources but does NOT create SSH credentials.
 The SSH credential must be created manually through the AWX web interface:
@@ -16,190 +19,446 @@ The awx_wsl_key_traditional key is specifically designed to work with AWX.
 CLI credential creation fails due to SSH key formatting issues.
 """
 
+import contextlib
 import json
+import math
 import subprocess
-import sys
 import time
-import requests
-import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from awx_auth import TokenProvider
+from awx_client import AWXClient, DEFAULT_POOL_SIZE
+from awx_jobs import DEFAULT_CREDENTIAL, JobRunner
+from awx_waiter import TERMINAL_STATUSES, UnitWaiter
+
+# Objects per page for list endpoints (AWX caps page_size at 200)
+PAGE_SIZE = 200
+
+# Hosts per /api/v2/bulk/host_create/ request (AWX's BULK_HOST_MAX_CREATE default)
+BULK_HOST_CHUNK = 100
+
+# Parallel requests for batch operations; keep within the client's pool size
+DEFAULT_WORKERS = DEFAULT_POOL_SIZE
+
+# DELETE results that mean the object is gone (202: AWX deletes it in the background)
+DELETE_OK_STATUSES = (202, 204, 404)
+
+# Seconds to wait for AWX to finish an asynchronous delete
+DELETE_TIMEOUT = 300
 
-# Suppress SSL warnings for localhost
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Project sync policies:
+#   always   - AWX syncs the project before every job launch
+#   cache    - AWX syncs on launch unless the last sync is younger than the cache timeout
+#   revision - no sync on launch; sync_project() syncs only when the branch head has moved
+SYNC_POLICIES = ('always', 'cache', 'revision')
+DEFAULT_SYNC_POLICY = 'revision'
+
+# Seconds a successful sync is reused under the cache policy (scm_update_cache_timeout)
+DEFAULT_SYNC_CACHE_TIMEOUT = 300
+
+# Seconds to wait for `git ls-remote` when checking the branch head
+LS_REMOTE_TIMEOUT = 30
+
+
+def encode_variables(data):
+    """Return a create payload with a variables dict turned into the JSON string AWX stores"""
+    if isinstance(data.get('variables'), dict):
+        data = {**data, 'variables': json.dumps(data['variables'])}
+    return data
 
-# Request timeout in seconds
-REQUEST_TIMEOUT = 30
 
 class AWXInventoryManager:
-    def __init__(self):
-        # Set up authentication token
-        self.token = self._get_token()
+    def __init__(self, base_url='https://localhost', token=None, pool_size=DEFAULT_POOL_SIZE,
+                 events=None, token_provider=None, rate_limit=None):
+        # Set up authentication token: AWX_TOKEN, the credentials file, the
+        # token cache or (last) the cluster secret; refreshed on 401
+        self.token_provider = token_provider or TokenProvider(token=token)
+        self.token = self.token_provider.get()
 
         # Store connection details
-        self.base_url = 'https://localhost'
-
-    def _make_request(self, method, url, timeout=REQUEST_TIMEOUT, **kwargs):
-        """Make HTTP request with timeout"""
-        kwargs.setdefault('verify', False)
-        return requests.request(method, url, timeout=timeout, **kwargs)
-
-    def _get_token(self):
-        result = subprocess.run([
-            'kubectl', 'get', 'secret', 'awx-admin-password', 
-            '-n', 'awx', '-o', 'jsonpath={.data.password}'
-        ], capture_output=True, text=True, check=True)
-        return subprocess.run(['base64', '-d'],
-                            input=result.stdout,
-                            capture_output=True, text=True, check=True).stdout.strip()
-
-    def create_inventory(self, name="WSL Lab"):
-        """Create or get existing inventory"""
+        self.base_url = base_url
+
+        # One pooled, retrying client behind every AWX call
+        self.client = AWXClient(self.base_url, self.token, pool_size=pool_size,
+                                token_provider=self.token_provider, rate_limit=rate_limit)
+
+        # Waits on the unit IDs returned by launches; events is an optional
+        # status stream such as awx_waiter.WebsocketEvents
+        self.waiter = UnitWaiter(self.client, events=events)
+        self._project_updates = {}
+
+        # How projects are kept in sync with their branch (see SYNC_POLICIES);
+        # scm_clean False updates the existing checkout instead of re-cloning.
+        # Settled once by set_sync_policy(), so setup and reconcile agree
+        self.sync_policy = DEFAULT_SYNC_POLICY
+        self.sync_cache_timeout = DEFAULT_SYNC_CACHE_TIMEOUT
+        self.scm_clean = False
+        self._sync_policy_set = False
+
+        # Job launch, monitoring and output streaming
+        self.jobs = JobRunner(self)
+
+        # Name -> object indexes for this run, keyed by (endpoint, filters);
+        # _index holds complete listings, _found holds single-name lookups
+        self._index = {}
+        self._found = {}
+
+        # Whether /api/v2/bulk/ exists; probed on first use
+        self._bulk_supported = None
+
+        # Optional awx_snapshot.Snapshot answering lookups locally; refreshed
+        # incrementally on first use unless offline
+        self.snapshot = None
+        self.offline = False
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time one phase of a run and report it to the client's hooks that have on_phase
+
+        The request count is the client's total during the phase, so phases that
+        overlap (main() runs some side by side) also count each other's requests.
+        """
+        started = time.perf_counter()
+        before = self.client.request_count
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            for hook in self.client.hooks:
+                if hasattr(hook, 'on_phase'):
+                    hook.on_phase(name, time.perf_counter() - started,
+                                  self.client.request_count - before, ok)
+
+    def _make_request(self, method, url, **kwargs):
+        """Make HTTP request through the shared client"""
+        return self.client.request(method, url, **kwargs)
+
+    def iter_resources(self, endpoint, **filters):
+        """Yield objects from a list endpoint, filtered server-side, following `next` links"""
+        url = f"{endpoint}/"
+        params = {'page_size': PAGE_SIZE, **filters}
+        while url:
+            response = self._make_request('GET', url, params=params)
+            response.raise_for_status()
+            page = response.json()
+            yield from page['results']
+            # The next link already carries the query string
+            url = page.get('next')
+            params = None
+
+    def index_resources(self, endpoint, **filters):
+        """Fetch every match once and return a name -> object dict for this run"""
+        key = (endpoint, tuple(sorted(filters.items())))
+        if key not in self._index:
+            snapshot = self.snapshot and self.snapshot.ready(self, endpoint, filters)
+            if snapshot:
+                self._index[key] = snapshot.index(endpoint, **filters)
+            else:
+                self._index[key] = {obj['name']: obj
+                                    for obj in self.iter_resources(endpoint, **filters)}
+        return self._index[key]
+
+    def find_resource(self, endpoint, name, **filters):
+        """Return the object with this name (or None), asking the server only on a miss"""
+        key = (endpoint, tuple(sorted(filters.items())))
+        if key in self._index:
+            return self._index[key].get(name)
+        if (key, name) not in self._found:
+            snapshot = self.snapshot and self.snapshot.ready(self, endpoint, filters)
+            if snapshot:
+                self._found[(key, name)] = snapshot.find(endpoint, name, **filters)
+            else:
+                self._found[(key, name)] = next(
+                    self.iter_resources(endpoint, name=name, **filters), None)
+        return self._found[(key, name)]
+
+    def group_members(self, group):
+        """Return the host objects in a group"""
+        snapshot = self.snapshot and self.snapshot.ready(self, 'groups', {})
+        members = snapshot.members(group['id']) if snapshot else None
+        if members is None:
+            members = list(self.iter_resources(f"groups/{group['id']}/hosts"))
+        return members
+
+    def memberships_changed(self, group):
+        """Note that this run changed a group's hosts"""
+        if self.snapshot is not None:
+            self.snapshot.invalidate_members(group['id'])
+
+    def remember_resource(self, endpoint, obj, **filters):
+        """Record a created object so later lookups in this run see it"""
+        key = (endpoint, tuple(sorted(filters.items())))
+        self._found[(key, obj['name'])] = obj
+        if key in self._index:
+            self._index[key][obj['name']] = obj
+        if self.snapshot is not None:
+            self.snapshot.put(endpoint, obj)
+
+    def forget_resource(self, endpoint, name):
+        """Drop a deleted object from the run indexes for its endpoint"""
+        for (indexed_endpoint, _), objects in self._index.items():
+            if indexed_endpoint == endpoint:
+                objects.pop(name, None)
+        for key, found_name in list(self._found):
+            if key[0] == endpoint and found_name == name:
+                del self._found[(key, found_name)]
+        if self.snapshot is not None:
+            self.snapshot.remove(endpoint, name)
+
+    def create_inventory(self, name="WSL Lab", **fields):
+        """Create or get existing inventory; fields (e.g. variables) go into the create"""
         # First check if inventory already exists
         url = f"{self.base_url}/api/v2/inventories/"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-
-        # Get existing inventories
-        response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        inventories = response.json()
 
-        # Check if inventory already exists
-        for inv in inventories['results']:
-            if inv['name'] == name:
-                print(f"Using existing inventory: {inv['name']} (ID: {inv['id']})")
-                return inv
+        inv = self.find_resource('inventories', name)
+        if inv:
+            print(f"Using existing inventory: {inv['name']} (ID: {inv['id']})")
+            return inv
 
         # Create new inventory if it doesn't exist
         data = {
             'name': name,
             'description': 'WSL instances for automation',
-            'organization': 1
+            'organization': 1,
+            **fields
         }
-        response = requests.post(url, json=data, headers=headers,
-          verify=False, timeout=REQUEST_TIMEOUT)
+        response = self._make_request('POST', url, json=encode_variables(data))
         if response.status_code != 201:
             print(f"Error creating inventory: {response.status_code}")
             print(f"Response: {response.text}")
             return None
         inventory = response.json()
+        self.remember_resource('inventories', inventory)
         print(f"Inventory created: {inventory['name']} (ID: {inventory['id']})")
         return inventory
 
-    def create_group(self, inventory, group_name="all_servers"):
+    def create_group(self, inventory, group_name="all_servers", variables=None):
         """Create or get existing group in inventory"""
         url = f"{self.base_url}/api/v2/groups/"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-
-        # Check if group already exists
-        response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        groups = response.json()
 
         # Check if group already exists in this inventory
-        for grp in groups['results']:
-            if grp['name'] == group_name and grp['inventory'] == inventory['id']:
-                print(f"Using existing group: {grp['name']} (ID: {grp['id']})")
-                return grp
+        grp = self.find_resource('groups', group_name, inventory=inventory['id'])
+        if grp:
+            print(f"Using existing group: {grp['name']} (ID: {grp['id']})")
+            return grp
 
         # Create new group if it doesn't exist
         data = {
             'name': group_name,
             'inventory': inventory['id']
         }
-        response = requests.post(url, json=data, headers=headers,
-          verify=False, timeout=REQUEST_TIMEOUT)
+        if variables:
+            data['variables'] = json.dumps(variables)
+        response = self._make_request('POST', url, json=data)
         response.raise_for_status()
         group = response.json()
+        self.remember_resource('groups', group, inventory=inventory['id'])
         print(f"Group created: {group['name']} (ID: {group['id']})")
         return group
 
-    def add_hosts(self, inventory, config):
-        """Add hosts to inventory"""
-        hosts = []
-        url = f"{self.base_url}/api/v2/hosts/"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
+    def supports_bulk(self):
+        """Check once whether this AWX exposes /api/v2/bulk/ (AWX 22+)"""
+        if self._bulk_supported is None and self.offline:
+            # Estimates only; current AWX versions all have it
+            return True
+        if self._bulk_supported is None:
+            response = self._make_request('GET', 'bulk/')
+            self._bulk_supported = response.status_code == 200
+        return self._bulk_supported
+
+    def host_create_calls(self, count):
+        """Number of requests create_hosts needs for this many hosts"""
+        if count and self.supports_bulk():
+            return math.ceil(count / BULK_HOST_CHUNK)
+        return count
+
+    @staticmethod
+    def _host_data(host_name, host_vars):
+        """Build the create payload for one host from its variables (or just its SSH port)"""
+        if isinstance(host_vars, dict):
+            return {'name': host_name, 'variables': json.dumps(host_vars)}
+        port = host_vars
+        return {
+            'name': host_name,
+            'variables': json.dumps({
+                'ansible_host': '172.22.192.129',
+                'ansible_port': port,
+                'ansible_user': 'daniv'
+            })
         }
 
-        # Get existing hosts first
-        response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        existing_hosts = response.json()
+    def register_hosts(self, inventory, config, workers=DEFAULT_WORKERS):
+        """Create missing hosts in bulk (or in parallel) and return a summary
+
+        config maps host names to their variables, or to an SSH port for the
+        default WSL host variables.
+        """
+        summary = {'hosts': [], 'created': [], 'existing': [], 'failed': {}}
 
-        for host_name, port in config.items():
-            # Check if host already exists
-            existing_host = None
-            for host in existing_hosts['results']:
-                if host['name'] == host_name and host['inventory'] == inventory['id']:
-                    existing_host = host
-                    break
+        # Index this inventory's hosts once; cost scales with the inventory, not AWX
+        existing_hosts = self.index_resources('hosts', inventory=inventory['id'])
 
+        missing = []
+        for host_name, host_vars in config.items():
+            existing_host = existing_hosts.get(host_name)
             if existing_host:
-                print(f"Using existing host: {existing_host['name']} (ID: {existing_host['id']})")
-                hosts.append(existing_host)
+                summary['hosts'].append(existing_host)
+                summary['existing'].append(host_name)
+            else:
+                missing.append(self._host_data(host_name, host_vars))
+
+        for host in self.create_hosts(inventory, missing, summary['failed'], workers=workers):
+            summary['hosts'].append(host)
+            summary['created'].append(host['name'])
+        return summary
+
+    def create_hosts(self, inventory, hosts_data, failed, workers=DEFAULT_WORKERS):
+        """Create hosts ({name, variables} dicts) in bulk when possible, else in parallel"""
+        if not hosts_data:
+            return []
+        if self.supports_bulk():
+            created = self._bulk_create_hosts(inventory, hosts_data, failed)
+        else:
+            created = self._parallel_create_hosts(inventory, hosts_data, workers, failed)
+        for host in created:
+            self.remember_resource('hosts', host, inventory=inventory['id'])
+        return created
+
+    def _bulk_create_hosts(self, inventory, hosts_data, failed):
+        """Create hosts through /api/v2/bulk/host_create/ in chunks"""
+        created = []
+        for start in range(0, len(hosts_data), BULK_HOST_CHUNK):
+            chunk = hosts_data[start:start + BULK_HOST_CHUNK]
+            data = {'inventory': inventory['id'], 'hosts': chunk}
+            response = self._make_request('POST', 'bulk/host_create/', json=data)
+            if response.status_code not in (200, 201):
+                # A bulk request is atomic, so the whole chunk failed
+                for host in chunk:
+                    failed[host['name']] = f"{response.status_code}: {response.text}"
                 continue
+            for host in response.json()['hosts']:
+                host.setdefault('inventory', inventory['id'])
+                created.append(host)
+        return created
+
+    def _parallel_create_hosts(self, inventory, hosts_data, workers, failed):
+        """Create hosts one POST each, spread over a bounded thread pool"""
+        def create(data):
+            return self._make_request('POST', 'hosts/',
+                                      json={**data, 'inventory': inventory['id']})
+
+        created = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(create, data): data['name'] for data in hosts_data}
+            for future in as_completed(futures):
+                host_name = futures[future]
+                try:
+                    response = future.result()
+                except OSError as error:
+                    failed[host_name] = str(error)
+                    continue
+                if response.status_code != 201:
+                    failed[host_name] = f"{response.status_code}: {response.text}"
+                    continue
+                created.append(response.json())
+        return created
+
+    def add_hosts(self, inventory, config, workers=DEFAULT_WORKERS):
+        """Add hosts to inventory"""
+        summary = self.register_hosts(inventory, config, workers=workers)
+        for host in summary['hosts']:
+            if host['name'] in summary['existing']:
+                print(f"Using existing host: {host['name']} (ID: {host['id']})")
+            else:
+                print(f"Host created: {host['name']} (ID: {host['id']})")
+        self._print_summary("Hosts", summary)
+        return summary['hosts']
 
-            # Create new host
-            data = {
-                'name': host_name,
-                'inventory': inventory['id'],
-                'variables': json.dumps({
-                    'ansible_host': '172.22.192.129',
-                    'ansible_port': port,
-                    'ansible_user': 'daniv'
-                })
-            }
-            response = requests.post(url, json=data, headers=headers,
-              verify=False, timeout=REQUEST_TIMEOUT)
-            if response.status_code != 201:
-                print(f"Error creating host {host_name}: {response.status_code}")
-                print(f"Response: {response.text}")
-                continue
-            host = response.json()
-            hosts.append(host)
-            print(f"Host created: {host['name']} (ID: {host['id']})")
-        return hosts
-
-    def add_hosts_to_group(self, group, hosts):
-        """Add hosts to group"""
-        url = f"{self.base_url}/api/v2/groups/{group['id']}/hosts/"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
+    def add_hosts_to_group(self, group, hosts, workers=DEFAULT_WORKERS):
+        """Add hosts to group, skipping existing members"""
+        url = f"groups/{group['id']}/hosts/"
+        summary = {'added': [], 'existing': [], 'failed': {}}
+
+        members = {host['id'] for host in self.group_members(group)}
+        pending = []
         for host in hosts:
-            data = {'id': host['id']}
-            response = requests.post(url, json=data, headers=headers,
-              verify=False, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            print(f"Added {host['name']} to group {group['name']}")
+            if host['id'] in members:
+                summary['existing'].append(host['name'])
+            else:
+                pending.append(host)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._make_request, 'POST', url, json={'id': host['id']}):
+                       host['name'] for host in pending}
+            for future in as_completed(futures):
+                host_name = futures[future]
+                try:
+                    response = future.result()
+                except OSError as error:
+                    summary['failed'][host_name] = str(error)
+                    continue
+                if response.status_code not in (200, 204):
+                    summary['failed'][host_name] = f"{response.status_code}: {response.text}"
+                    continue
+                summary['added'].append(host_name)
+                print(f"Added {host_name} to group {group['name']}")
+        if summary['added']:
+            self.memberships_changed(group)
+        self._print_summary(f"Group {group['name']}", summary)
+        return summary
+
+    @staticmethod
+    def _print_summary(label, summary):
+        """Print counts for a batch operation followed by any per-item failures"""
+        counts = ', '.join(f"{len(summary[key])} {key}" for key in summary
+                           if key != 'hosts')
+        print(f"{label}: {counts}")
+        for name, error in sorted(summary['failed'].items()):
+            print(f"  Failed {name}: {error}")
+
+    def set_sync_policy(self, project=None, policy=None, cache_timeout=None, scm_clean=None):
+        """Settle the sync policy from a desired-state project; arguments given override it"""
+        project = project or {}
+        timeout = project.get('scm_update_cache_timeout') or 0
+        if policy is None and 'scm_update_on_launch' in project:
+            on_launch = project['scm_update_on_launch']
+            policy = 'revision' if not on_launch else 'cache' if timeout else 'always'
+        self.sync_policy = policy or DEFAULT_SYNC_POLICY
+        self.sync_cache_timeout = (cache_timeout if cache_timeout is not None
+                                   else timeout or DEFAULT_SYNC_CACHE_TIMEOUT)
+        self.scm_clean = project.get('scm_clean', False) if scm_clean is None else scm_clean
+        self._sync_policy_set = True
+
+    def desired_project(self, project):
+        """A desired-state project with the sync policy's fields, settling the policy if unset"""
+        if not project:
+            return project
+        if not self._sync_policy_set:
+            self.set_sync_policy(project)
+        return {**project, **self.project_sync_fields()}
+
+    def project_sync_fields(self):
+        """Project fields that implement the manager's sync policy"""
+        return {
+            'scm_update_on_launch': self.sync_policy != 'revision',
+            'scm_update_cache_timeout': (self.sync_cache_timeout if self.sync_policy == 'cache'
+                                         else 0),
+            'scm_clean': self.scm_clean,
+        }
 
     def create_project(self, name="WSL Automation", scm_type="git",
                       scm_url="https://github.com/cloud-plat-org/ansible-playbook-config-testing",
-                      scm_branch="main"): # CLPLAT-2230, main
-        """Create or get existing project"""
+                      scm_branch="main", **fields): # CLPLAT-2230, main
+        """Create or get existing project; fields override the create payload"""
         url = f"{self.base_url}/api/v2/projects/"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-
-        # Check if project already exists
-        response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        projects = response.json()
 
         # Check if project already exists
-        for proj in projects['results']:
-            if proj['name'] == name:
-                print(f"Using existing project: {proj['name']} (ID: {proj['id']})")
-                return proj
+        proj = self.find_resource('projects', name)
+        if proj:
+            print(f"Using existing project: {proj['name']} (ID: {proj['id']})")
+            self.apply_sync_policy(proj)
+            return proj
 
         # Create new project if it doesn't exist
         data = {
@@ -209,82 +468,164 @@ class AWXInventoryManager:
             'scm_type': scm_type,
             'scm_url': scm_url,
             'scm_branch': scm_branch,
-            'scm_update_on_launch': True,
-            'scm_clean': True
+            **self.project_sync_fields(),
+            **fields
         }
-        response = requests.post(url, json=data, headers=headers,
-          verify=False, timeout=REQUEST_TIMEOUT)
+        response = self._make_request('POST', url, json=data)
         if response.status_code != 201:
             print(f"Error creating project: {response.status_code}")
             print(f"Response: {response.text}")
             return None
         project = response.json()
+        self.remember_resource('projects', project)
         print(f"Project created: {project['name']} (ID: {project['id']})")
 
         # Update the project to sync the repository
         print("Updating project to sync repository...")
         url = f"{self.base_url}/api/v2/projects/{project['id']}/update/"
-        update_response = requests.post(url, json=data, headers=headers,
-         verify=False, timeout=REQUEST_TIMEOUT)
+        update_response = self._make_request('POST', url, json=data)
         if update_response.status_code == 202:
+            self._project_updates[project['id']] = update_response.json()['project_update']
             print("Project update started successfully")
         else:
             print(f"Warning: Project update failed: {update_response.status_code}")
 
         return project
 
-    def wait_for_project_update(self, project_id, timeout=300):
-        """Wait for project update to complete"""
-        url = f"{self.base_url}/api/v2/project_updates/"
-        headers = {'Authorization': f'Bearer {self.token}'}
-
-        print("Waiting for project update to complete...")
-        start_time = time.time()
+    def apply_sync_policy(self, project):
+        """PATCH an existing project's sync fields if they differ from the policy"""
+        fields = {key: value for key, value in self.project_sync_fields().items()
+                  if project.get(key) != value}
+        if not fields:
+            return True
+        response = self._make_request('PATCH', f"projects/{project['id']}/", json=fields)
+        if response.status_code != 200:
+            print(f"Warning: could not set the sync policy: {response.status_code}")
+            return False
+        project.update(response.json())
+        print(f"Project sync policy: {self.sync_policy} "
+              f"({', '.join(f'{key}={value}' for key, value in fields.items())})")
+        return True
+
+    @staticmethod
+    def remote_revision(scm_url, scm_branch=''):
+        """Return the commit the remote branch (or tag) points at, or None if unknown"""
+        ref = scm_branch or 'HEAD'
+        if len(ref) == 40 and all(char in '0123456789abcdef' for char in ref):
+            return ref
+        try:
+            completed = subprocess.run(['git', 'ls-remote', scm_url, ref], capture_output=True,
+                                       text=True, timeout=LS_REMOTE_TIMEOUT, check=False)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if completed.returncode != 0:
+            return None
+        refs = {}
+        for line in completed.stdout.splitlines():
+            commit, _, name = line.partition('\t')
+            refs[name] = commit
+        # Annotated tags list the tag object and (with ^{}) the commit it points at
+        for name in (f'refs/heads/{ref}', f'refs/tags/{ref}^{{}}', f'refs/tags/{ref}', ref):
+            if name in refs:
+                return refs[name]
+        return None
+
+    def _sync_skip_reason(self, project):
+        """Why the project needs no sync under the policy, or None if it does"""
+        last = (project.get('summary_fields') or {}).get('last_update') or {}
+        if last.get('status') != 'successful' or not project.get('scm_revision'):
+            return None
+        if self.sync_policy == 'cache':
+            updated = project.get('last_updated') or project.get('last_job_run')
+            if updated:
+                age = time.time() - datetime.fromisoformat(
+                    updated.replace('Z', '+00:00')).timestamp()
+                if age < self.sync_cache_timeout:
+                    return f"last synced {age:.0f}s ago (cache {self.sync_cache_timeout}s)"
+        elif self.sync_policy == 'revision':
+            head = self.remote_revision(project.get('scm_url', ''), project.get('scm_branch', ''))
+            if head and head == project['scm_revision']:
+                return f"already at {project.get('scm_branch') or 'HEAD'} {head[:8]}"
+        return None
+
+    def sync_project(self, name="WSL Automation", project_id=None, force=False,
+                     on_launch=False, out=None):
+        """Sync a project if its policy says so; return True once it is up to date
+
+        With on_launch, projects that AWX already syncs on launch are left to AWX.
+        """
+        if project_id is None:
+            project = self.find_resource('projects', name)
+            if not project:
+                print(f"Project '{name}' not found", file=out)
+                return False
+            project_id = project['id']
+        response = self._make_request('GET', f"projects/{project_id}/")
+        response.raise_for_status()
+        project = response.json()
+        if on_launch and project.get('scm_update_on_launch'):
+            return True
+
+        current = (project.get('summary_fields') or {}).get('current_update')
+        if current:
+            print(f"Project update {current['id']} already running", file=out)
+            return self.wait_for_project_update(project_id, update_id=current['id'], out=out)
+        if not force:
+            reason = self._sync_skip_reason(project)
+            if reason:
+                print(f"Project sync skipped: {reason}", file=out)
+                return True
+
+        response = self._make_request('POST', f"projects/{project_id}/update/")
+        if response.status_code != 202:
+            print(f"Error starting project update: {response.status_code}", file=out)
+            return False
+        update_id = response.json()['project_update']
+        self._project_updates[project_id] = update_id
+        print(f"Project update {update_id} started", file=out)
+        return self.wait_for_project_update(project_id, update_id=update_id, out=out)
 
-        while time.time() - start_time < timeout:
-            response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
+    def wait_for_project_update(self, project_id, timeout=300, update_id=None, out=None):
+        """Wait for project update to complete"""
+        update_id = update_id or self._project_updates.get(project_id)
+        if update_id is None:
+            # Follow the project's own latest update rather than scanning every update
+            response = self._make_request('GET', f"projects/{project_id}/")
             response.raise_for_status()
-            updates = response.json()
-
-            # Find the most recent update for this project
-            project_updates = [u for u in updates['results'] if u['project'] == project_id]
-            if project_updates:
-                latest_update = max(project_updates, key=lambda x: x['id'])
-                status = latest_update['status']
-
-                if status == 'successful':
-                    print("Project update completed successfully")
-                    return True
-                if status in ['failed', 'error', 'canceled']:
-                    print(f"Project update failed with status: {status}")
-                    return False
-                print(f"Project update status: {status}")
-
-            time.sleep(5)
-
-        print("Timeout waiting for project update")
+            summary = response.json().get('summary_fields', {})
+            latest = summary.get('current_update') or summary.get('last_update')
+            if not latest:
+                print("No project update found", file=out)
+                return False
+            update_id = latest['id']
+
+        def show(_kind, _unit_id, status):
+            if status not in TERMINAL_STATUSES:
+                print(f"Project update status: {status}", file=out)
+
+        print("Waiting for project update to complete...", file=out)
+        status = self.waiter.wait('project_updates', update_id, timeout=timeout, on_status=show)
+        if status == 'successful':
+            print("Project update completed successfully", file=out)
+            return True
+        if status is None:
+            print("Timeout waiting for project update", file=out)
+        else:
+            print(f"Project update failed with status: {status}", file=out)
         return False
 
     def create_job_template(self, project, inventory, name="WSL Service Management",
-                           playbook="playbooks/service_management.yml"):
-        """Create or get existing job template"""
+                           playbook="playbooks/service_management.yml", job_slice_count=1,
+                           **fields):
+        """Create or get existing job template; fields override the create payload"""
         url = f"{self.base_url}/api/v2/job_templates/"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-
-        # Check if job template already exists
-        response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        job_templates = response.json()
 
         # Check if job template already exists
-        for job_template in job_templates['results']:
-            if job_template['name'] == name:
-                print(f"Using existing job template: {job_template['name']} "
-                      f"(ID: {job_template['id']})")
-                return job_template
+        job_template = self.find_resource('job_templates', name)
+        if job_template:
+            print(f"Using existing job template: {job_template['name']} "
+                  f"(ID: {job_template['id']})")
+            return job_template
 
         # Create new job template if it doesn't exist
         data = {
@@ -298,198 +639,186 @@ class AWXInventoryManager:
             'become_enabled': True,
             'ask_variables_on_launch': True,
             'ask_inventory_on_launch': False,
-            'ask_credential_on_launch': True
+            'ask_credential_on_launch': True,
+            'ask_limit_on_launch': True,
+            # >1 splits each launch into parallel slices, one per subset of hosts
+            'job_slice_count': job_slice_count,
+            **fields
         }
-        response = requests.post(url, json=data, headers=headers,
-          verify=False, timeout=REQUEST_TIMEOUT)
+        response = self._make_request('POST', url, json=data)
         if response.status_code != 201:
             print(f"Error creating job template: {response.status_code}")
             print(f"Response: {response.text}")
             return None
         job_template = response.json()
+        self.remember_resource('job_templates', job_template)
         print(f"Job template created: {job_template['name']} (ID: {job_template['id']})")
         return job_template
 
+    def launch_job(self, template_name="WSL Service Management", extra_vars=None,
+                   limit=None, inventory_name=None, credentials=(DEFAULT_CREDENTIAL,)):
+        """Launch a job template; return ('jobs' or 'workflow_jobs', id), or None on failure
+
+        A sliced template launches a workflow job; monitor_job and get_job_output
+        take the returned pair and follow its slice jobs.
+        """
+        return self.jobs.launch(template_name, extra_vars=extra_vars, limit=limit,
+                                inventory_name=inventory_name, credentials=credentials,
+                                sync=True)
+
+    def monitor_job(self, job):
+        """Show job status and follow its output until it finishes (job ID or launched pair)"""
+        return self.jobs.monitor(job)
+
+    def get_job_output(self, job):
+        """Print a job's output so far (job ID or launched pair)"""
+        return self.jobs.output(job)
+
+    def _delete(self, path):
+        """Send one DELETE and return None on success or an error string"""
+        try:
+            response = self._make_request('DELETE', path)
+        except OSError as error:
+            return str(error)
+        # 404 means it is already gone, which is what we wanted
+        if response.status_code in DELETE_OK_STATUSES:
+            return None
+        return f"{response.status_code}: {response.text}"
+
+    def _delete_by_name(self, endpoint, name, label):
+        """Delete one object by name; return (deleted, error), error only if the delete failed"""
+        try:
+            obj = self.find_resource(endpoint, name)
+            if not obj:
+                print(f"{label} '{name}' not found")
+                return False, None
+            error = self._delete(f"{endpoint}/{obj['id']}/")
+            if not error:
+                self.forget_resource(endpoint, obj['name'])
+                print(f"Deleted {label.lower()}: {obj['name']}")
+                return True, None
+        except (ValueError, AttributeError, KeyError, OSError) as exc:
+            error = str(exc)
+        print(f"Error deleting {label.lower()}: {error}")
+        return False, error
+
     def delete_project(self, project_name="WSL Automation"):
         """Delete project by name"""
-        try:
-            url = f"{self.base_url}/api/v2/projects/"
-            headers = {'Authorization': f'Bearer {self.token}'}
-            response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            projects = response.json()
-
-            for proj in projects['results']:
-                if proj['name'] == project_name:
-                    delete_url = f"{self.base_url}/api/v2/projects/{proj['id']}/"
-                    requests.delete(delete_url, headers=headers, verify=False,
-                      timeout=REQUEST_TIMEOUT)
-                    print(f"Deleted project: {proj['name']}")
-                    return True
-            print(f"Project '{project_name}' not found")
-            return False
-        except (ValueError, AttributeError, KeyError, requests.RequestException) as error:
-            print(f"Error deleting project: {error}")
-            return False
+        return self._delete_by_name('projects', project_name, "Project")[0]
 
     def delete_job_template(self, template_name="WSL Service Management"):
         """Delete job template by name"""
-        try:
-            url = f"{self.base_url}/api/v2/job_templates/"
-            headers = {'Authorization': f'Bearer {self.token}'}
-            response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            job_templates = response.json()
-
-            for template in job_templates['results']:
-                if template['name'] == template_name:
-                    delete_url = f"{self.base_url}/api/v2/job_templates/{template['id']}/"
-                    requests.delete(delete_url, headers=headers,
-                      verify=False, timeout=REQUEST_TIMEOUT)
-                    print(f"Deleted job template: {template['name']}")
-                    return True
-            print(f"Job template '{template_name}' not found")
-            return False
-        except (ValueError, AttributeError, KeyError, requests.RequestException) as error:
-            print(f"Error deleting job template: {error}")
-            return False
+        return self._delete_by_name('job_templates', template_name, "Job template")[0]
+
+    def delete_objects(self, endpoint, objects, workers=DEFAULT_WORKERS):
+        """Delete objects in parallel and return {'deleted': [names], 'failed': {name: error}}"""
+        summary = {'deleted': [], 'failed': {}}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._delete, f"{endpoint}/{obj['id']}/"): obj['name']
+                       for obj in objects}
+            for future in as_completed(futures):
+                name = futures[future]
+                error = future.result()
+                if error:
+                    summary['failed'][name] = error
+                else:
+                    summary['deleted'].append(name)
+        for name in summary['deleted']:
+            self.forget_resource(endpoint, name)
+        return summary
+
+    def wait_for_deletion(self, path, timeout=DELETE_TIMEOUT):
+        """Poll an object AWX deletes asynchronously until it returns 404"""
+        delay = 0.5
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            response = self._make_request('GET', path)
+            if response.status_code == 404:
+                return True
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+        return False
 
-    def cleanup_all(self, inventory_name="WSL Lab", project_name="WSL Automation", 
-                   template_name="WSL Service Management"):
+    def delete_inventory(self, inventory_name="WSL Lab", cascade=True,
+                         workers=DEFAULT_WORKERS, timeout=DELETE_TIMEOUT):
+        """Delete an inventory and its contents; return {kind: {'deleted': n, 'failed': {}}}
+
+        With cascade=True one DELETE on the inventory is enough: AWX removes its
+        hosts and groups in the background and we poll until it is gone. With
+        cascade=False every page of hosts and groups is deleted explicitly first.
+        """
+        report = {}
+        inventory = self.find_resource('inventories', inventory_name)
+        if not inventory:
+            print("Inventory not found")
+            return report
+
+        for kind in ('hosts', 'groups'):
+            if cascade:
+                # One request to count what the cascade will take with it
+                response = self._make_request('GET', f"inventories/{inventory['id']}/{kind}/",
+                                              params={'page_size': 1})
+                response.raise_for_status()
+                report[kind] = {'deleted': response.json()['count'], 'failed': {}}
+            else:
+                # Walk every page before deleting, or page offsets shift under us
+                objects = list(self.iter_resources(f"inventories/{inventory['id']}/{kind}"))
+                summary = self.delete_objects(kind, objects, workers=workers)
+                report[kind] = {'deleted': len(summary['deleted']), 'failed': summary['failed']}
+
+        path = f"inventories/{inventory['id']}/"
+        error = self._delete(path)
+        if not error and not self.wait_for_deletion(path, timeout=timeout):
+            error = f"still pending deletion after {timeout}s"
+        if error:
+            report['inventories'] = {'deleted': 0, 'failed': {inventory['name']: error}}
+            if cascade:
+                # Cascaded hosts and groups are only gone once the inventory is
+                for kind in ('hosts', 'groups'):
+                    report[kind]['deleted'] = 0
+            return report
+
+        report['inventories'] = {'deleted': 1, 'failed': {}}
+        self.forget_resource('inventories', inventory['name'])
+        self._index = {key: objects for key, objects in self._index.items()
+                       if dict(key[1]).get('inventory') != inventory['id']}
+        print(f"Deleted inventory: {inventory['name']}")
+        return report
+
+    def cleanup_all(self, inventory_name="WSL Lab", project_name="WSL Automation",
+                   template_name="WSL Service Management", cascade=True,
+                   workers=DEFAULT_WORKERS):
         """Complete cleanup - deletes inventory, project, and job template"""
         print("Starting complete cleanup...")
+        report = {}
 
         # Delete job template first (depends on project)
         print("\n=== Deleting Job Template ===")
-        self.delete_job_template(template_name)
+        with self.phase('delete_job_template'):
+            deleted, error = self._delete_by_name('job_templates', template_name, "Job template")
+        report['job_templates'] = {'deleted': int(deleted),
+                                   'failed': {template_name: error} if error else {}}
 
         # Delete project (depends on inventory)
         print("\n=== Deleting Project ===")
-        self.delete_project(project_name)
+        with self.phase('delete_project'):
+            deleted, error = self._delete_by_name('projects', project_name, "Project")
+        report['projects'] = {'deleted': int(deleted),
+                              'failed': {project_name: error} if error else {}}
 
         # Delete inventory, hosts, and groups
         print("\n=== Deleting Inventory ===")
         try:
-            # Get inventory by name
-            url = f"{self.base_url}/api/v2/inventories/"
-            headers = {'Authorization': f'Bearer {self.token}'}
-            response = requests.get(url, headers=headers, verify=False, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            inventories = response.json()
-
-            inventory = None
-            for inv in inventories['results']:
-                if inv['name'] == inventory_name:
-                    inventory = inv
-                    break
-
-            if inventory:
-                # Delete all hosts in inventory
-                hosts_url = f"{self.base_url}/api/v2/inventories/{inventory['id']}/hosts/"
-                hosts_response = requests.get(hosts_url, headers=headers,
-                  verify=False, timeout=REQUEST_TIMEOUT)
-                hosts_response.raise_for_status()
-                hosts = hosts_response.json()
-
-                for host in hosts['results']:
-                    delete_url = f"{self.base_url}/api/v2/hosts/{host['id']}/"
-                    requests.delete(delete_url, headers=headers,
-                      verify=False, timeout=REQUEST_TIMEOUT)
-                    print(f"Deleted host: {host['name']}")
-
-                # Delete all groups in inventory
-                groups_url = f"{self.base_url}/api/v2/inventories/{inventory['id']}/groups/"
-                groups_response = requests.get(groups_url, headers=headers,
-                 verify=False, timeout=REQUEST_TIMEOUT)
-                groups_response.raise_for_status()
-                groups = groups_response.json()
-
-                for group in groups['results']:
-                    delete_url = f"{self.base_url}/api/v2/groups/{group['id']}/"
-                    requests.delete(delete_url, headers=headers, verify=False,
-                      timeout=REQUEST_TIMEOUT)
-                    print(f"Deleted group: {group['name']}")
-
-                # Delete inventory
-                delete_url = f"{self.base_url}/api/v2/inventories/{inventory['id']}/"
-                requests.delete(delete_url, headers=headers, verify=False,
-                  timeout=REQUEST_TIMEOUT)
-                print(f"Deleted inventory: {inventory['name']}")
-            else:
-                print("Inventory not found")
-        except (ValueError, AttributeError, KeyError) as error:
+            with self.phase('delete_inventory'):
+                report.update(self.delete_inventory(inventory_name, cascade=cascade,
+                                                    workers=workers))
+        except (ValueError, AttributeError, KeyError, OSError) as error:
             print(f"Cleanup error: {error}")
-        except LookupError:
-            print("Inventory not found or already deleted")
-        
-        print("\n=== Cleanup Complete! ===")
-
-def main():
-    """Main setup function"""
-    main_manager = AWXInventoryManager()
-
-    # Configuration
-    main_hosts_config = {
-        'ubuntuAWX': 2225,
-        'argo_cd_mgt': 2226, 
-        'wslkali1': 2224,
-        'wslubuntu1': 2223
-    }
-
-    print("Starting AWX Complete Setup...")
-
-    # Setup Inventory and Hosts
-    print("\n=== Setting up Inventory and Hosts ===")
-    inventory = main_manager.create_inventory()
-    group = main_manager.create_group(inventory)
-    hosts = main_manager.add_hosts(inventory, main_hosts_config)
-    main_manager.add_hosts_to_group(group, hosts)
-
-    # Setup Project
-    print("\n=== Setting up Project ===")
-    project = main_manager.create_project()
-
-    # Wait for project update to complete (if it was created)
-    if project and project.get('id'):
-        update_success = main_manager.wait_for_project_update(project['id'])
-        if not update_success:
-            print("Warning: Project update failed, job template creation may fail")
-
-    # Setup Job Template
-    print("\n=== Setting up Job Template ===")
-    job_template = main_manager.create_job_template(project=project, inventory=inventory)
-
-    print("\n=== Setup Complete! ===")
-    print(f"Inventory: {inventory['name']} (ID: {inventory['id']})")
-    print(f"Project: {project['name']} (ID: {project['id']})")
-    if job_template:
-        print(f"Job Template: {job_template['name']} (ID: {job_template['id']})")
-    else:
-        print("Job Template: Failed to create (project may need to sync first)")
-    print(f"Hosts: {', '.join([host['name'] for host in hosts])}")
-
-    return main_manager
-
-# Usage
-if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
-        # Interactive mode - make manager available globally
-        print("Starting interactive mode...")
-        print("Manager available as 'manager' variable")
-        print("Example: manager.cleanup_all()")
-
-        manager = AWXInventoryManager()
-        hosts_config = {
-            'ubuntuAWX': 2225,
-            'argo_cd_mgt': 2226, 
-            'wslkali1': 2224,
-            'wslubuntu1': 2223
-        }
 
-        # Make variables available in interactive mode
-        globals()['manager'] = manager
-        globals()['hosts_config'] = hosts_config
-
-    else:
-        # Normal execution
-        main()
+        print("\n=== Cleanup Complete! ===")
+        for kind, summary in report.items():
+            failed = f", {len(summary['failed'])} failed" if summary['failed'] else ""
+            print(f"{kind}: {summary['deleted']} deleted{failed}")
+            for name, error in sorted(summary['failed'].items()):
+                print(f"  Failed {name}: {error}")
+        return report
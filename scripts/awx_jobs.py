@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Launch, monitor and read AWX jobs through the inventory manager's client
+
+Replaces the per-call `awx` CLI invocations in awx-job-execution.sh. Job
+output is read from /api/v2/jobs/{id}/job_events/?counter__gt=N with a
+cursor, so every event is downloaded once and written out as it arrives;
+memory stays flat however long the job runs.
+
+A sliced template (job_slice_count > 1) launches a workflow job instead of
+a job. Launches are therefore (kind, id) pairs, written as a plain job ID or
+as workflow_jobs/ID on the command line; monitoring or reading a workflow
+job follows each of its slice jobs in turn.
+"""
+
+import json
+import sys
+import time
+from awx_waiter import TERMINAL_STATUSES
+
+# Job events per page when streaming output
+EVENT_PAGE_SIZE = 200
+
+# Credential ID of "WSL SSH KEY" (created manually in the AWX web UI)
+DEFAULT_CREDENTIAL = 9
+
+DEFAULT_TEMPLATE = "WSL Service Management"
+
+# Job events that carry a task result for one host
+RESULT_EVENTS = ('runner_on_ok', 'runner_on_failed', 'runner_on_unreachable')
+
+# Modules whose results report a service's systemd state
+SERVICE_ACTIONS = ('ansible.builtin.service', 'service', 'ansible.builtin.systemd', 'systemd',
+                   'ansible.builtin.systemd_service', 'systemd_service')
+
+# dji_administration's batched module: one result per host holding every service
+BATCH_SERVICE_ACTIONS = ('dji_ansible.dji_administration.services', 'services')
+
+
+def parse_unit(unit):
+    """Return (kind, id) for a (kind, id) pair, a job ID, or 'workflow_jobs/ID'"""
+    if isinstance(unit, (tuple, list)):
+        kind, unit_id = unit
+    else:
+        kind, _, unit_id = str(unit).strip('/').rpartition('/')
+    kind = kind or 'jobs'
+    if kind not in ('jobs', 'workflow_jobs') or not str(unit_id).isdigit():
+        raise ValueError(f"Not a job ID or workflow_jobs/ID: {unit}")
+    return kind, int(unit_id)
+
+
+def format_unit(unit):
+    """Command-line form of a launched unit: the job ID, or workflow_jobs/ID"""
+    kind, unit_id = parse_unit(unit)
+    return str(unit_id) if kind == 'jobs' else f"{kind}/{unit_id}"
+
+
+def event_outcomes(event):
+    """Return the per-host service results carried by a job event (empty if none)"""
+    if event.get('event') not in RESULT_EVENTS:
+        return []
+    data = event.get('event_data') or {}
+    res = data.get('res') or {}
+    host = event.get('host_name') or data.get('host')
+    failed = event['event'] != 'runner_on_ok'
+
+    if data.get('task_action') in BATCH_SERVICE_ACTIONS:
+        # The module fails as a whole when one service fails; each entry says which
+        entries = [(entry, entry.get('failed', failed)) for entry in res.get('results') or []]
+    elif data.get('task_action') in SERVICE_ACTIONS or 'status' in res:
+        entries = [({**res, 'name': res.get('name') or (data.get('task_args') or {}).get(
+            'name')}, failed)]
+    else:
+        return []
+
+    outcomes = []
+    for entry, entry_failed in entries:
+        status = entry.get('status') or {}
+        outcomes.append({
+            'host': host,
+            'service': entry.get('name'),
+            'state': entry.get('state'),
+            'changed': bool(entry.get('changed', event.get('changed'))),
+            'failed': entry_failed,
+            'active_state': status.get('ActiveState'),
+            'sub_state': status.get('SubState'),
+            'duration': data.get('duration'),
+        })
+    return outcomes
+
+
+class JobRunner:
+    def __init__(self, manager):
+        self.manager = manager
+        self.client = manager.client
+
+    def launch(self, template_name=DEFAULT_TEMPLATE, extra_vars=None, limit=None,
+               inventory_name=None, credentials=(DEFAULT_CREDENTIAL,), sync=False, **overrides):
+        """Launch a job template; return ('jobs' or 'workflow_jobs', id), or None on failure
+
+        With sync, the template's project is first brought up to date under the
+        manager's sync policy (unless AWX syncs it on launch itself).
+        """
+        template = self.manager.find_resource('job_templates', template_name)
+        if not template:
+            print(f"Job template '{template_name}' not found", file=sys.stderr)
+            return None
+        if sync:
+            self.sync_template_project(template)
+
+        data = dict(overrides)
+        if extra_vars:
+            data['extra_vars'] = extra_vars if isinstance(extra_vars, str) else json.dumps(
+                extra_vars)
+        if limit:
+            data['limit'] = limit
+        if credentials:
+            data['credentials'] = list(credentials)
+        if inventory_name:
+            inventory = self.manager.find_resource('inventories', inventory_name)
+            if not inventory:
+                print(f"Inventory '{inventory_name}' not found", file=sys.stderr)
+                return None
+            data['inventory'] = inventory['id']
+
+        response = self.client.post(f"job_templates/{template['id']}/launch/", json=data)
+        if response.status_code != 201:
+            print(f"Error launching job: {response.status_code}", file=sys.stderr)
+            print(f"Response: {response.text}", file=sys.stderr)
+            return None
+        launched = response.json()
+        # A sliced template (job_slice_count > 1) launches a workflow job of slices
+        if 'workflow_job' in launched:
+            return ('workflow_jobs', launched['workflow_job'])
+        return ('jobs', launched['job'])
+
+    def sync_template_project(self, template):
+        """Bring a template's project up to date before launching; False if that failed"""
+        if not template.get('project'):
+            return True
+        if self.manager.sync_project(project_id=template['project'], on_launch=True,
+                                     out=sys.stderr):
+            return True
+        print("Warning: project sync failed, launching with the last synced revision",
+              file=sys.stderr)
+        return False
+
+    def slice_jobs(self, workflow_job_id, wait=False):
+        """Return the job IDs of a sliced launch's workflow nodes
+
+        A node gets its job once the workflow starts it; with wait, poll until
+        every node has one (or the workflow job has finished).
+        """
+        waiter = self.manager.waiter
+        interval = waiter.min_interval
+        while True:
+            nodes = list(self.manager.iter_resources(
+                f"workflow_jobs/{workflow_job_id}/workflow_nodes"))
+            jobs = [node['summary_fields']['job']['id'] for node in nodes
+                    if (node.get('summary_fields') or {}).get('job')]
+            if not wait or len(jobs) == len(nodes) or self.status(
+                    workflow_job_id, 'workflow_jobs')['status'] in TERMINAL_STATUSES:
+                return jobs
+            time.sleep(interval)
+            interval = min(interval * waiter.backoff, waiter.max_interval)
+
+    def status(self, job_id, kind='jobs'):
+        """Return the job's (or workflow job's) id, status, started and finished fields"""
+        response = self.client.get(f"{kind}/{job_id}/")
+        response.raise_for_status()
+        job = response.json()
+        return {key: job.get(key) for key in ('id', 'status', 'started', 'finished')}
+
+    def events(self, job_id, after=0, **filters):
+        """Yield job events with counter > after, in counter order, one page at a time"""
+        path = f"jobs/{job_id}/job_events/"
+        params = {'counter__gt': after, 'order_by': 'counter', 'page_size': EVENT_PAGE_SIZE,
+                  **filters}
+        while path:
+            response = self.client.get(path, params=params)
+            response.raise_for_status()
+            page = response.json()
+            yield from page['results']
+            path, params = page.get('next'), None
+
+    def stream(self, job_id, out=sys.stdout, follow=True):
+        """Write job stdout as events arrive; return the job's final status
+
+        The cursor only moves over contiguous counters while the job is running,
+        because AWX may save event N+1 before event N.
+        """
+        waiter = self.manager.waiter
+        cursor = 0
+        interval = waiter.min_interval
+        while True:
+            response = self.client.get(f"jobs/{job_id}/")
+            response.raise_for_status()
+            job = response.json()
+            # Once AWX has saved every event, gaps are permanent and can be skipped
+            complete = job['status'] in TERMINAL_STATUSES and job.get(
+                'event_processing_finished', True)
+
+            progressed = False
+            for event in self.events(job_id, after=cursor):
+                if not complete and event['counter'] != cursor + 1:
+                    break
+                cursor = event['counter']
+                progressed = True
+                if event.get('stdout'):
+                    out.write(event['stdout'] + '\n')
+            out.flush()
+
+            if complete or not follow:
+                return job['status']
+            interval = (waiter.min_interval if progressed else
+                        min(interval * waiter.backoff, waiter.max_interval))
+            time.sleep(interval)
+
+    def monitor(self, unit, out=sys.stdout):
+        """Print the job's status, then follow its output until it finishes
+
+        unit is a job ID or a (kind, id) pair from launch(); a workflow job's
+        slice jobs are followed one after another.
+        """
+        kind, unit_id = parse_unit(unit)
+        print(json.dumps(self.status(unit_id, kind), indent=2), file=out)
+        if kind == 'workflow_jobs':
+            self._slices_output(unit_id, out, follow=True)
+            status = self.manager.waiter.wait('workflow_jobs', unit_id)
+            print(f"\nWorkflow job {unit_id} finished: {status}", file=out)
+            return status
+        print("\n=== Job Output ===", file=out)
+        status = self.stream(unit_id, out=out, follow=True)
+        print(f"\nJob {unit_id} finished: {status}", file=out)
+        return status
+
+    def output(self, unit, out=sys.stdout):
+        """Print the output saved so far for a job (or each slice of a workflow job)"""
+        kind, unit_id = parse_unit(unit)
+        if kind == 'workflow_jobs':
+            self._slices_output(unit_id, out, follow=False)
+            return self.status(unit_id, kind)['status']
+        return self.stream(unit_id, out=out, follow=False)
+
+    def _slices_output(self, workflow_job_id, out, follow):
+        """Write the output of each slice job of a workflow job, in slice order"""
+        for job_id in self.slice_jobs(workflow_job_id, wait=follow):
+            print(f"\n=== Slice Job {job_id} Output ===", file=out)
+            self.stream(job_id, out=out, follow=follow)
+
+    def service_outcomes(self, job_id):
+        """Yield the per-host service results of a finished job"""
+        for event in self.events(job_id, event__in=','.join(RESULT_EVENTS)):
+            yield from event_outcomes(event)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Request and phase metrics for AWX runs
+
+A Metrics object is a hook for AWXClient (every HTTP attempt) and for the
+manager's phases (inventory, hosts, project sync, job template, ...). Per
+endpoint it keeps a latency histogram, status-code counts, retries and
+bytes sent/received; per phase its wall time and request count.
+
+Exports:
+- JSON lines: one record per request attempt and per phase, written as they happen
+- Prometheus textfile (for node_exporter's textfile collector), written by export()
+- A summary table printed by print_summary()
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Histogram bucket upper bounds in seconds (Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Numeric path segments are collapsed so /hosts/12/ and /hosts/13/ share a series
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(url):
+    """Return the API path with IDs replaced, e.g. groups/{id}/hosts/"""
+    path = urlsplit(url).path
+    if path.startswith('/api/v2/'):
+        path = path[len('/api/v2/'):]
+    return ID_SEGMENT.sub('/{id}', '/' + path)[1:] or '/'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # The smallest value with at least `fraction` of the values at or below it
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class EndpointStats:
+    """Counters and latency histogram for one (method, endpoint)"""
+
+    def __init__(self):
+        self.statuses = {}
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latencies = []
+
+    def add(self, record):
+        status = str(record['status'] or 'error')
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.retries += int(record['retry'])
+        self.bytes_sent += record['bytes_sent']
+        self.bytes_received += record['bytes_received']
+        self.latencies.append(record['seconds'])
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if record['seconds'] <= bound:
+                self.buckets[index] += 1
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    @property
+    def errors(self):
+        return sum(n for status, n in self.statuses.items() if not status.startswith(('2', '3')))
+
+
+class Metrics:
+    def __init__(self, jsonl_file=None, prometheus_file=None):
+        self.jsonl_file = jsonl_file
+        self.prometheus_file = prometheus_file
+        self.endpoints = {}
+        self.phases = []
+        self._lock = threading.Lock()
+        self._jsonl = None
+        if jsonl_file:
+            # Kept open for the whole run; closed by export()
+            self._jsonl = open(jsonl_file, 'a', encoding='utf-8')  # pylint: disable=R1732
+
+    def on_request(self, record):
+        """AWXClient hook: one HTTP attempt finished (or raised)"""
+        record = dict(record, endpoint=endpoint_name(record['url']))
+        with self._lock:
+            key = (record['method'], record['endpoint'])
+            self.endpoints.setdefault(key, EndpointStats()).add(record)
+            self._write({'type': 'request', **record})
+
+    def on_phase(self, name, seconds, requests, ok):
+        """Manager hook: one phase of a run finished"""
+        with self._lock:
+            self.phases.append({'phase': name, 'seconds': seconds, 'requests': requests,
+                                'ok': ok})
+            self._write({'type': 'phase', 'time': time.time(), 'phase': name,
+                         'seconds': seconds, 'requests': requests, 'ok': ok})
+
+    def _write(self, record):
+        if self._jsonl:
+            self._jsonl.write(json.dumps(record) + '\n')
+            self._jsonl.flush()
+
+    def export(self):
+        """Write the Prometheus textfile (if configured) and close the JSON lines file"""
+        if self.prometheus_file:
+            # Write then rename, so the collector never reads a half-written file
+            temporary = f"{self.prometheus_file}.{os.getpid()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as handle:
+                handle.write(self.prometheus_text())
+            os.replace(temporary, self.prometheus_file)
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+
+    def prometheus_text(self):
+        """Render every series in the Prometheus text exposition format"""
+        lines = [
+            '# HELP awx_request_duration_seconds AWX API request latency',
+            '# TYPE awx_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            phases = list(self.phases)
+        for (method, endpoint), stats in endpoints:
+            labels = f'method="{method}",endpoint="{endpoint}"'
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                lines.append(f'awx_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                             f'{count}')
+            lines.append(f'awx_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                         f'{stats.count}')
+            lines.append(f'awx_request_duration_seconds_sum{{{labels}}} '
+                         f'{sum(stats.latencies):.6f}')
+            lines.append(f'awx_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+        counters = (
+            ('awx_requests_total', 'AWX API requests by status code',
+             lambda stats: [(f',status="{status}"', n) for status, n in
+                            sorted(stats.statuses.items())]),
+            ('awx_request_retries_total', 'AWX API requests that were retries',
+             lambda stats: [('', stats.retries)]),
+            ('awx_request_bytes_sent_total', 'Request body bytes sent to AWX',
+             lambda stats: [('', stats.bytes_sent)]),
+            ('awx_response_bytes_total', 'Response body bytes received from AWX',
+             lambda stats: [('', stats.bytes_received)]),
+        )
+        for name, description, samples in counters:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for (method, endpoint), stats in endpoints:
+                for extra, value in samples(stats):
+                    lines.append(f'{name}{{method="{method}",endpoint="{endpoint}"{extra}}} '
+                                 f'{value}')
+
+        # A phase can run more than once per process; one series per name, or the
+        # textfile collector rejects the whole file
+        totals = {}
+        for phase in phases:
+            total = totals.setdefault(phase['phase'], {'seconds': 0.0, 'requests': 0, 'runs': 0})
+            total['seconds'] += phase['seconds']
+            total['requests'] += phase['requests']
+            total['runs'] += 1
+        lines += ['# HELP awx_phase_duration_seconds Wall time of each run phase',
+                  '# TYPE awx_phase_duration_seconds summary']
+        for name, total in sorted(totals.items()):
+            lines.append(f'awx_phase_duration_seconds_sum{{phase="{name}"}} '
+                         f'{total["seconds"]:.6f}')
+            lines.append(f'awx_phase_duration_seconds_count{{phase="{name}"}} {total["runs"]}')
+        lines += ['# HELP awx_phase_requests Requests made during each run phase',
+                  '# TYPE awx_phase_requests gauge']
+        for name, total in sorted(totals.items()):
+            lines.append(f'awx_phase_requests{{phase="{name}"}} {total["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+    def print_summary(self):
+        """Print per-phase and per-endpoint tables, slowest endpoints first"""
+        with self._lock:
+            endpoints = list(self.endpoints.items())
+            phases = list(self.phases)
+
+        if phases:
+            print("\n=== Phases ===")
+            print(f"{'phase':<24} {'seconds':>9} {'requests':>9}")
+            for phase in phases:
+                failed = '' if phase['ok'] else '  (failed)'
+                print(f"{phase['phase']:<24} {phase['seconds']:>9.2f} "
+                      f"{phase['requests']:>9}{failed}")
+
+        print("\n=== AWX Requests ===")
+        print(f"{'method':<7} {'endpoint':<36} {'calls':>6} {'errors':>6} {'retries':>7} "
+              f"{'p50 ms':>7} {'p95 ms':>7} {'max ms':>7} {'total s':>8} {'KB in':>8}")
+        endpoints.sort(key=lambda item: sum(item[1].latencies), reverse=True)
+        for (method, endpoint), stats in endpoints:
+            print(f"{method:<7} {endpoint:<36} {stats.count:>6} {stats.errors:>6} "
+                  f"{stats.retries:>7} {percentile(stats.latencies, 0.5) * 1000:>7.1f} "
+                  f"{percentile(stats.latencies, 0.95) * 1000:>7.1f} "
+                  f"{max(stats.latencies) * 1000:>7.1f} {sum(stats.latencies):>8.2f} "
+                  f"{stats.bytes_received / 1024:>8.1f}")
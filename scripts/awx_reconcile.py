@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Declarative reconcile for AWX
+
+Loads the desired state (config/awx_state.yml plus the Ansible inventory it
+points at), reads the current AWX state once, and computes the minimal set of
+creates, PATCHes of changed fields, and deletes needed to converge. The plan
+can be printed without touching AWX (`--plan`) or applied.
+
+Group nesting in the Ansible inventory is flattened: every group becomes an
+AWX group holding its own direct hosts.
+"""
+
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from awx_client import DEFAULT_POOL_SIZE
+
+# Defaults resolved relative to the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATE_FILE = os.path.join(REPO_ROOT, 'config', 'awx_state.yml')
+DEFAULT_HOSTS_FILE = os.path.join(REPO_ROOT, 'inventory', 'wsl_instances.yml')
+
+# One planned API change; fields holds the payload for create/update
+Change = namedtuple('Change', 'action kind name fields')
+
+# Plan output prefix per action
+SYMBOLS = {'create': '+', 'update': '~', 'delete': '-', 'associate': '+',
+           'disassociate': '-', 'sync': '>'}
+
+
+class Ref:
+    """Placeholder for the ID of an object that is created earlier in the same plan"""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Ref) and (self.kind, self.name) == (other.kind, other.name)
+
+    def __hash__(self):
+        return hash((self.kind, self.name))
+
+    def __repr__(self):
+        return f"<{self.kind} {self.name}>"
+
+
+def load_yaml(stream):
+    """Parse YAML text or an open file; yaml is imported on first use to keep startup fast"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    return yaml.safe_load(stream)
+
+
+def load_inventory_file(path=DEFAULT_HOSTS_FILE):
+    """Parse an Ansible YAML inventory into inventory vars, groups and hosts"""
+    with open(path, encoding='utf-8') as handle:
+        data = load_yaml(handle) or {}
+
+    result = {'variables': {}, 'groups': {}, 'hosts': {}}
+
+    def walk(name, group):
+        group = group or {}
+        group_hosts = group.get('hosts') or {}
+        for host_name, host_vars in group_hosts.items():
+            result['hosts'].setdefault(host_name, {}).update(host_vars or {})
+        if name == 'all':
+            result['variables'].update(group.get('vars') or {})
+        else:
+            entry = result['groups'].setdefault(name, {'variables': {}, 'hosts': []})
+            entry['variables'].update(group.get('vars') or {})
+            entry['hosts'].extend(h for h in group_hosts if h not in entry['hosts'])
+        for child_name, child in (group.get('children') or {}).items():
+            walk(child_name, child)
+
+    for name, group in data.items():
+        walk(name, group)
+    return result
+
+
+def load_hosts_config(path=DEFAULT_HOSTS_FILE):
+    """Return the host -> SSH port map from the Ansible inventory"""
+    hosts = load_inventory_file(path)['hosts']
+    return {name: host_vars.get('ansible_port', 22) for name, host_vars in hosts.items()}
+
+
+def load_desired_state(path=DEFAULT_STATE_FILE):
+    """Load the desired-state file and the inventory it references"""
+    with open(path, encoding='utf-8') as handle:
+        state = load_yaml(handle) or {}
+
+    inventory = dict(state['inventory'])
+    source = os.path.join(os.path.dirname(os.path.abspath(path)), inventory.pop('source'))
+    parsed = load_inventory_file(source)
+    inventory['variables'] = parsed['variables']
+
+    return {
+        'inventory': inventory,
+        'groups': parsed['groups'],
+        'hosts': {name: {'variables': host_vars} for name, host_vars in parsed['hosts'].items()},
+        'project': state.get('project'),
+        'job_template': state.get('job_template'),
+    }
+
+
+def describe(change):
+    """One-line description of a planned change"""
+    if change.kind == 'membership':
+        group_name, host_name = change.name
+        return f"{change.action} {host_name} -> group {group_name}"
+    if change.action == 'update':
+        return f"update {change.kind} {change.name}: {', '.join(sorted(change.fields))}"
+    return f"{change.action} {change.kind} {change.name}"
+
+
+def parse_variables(text):
+    """AWX stores variables as a JSON or YAML string; return them as a dict"""
+    if isinstance(text, dict):
+        return text
+    if not text:
+        return {}
+    try:
+        return json.loads(text)
+    except ValueError:
+        return load_yaml(text) or {}
+
+
+def changed_fields(desired, current):
+    """Return only the desired fields whose value differs from the current object"""
+    changes = {}
+    for key, value in desired.items():
+        if key == 'name':
+            continue
+        if key == 'variables':
+            if parse_variables(current.get(key)) != value:
+                changes[key] = value
+        elif current.get(key) != value:
+            changes[key] = value
+    return changes
+
+
+class Reconciler:
+    def __init__(self, manager, desired):
+        self.manager = manager
+        self.desired = desired
+        self.current = None
+        self.read_requests = 0
+
+    def fetch(self):
+        """Read current AWX state once: a lookup per object plus paged hosts and groups"""
+        manager = self.manager
+        before = manager.client.request_count
+        desired = self.desired
+
+        inventory = manager.find_resource('inventories', desired['inventory']['name'])
+        current = {'inventory': inventory, 'groups': {}, 'hosts': {}, 'members': {},
+                   'project': None, 'job_template': None}
+        if inventory:
+            current['hosts'] = manager.index_resources('hosts', inventory=inventory['id'])
+            current['groups'] = manager.index_resources('groups', inventory=inventory['id'])
+            for group_name in desired['groups']:
+                group = current['groups'].get(group_name)
+                if group:
+                    current['members'][group_name] = {
+                        host['name'] for host in manager.group_members(group)}
+        if desired['project']:
+            current['project'] = manager.find_resource('projects', desired['project']['name'])
+        if desired['job_template']:
+            current['job_template'] = manager.find_resource(
+                'job_templates', desired['job_template']['name'])
+
+        self.current = current
+        self.read_requests = manager.client.request_count - before
+        return current
+
+    def plan(self):
+        """Compute the minimal list of changes, in the order they must be applied"""
+        if self.current is None:
+            self.fetch()
+        desired, current = self.desired, self.current
+        changes = []
+
+        inv_name = desired['inventory']['name']
+        inventory = current['inventory']
+        if inventory is None:
+            changes.append(Change('create', 'inventory', inv_name, desired['inventory']))
+        else:
+            fields = changed_fields(desired['inventory'], inventory)
+            if fields:
+                changes.append(Change('update', 'inventory', inv_name, fields))
+
+        for group_name, group in sorted(desired['groups'].items()):
+            existing = current['groups'].get(group_name)
+            if existing is None:
+                changes.append(Change('create', 'group', group_name,
+                                      {'variables': group['variables']}))
+            else:
+                fields = changed_fields({'variables': group['variables']}, existing)
+                if fields:
+                    changes.append(Change('update', 'group', group_name, fields))
+
+        for host_name, host in sorted(desired['hosts'].items()):
+            existing = current['hosts'].get(host_name)
+            if existing is None:
+                changes.append(Change('create', 'host', host_name, host))
+            else:
+                fields = changed_fields(host, existing)
+                if fields:
+                    changes.append(Change('update', 'host', host_name, fields))
+        deleted_hosts = sorted(set(current['hosts']) - set(desired['hosts']))
+        for host_name in deleted_hosts:
+            changes.append(Change('delete', 'host', host_name, None))
+
+        for group_name, group in sorted(desired['groups'].items()):
+            wanted = set(group['hosts'])
+            members = current['members'].get(group_name, set())
+            for host_name in sorted(wanted - members):
+                changes.append(Change('associate', 'membership', (group_name, host_name), None))
+            for host_name in sorted(members - wanted - set(deleted_hosts)):
+                changes.append(Change('disassociate', 'membership',
+                                      (group_name, host_name), None))
+        for group_name in sorted(set(current['groups']) - set(desired['groups'])):
+            changes.append(Change('delete', 'group', group_name, None))
+
+        changes.extend(self._plan_project())
+        changes.extend(self._plan_job_template())
+        return changes
+
+    def _plan_project(self):
+        desired = self.desired['project']
+        if not desired:
+            return []
+        project = self.current['project']
+        if project is None:
+            return [Change('create', 'project', desired['name'], desired),
+                    Change('sync', 'project', desired['name'], None)]
+        fields = changed_fields(desired, project)
+        return [Change('update', 'project', desired['name'], fields)] if fields else []
+
+    def _plan_job_template(self):
+        desired = self.desired['job_template']
+        if not desired:
+            return []
+        inventory, project = self.current['inventory'], self.current['project']
+        wanted = dict(desired)
+        wanted['inventory'] = (inventory['id'] if inventory
+                               else Ref('inventory', self.desired['inventory']['name']))
+        if self.desired['project']:
+            wanted['project'] = (project['id'] if project
+                                 else Ref('project', self.desired['project']['name']))
+        template = self.current['job_template']
+        if template is None:
+            return [Change('create', 'job_template', desired['name'], wanted)]
+        fields = changed_fields(wanted, template)
+        return [Change('update', 'job_template', desired['name'], fields)] if fields else []
+
+    def count_calls(self, changes):
+        """Number of API calls needed to apply the plan (excluding sync polling)"""
+        host_creates = sum(1 for c in changes if c.action == 'create' and c.kind == 'host')
+        calls = len(changes) - host_creates
+        return calls + self.manager.host_create_calls(host_creates)
+
+    def print_plan(self, changes):
+        """Print the diff and what applying it would cost"""
+        for change in changes:
+            print(f"{SYMBOLS[change.action]} {describe(change)}")
+
+        if not changes:
+            print(f"No changes. AWX matches the desired state "
+                  f"(read in {self.read_requests} requests)")
+            return
+        counts = {}
+        for change in changes:
+            counts[change.action] = counts.get(change.action, 0) + 1
+        summary = ', '.join(f"{count} {action}" for action, count in sorted(counts.items()))
+        print(f"Plan: {summary}")
+        print(f"API calls to apply: {self.count_calls(changes)} "
+              f"(current state read in {self.read_requests} requests)")
+
+    def apply(self, changes, workers=DEFAULT_POOL_SIZE):
+        """Apply a plan in order and return {'applied': n, 'failed': {description: error}}"""
+        manager = self.manager
+        result = {'applied': 0, 'failed': {}}
+        ids = {('inventory', self.desired['inventory']['name']):
+               self.current['inventory'] and self.current['inventory']['id']}
+        if self.current['project']:
+            ids[('project', self.current['project']['name'])] = self.current['project']['id']
+        groups = dict(self.current['groups'])
+        hosts = dict(self.current['hosts'])
+
+        def resolve(fields):
+            return {key: ids[(value.kind, value.name)] if isinstance(value, Ref) else value
+                    for key, value in fields.items()}
+
+        def payload(fields):
+            fields = resolve(fields)
+            if 'variables' in fields:
+                fields['variables'] = json.dumps(fields['variables'])
+            return fields
+
+        def record(change, response, expected, error=None):
+            if error is None and response.status_code in expected:
+                result['applied'] += 1
+                return True
+            result['failed'][describe(change)] = (error or
+                                                  f"{response.status_code}: {response.text}")
+            return False
+
+        def skip(skipped, reason):
+            for change in skipped:
+                result['failed'][describe(change)] = f"skipped: {reason}"
+
+        inventory = self.current['inventory']
+        by_phase = {}
+        for change in changes:
+            by_phase.setdefault((change.action, change.kind), []).append(change)
+
+        # Inventory first: everything else hangs off its ID
+        for change in by_phase.get(('create', 'inventory'), []):
+            response = manager.client.request('POST', 'inventories/', json=payload(change.fields))
+            if not record(change, response, (201,)):
+                # Everything after it hangs off the missing inventory's ID
+                skip(changes[changes.index(change) + 1:],
+                     f"inventory {change.name} was not created")
+                return result
+            inventory = response.json()
+            manager.remember_resource('inventories', inventory)
+            ids[('inventory', change.name)] = inventory['id']
+        for change in by_phase.get(('update', 'inventory'), []):
+            response = manager.client.request('PATCH', f"inventories/{inventory['id']}/",
+                                             json=payload(change.fields))
+            record(change, response, (200,))
+
+        for change in by_phase.get(('create', 'group'), []):
+            data = payload({**change.fields, 'name': change.name, 'inventory': inventory['id']})
+            response = manager.client.request('POST', 'groups/', json=data)
+            if record(change, response, (201,)):
+                groups[change.name] = response.json()
+                manager.remember_resource('groups', groups[change.name],
+                                          inventory=inventory['id'])
+
+        creates = by_phase.get(('create', 'host'), [])
+        if creates:
+            failed = {}
+            hosts_data = [payload({**c.fields, 'name': c.name}) for c in creates]
+            for host in manager.create_hosts(inventory, hosts_data, failed, workers=workers):
+                hosts[host['name']] = host
+                result['applied'] += 1
+            for change in creates:
+                if change.name in failed:
+                    result['failed'][describe(change)] = failed[change.name]
+
+        # Independent per-object calls run in parallel
+        calls = []
+        for change in by_phase.get(('update', 'group'), []):
+            calls.append((change, 'PATCH', f"groups/{groups[change.name]['id']}/",
+                          payload(change.fields), (200,)))
+        for change in by_phase.get(('update', 'host'), []):
+            calls.append((change, 'PATCH', f"hosts/{hosts[change.name]['id']}/",
+                          payload(change.fields), (200,)))
+        for change in by_phase.get(('delete', 'host'), []):
+            calls.append((change, 'DELETE', f"hosts/{hosts[change.name]['id']}/",
+                          None, (202, 204)))
+        for action in ('associate', 'disassociate'):
+            for change in by_phase.get((action, 'membership'), []):
+                group_name, host_name = change.name
+                if group_name not in groups or host_name not in hosts:
+                    result['failed'][describe(change)] = "group or host was not created"
+                    continue
+                data = {'id': hosts[host_name]['id']}
+                if action == 'disassociate':
+                    data['disassociate'] = True
+                calls.append((change, 'POST', f"groups/{groups[group_name]['id']}/hosts/",
+                              data, (200, 204)))
+                manager.memberships_changed(groups[group_name])
+        self._run_parallel(calls, workers, record)
+
+        # Group deletes last so memberships above never point at a removed group
+        group_deletes = [(change, 'DELETE', f"groups/{groups[change.name]['id']}/", None,
+                          (202, 204)) for change in by_phase.get(('delete', 'group'), [])]
+        self._run_parallel(group_deletes, workers, record)
+        for change in by_phase.get(('delete', 'host'), []):
+            manager.forget_resource('hosts', change.name)
+        for change in by_phase.get(('delete', 'group'), []):
+            manager.forget_resource('groups', change.name)
+
+        self._apply_project(by_phase, ids, payload, record, skip)
+        self._apply_job_template(by_phase, ids, payload, record, skip)
+        return result
+
+    def _apply_project(self, by_phase, ids, payload, record, skip):
+        manager = self.manager
+        project = self.current['project']
+        for change in by_phase.get(('create', 'project'), []):
+            response = manager.client.request('POST', 'projects/', json=payload(change.fields))
+            if not record(change, response, (201,)):
+                skip(by_phase.get(('update', 'project'), []) +
+                     by_phase.get(('sync', 'project'), []),
+                     f"project {change.name} was not created")
+                return
+            project = response.json()
+            manager.remember_resource('projects', project)
+            ids[('project', change.name)] = project['id']
+        for change in by_phase.get(('update', 'project'), []):
+            response = manager.client.request('PATCH', f"projects/{project['id']}/",
+                                             json=payload(change.fields))
+            record(change, response, (200,))
+        for change in by_phase.get(('sync', 'project'), []):
+            response = manager.client.request('POST', f"projects/{project['id']}/update/")
+            if record(change, response, (202,)):
+                # The job template's playbook is validated against the synced project
+                manager.wait_for_project_update(
+                    project['id'], update_id=response.json()['project_update'])
+
+    def _apply_job_template(self, by_phase, ids, payload, record, skip):
+        manager = self.manager
+        for change in (by_phase.get(('create', 'job_template'), []) +
+                       by_phase.get(('update', 'job_template'), [])):
+            # The inventory or project it points at may have failed to be created
+            missing = [value for value in change.fields.values()
+                       if isinstance(value, Ref) and ids.get((value.kind, value.name)) is None]
+            if missing:
+                skip([change], ', '.join(f"{ref.kind} {ref.name}" for ref in missing) +
+                     " was not created")
+            elif change.action == 'create':
+                response = manager.client.request('POST', 'job_templates/',
+                                                 json=payload(change.fields))
+                if record(change, response, (201,)):
+                    manager.remember_resource('job_templates', response.json())
+            else:
+                template = self.current['job_template']
+                response = manager.client.request('PATCH', f"job_templates/{template['id']}/",
+                                                 json=payload(change.fields))
+                record(change, response, (200,))
+
+    def _run_parallel(self, calls, workers, record):
+        """Send (change, method, path, json, expected) calls over a thread pool"""
+        if not calls:
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.manager.client.request, method, path, json=data):
+                       (change, expected) for change, method, path, data, expected in calls}
+            for future in as_completed(futures):
+                change, expected = futures[future]
+                try:
+                    response = future.result()
+                except OSError as error:
+                    record(change, None, expected, error=str(error))
+                else:
+                    record(change, response, expected)
+
+
+def reconcile(manager, state_file=DEFAULT_STATE_FILE, plan_only=False, failures=None):
+    """Plan (and unless plan_only, apply) the desired state; return the plan
+
+    failures, if given, is a dict that receives {change: error} for every
+    change that could not be applied.
+    """
+    desired = load_desired_state(state_file)
+    desired['project'] = manager.desired_project(desired['project'])
+    reconciler = Reconciler(manager, desired)
+    changes = reconciler.plan()
+    reconciler.print_plan(changes)
+    if plan_only or not changes:
+        return changes
+
+    before = manager.client.request_count
+    result = reconciler.apply(changes)
+    print(f"Applied {result['applied']} of {len(changes)} changes "
+          f"in {manager.client.request_count - before} requests")
+    for description, error in sorted(result['failed'].items()):
+        print(f"  Failed {description}: {error}")
+    if failures is not None:
+        failures.update(result['failed'])
+    return changes
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Command line for AWXInventoryManager: setup, reconcile, jobs, batches and cleanup
+
+Without options, main() creates what the desired-state file describes
+(inventory, groups, hosts, project and job template) as a task graph
+(awx_graph.TaskGraph), so host onboarding overlaps the project sync. The
+other options reconcile, launch and follow jobs, fan out batches, sync the
+project or query the local snapshot:
+
+    python3 scripts/awx_setup.py
+    python3 scripts/awx_setup.py --reconcile --plan
+    python3 -i scripts/awx_setup.py --interactive
+"""
+
+import argparse
+import atexit
+import os
+import sys
+from awx_auth import DEFAULT_CACHE_FILE, TokenProvider
+from awx_batch import (DEFAULT_LAUNCH_WORKERS, BatchLauncher, build_matrix, load_matrix,
+                       print_table)
+from awx_graph import TaskGraph
+from awx_inventory_manager import (DEFAULT_SYNC_CACHE_TIMEOUT, DEFAULT_SYNC_POLICY,
+                                   SYNC_POLICIES, AWXInventoryManager)
+from awx_jobs import DEFAULT_CREDENTIAL, format_unit, parse_unit
+from awx_metrics import Metrics
+from awx_reconcile import (DEFAULT_STATE_FILE, load_desired_state, load_hosts_config, load_yaml,
+                           reconcile)
+from awx_snapshot import Snapshot, add_snapshot_arguments, check_snapshot_arguments, run_snapshot
+from awx_waiter import WebsocketEvents
+
+
+def main(main_manager=None, state_file=DEFAULT_STATE_FILE):
+    """Main setup function
+
+    Creates what the desired-state file describes (the same payloads --reconcile
+    compares against), so a reconcile right after setup has nothing to change.
+    Runs as a task graph: inventory -> hosts and project -> project_sync run side
+    by side, and the job template is created once both branches are done.
+    """
+    if main_manager is None:
+        main_manager = AWXInventoryManager()
+
+    # Configuration
+    desired = load_desired_state(state_file)
+    desired['project'] = main_manager.desired_project(desired['project'])
+
+    print("Starting AWX Complete Setup...")
+
+    def setup_inventory(_results):
+        print("\n=== Setting up Inventory ===")
+        inventory = main_manager.create_inventory(**desired['inventory'])
+        if not inventory:
+            return None
+        groups = {name: main_manager.create_group(inventory, name, group['variables'])
+                  for name, group in desired['groups'].items()}
+        return inventory, groups
+
+    def setup_hosts(results):
+        print("\n=== Setting up Hosts ===")
+        inventory, groups = results['inventory']
+        hosts = main_manager.add_hosts(inventory, {name: host['variables'] for name, host
+                                                   in desired['hosts'].items()})
+        by_name = {host['name']: host for host in hosts}
+        for name, group in groups.items():
+            members = [by_name[host] for host in desired['groups'][name]['hosts']
+                       if host in by_name]
+            main_manager.add_hosts_to_group(group, members)
+        return hosts
+
+    def setup_project(_results):
+        print("\n=== Setting up Project ===")
+        return main_manager.create_project(**(desired['project'] or {}))
+
+    def sync_project(results):
+        # Wait for the project update the create (or update) started
+        if not main_manager.wait_for_project_update(results['project']['id']):
+            print("Warning: Project update failed, job template creation may fail")
+            return False
+        return True
+
+    def setup_job_template(results):
+        print("\n=== Setting up Job Template ===")
+        return main_manager.create_job_template(project=results['project'],
+                                                inventory=results['inventory'][0],
+                                                **(desired['job_template'] or {}))
+
+    graph = TaskGraph()
+    graph.add('inventory', setup_inventory)
+    graph.add('hosts', setup_hosts, after=('inventory',))
+    graph.add('project', setup_project)
+    graph.add('project_sync', sync_project, after=('project',))
+    graph.add('job_template', setup_job_template, after=('inventory', 'hosts', 'project_sync'))
+    graph.run(phase=main_manager.phase)
+
+    results = graph.results
+    inventory = (results.get('inventory') or (None, None))[0]
+    project = results.get('project')
+    job_template = results.get('job_template')
+    hosts = results.get('hosts') or []
+
+    print("\n=== Setup Complete! ===")
+    if inventory:
+        print(f"Inventory: {inventory['name']} (ID: {inventory['id']})")
+    if project:
+        print(f"Project: {project['name']} (ID: {project['id']})")
+    if job_template:
+        print(f"Job Template: {job_template['name']} (ID: {job_template['id']})")
+    else:
+        print("Job Template: Failed to create (project may need to sync first)")
+    print(f"Hosts: {', '.join([host['name'] for host in hosts])}")
+    graph.print_timeline()
+    stats = main_manager.client.stats()
+    print(f"API requests: {stats['requests']} (retries: {stats['retries']})")
+
+    return main_manager
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Set up, reconcile or clean up AWX resources")
+    parser.add_argument('--url', default=os.environ.get('AWX_HOST', 'https://localhost'),
+                        help="AWX base URL (default: $AWX_HOST or https://localhost)")
+    parser.add_argument('--interactive', action='store_true',
+                        help="create a manager and drop into the Python shell (use python3 -i)")
+    parser.add_argument('--reconcile', action='store_true',
+                        help="converge AWX to the desired-state file")
+    parser.add_argument('--plan', action='store_true',
+                        help="print the reconcile diff and its API cost without applying it")
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE,
+                        help="desired-state file for setup, --reconcile and --plan "
+                             "(default: config/awx_state.yml)")
+    parser.add_argument('--launch', action='store_true',
+                        help="launch the job template and print the job ID (workflow_jobs/ID "
+                             "for a sliced template)")
+    parser.add_argument('--monitor', nargs='?', const='launched', metavar='JOB_ID',
+                        help="show status and follow output of a job or workflow_jobs/ID "
+                             "(default: the one just launched)")
+    parser.add_argument('--output', metavar='JOB_ID',
+                        help="print a job's (or workflow_jobs/ID's) output so far")
+    parser.add_argument('--template', default="WSL Service Management",
+                        help="job template to launch")
+    parser.add_argument('--extra-vars', help="extra variables for --launch (JSON)")
+    parser.add_argument('--limit', action='append',
+                        help="host pattern for --launch; repeat to fan out with --batch")
+    parser.add_argument('--inventory', help="inventory name for --launch")
+    parser.add_argument('--credential', type=int, action='append',
+                        help=f"credential ID for --launch (default: {DEFAULT_CREDENTIAL})")
+    parser.add_argument('--batch', action='store_true',
+                        help="launch every --service x --service-state x --limit "
+                             "combination (or --matrix entries) and print an outcome table")
+    parser.add_argument('--service', action='append', help="service name for --batch")
+    parser.add_argument('--service-state', action='append',
+                        help="service state for --batch (default: restarted)")
+    parser.add_argument('--matrix', help="YAML list of {extra_vars, limit} entries for --batch")
+    parser.add_argument('--slices', type=int, help="set job_slice_count on the template "
+                                                   "before --batch")
+    parser.add_argument('--workers', type=int, default=DEFAULT_LAUNCH_WORKERS,
+                        help="concurrent launches for --batch")
+    parser.add_argument('--sync-project', nargs='?', const="WSL Automation", metavar='NAME',
+                        help="sync a project (default: WSL Automation) if its sync policy says "
+                             "it is out of date")
+    parser.add_argument('--force-sync', action='store_true',
+                        help="with --sync-project, sync even if the project looks current")
+    parser.add_argument('--sync-policy', choices=SYNC_POLICIES,
+                        help="always: AWX syncs on every launch; cache: AWX reuses a sync for "
+                             "--sync-cache-timeout seconds; revision: sync only when the branch "
+                             "head moved (default: from the --state project's fields, else "
+                             f"{DEFAULT_SYNC_POLICY})")
+    parser.add_argument('--sync-cache-timeout', type=int,
+                        help="seconds a sync is reused under the cache policy (default: the "
+                             "--state project's scm_update_cache_timeout, else "
+                             f"{DEFAULT_SYNC_CACHE_TIMEOUT})")
+    parser.add_argument('--scm-clean', action='store_true', default=None,
+                        help="re-clone the project on every sync instead of updating it")
+    add_snapshot_arguments(parser)
+    parser.add_argument('--events', action='store_true',
+                        help="wait on AWX websocket status events instead of polling "
+                             "(needs websocket-client)")
+    parser.add_argument('--metrics-jsonl', metavar='FILE',
+                        help="append one JSON line per AWX request and per phase to FILE")
+    parser.add_argument('--metrics-prom', metavar='FILE',
+                        help="write request and phase metrics as a Prometheus textfile at exit")
+    parser.add_argument('--metrics-summary', action='store_true',
+                        help="print per-phase and per-endpoint timing tables at exit")
+    parser.add_argument('--token-cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='FILE',
+                        default=os.environ.get('AWX_TOKEN_CACHE'),
+                        help="keep the cluster-read token in a 0600 file between runs "
+                             f"(default: {DEFAULT_CACHE_FILE}; env: AWX_TOKEN_CACHE)")
+    args = parser.parse_args(argv)
+    check_snapshot_arguments(parser, args)
+    return args
+
+
+def build_manager(args):
+    """Create a manager configured from command-line options"""
+    # Offline runs never send a request, so they need no token
+    provider = TokenProvider(token='' if args.offline else None, cache_file=args.token_cache)
+    try:
+        new_manager = AWXInventoryManager(base_url=args.url, token_provider=provider)
+    except LookupError as error:
+        sys.exit(str(error))
+    if args.snapshot:
+        new_manager.snapshot = Snapshot(args.snapshot, controller=args.url)
+        new_manager.offline = args.offline
+    if args.metrics_jsonl or args.metrics_prom or args.metrics_summary:
+        metrics = Metrics(jsonl_file=args.metrics_jsonl, prometheus_file=args.metrics_prom)
+        new_manager.client.hooks.append(metrics)
+        if args.metrics_summary:
+            atexit.register(metrics.print_summary)
+        atexit.register(metrics.export)
+    # One sync policy for setup, reconcile and --sync-project: the state file's,
+    # with the command line overriding it
+    try:
+        with open(args.state, encoding='utf-8') as handle:
+            project = (load_yaml(handle) or {}).get('project')
+    except OSError:
+        project = None
+    new_manager.set_sync_policy(project, args.sync_policy, args.sync_cache_timeout,
+                                args.scm_clean)
+    if args.events:
+        new_manager.waiter.events = WebsocketEvents(new_manager.base_url, new_manager.token)
+    return new_manager
+
+
+# Usage
+if __name__ == "__main__":
+    args = parse_args()
+    if args.interactive:
+        # Interactive mode - make manager available globally
+        print("Starting interactive mode...")
+        print("Manager available as 'manager' variable")
+        print("Example: manager.cleanup_all()")
+
+        manager = build_manager(args)
+        hosts_config = load_hosts_config()
+
+        # Make variables available in interactive mode
+        globals()['manager'] = manager
+        globals()['hosts_config'] = hosts_config
+
+    elif args.batch:
+        batch_manager = build_manager(args)
+        if args.matrix:
+            batch_matrix = load_matrix(args.matrix)
+        elif args.service:
+            batch_matrix = build_matrix(args.service, args.service_state or ['restarted'],
+                                        args.limit)
+        else:
+            sys.exit("--batch needs --service or --matrix")
+        launcher = BatchLauncher(batch_manager, args.template,
+                                 credentials=args.credential or (DEFAULT_CREDENTIAL,),
+                                 workers=args.workers)
+        print_table(launcher.run(batch_matrix, slices=args.slices))
+
+    elif args.refresh_snapshot or args.query:
+        sys.exit(run_snapshot(build_manager(args), args))
+
+    elif args.sync_project:
+        sync_manager = build_manager(args)
+        sync_target = sync_manager.find_resource('projects', args.sync_project)
+        if not sync_target:
+            sys.exit(f"Project '{args.sync_project}' not found")
+        sync_manager.apply_sync_policy(sync_target)
+        synced = sync_manager.sync_project(project_id=sync_target['id'], force=args.force_sync)
+        sys.exit(0 if synced else 1)
+
+    elif args.launch or args.monitor or args.output:
+        job_manager = build_manager(args)
+        job = output_job = None
+        try:
+            if args.monitor and args.monitor != 'launched':
+                job = parse_unit(args.monitor)
+            if args.output:
+                output_job = parse_unit(args.output)
+        except ValueError as error:
+            sys.exit(str(error))
+        if args.monitor and job is None and not args.launch:
+            sys.exit("--monitor needs a JOB_ID unless used with --launch")
+        if args.launch:
+            job = job_manager.launch_job(args.template, extra_vars=args.extra_vars,
+                                         limit=','.join(args.limit or []) or None,
+                                         inventory_name=args.inventory,
+                                         credentials=args.credential or (DEFAULT_CREDENTIAL,))
+            if job is None:
+                sys.exit(1)
+            print(format_unit(job))
+        if args.monitor:
+            final = job_manager.monitor_job(job)
+            sys.exit(0 if final == 'successful' else 1)
+        if args.output:
+            job_manager.get_job_output(output_job)
+
+    elif args.reconcile or args.plan:
+        reconcile(build_manager(args), args.state, plan_only=args.plan)
+
+    else:
+        # Normal execution
+        main(build_manager(args), args.state)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Local snapshot of AWX state with incremental refresh
+
+Keeps inventories, groups, hosts, group memberships, projects and job
+templates in a SQLite file so existence checks, reconcile planning and
+queries are local lookups. A refresh asks each collection for its newest
+object first (one request); only when that moved are the objects with
+modified__gt the stored high-water mark downloaded. Deletions show up as a
+count mismatch, and only then is that collection listed in full.
+
+Memberships are not covered by `modified`: they are fetched for groups the
+snapshot has not seen yet, and again for every group of an inventory that
+gained hosts or whose memberships this tool changed. Memberships edited
+outside these tools are picked up by a full refresh.
+
+The manager's lookups call ready(), which refreshes the snapshot once per
+run unless the manager is offline. The --snapshot, --refresh-snapshot,
+--offline and --query options of awx_setup.py are defined here.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_SNAPSHOT_FILE = '~/.cache/awx/snapshot.db'
+
+# Collections kept, with the field that scopes them to an inventory (if any)
+KINDS = {'inventories': None, 'groups': 'inventory', 'hosts': 'inventory', 'projects': None,
+         'job_templates': None}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    controller TEXT, kind TEXT, id INTEGER, name TEXT, parent INTEGER, modified TEXT, data TEXT,
+    PRIMARY KEY (controller, kind, id));
+CREATE INDEX IF NOT EXISTS objects_name ON objects (controller, kind, name, parent);
+CREATE TABLE IF NOT EXISTS members (
+    controller TEXT, group_id INTEGER, host_id INTEGER,
+    PRIMARY KEY (controller, group_id, host_id));
+CREATE TABLE IF NOT EXISTS member_groups (
+    controller TEXT, group_id INTEGER, PRIMARY KEY (controller, group_id));
+CREATE TABLE IF NOT EXISTS marks (
+    controller TEXT, kind TEXT, modified TEXT, refreshed REAL, PRIMARY KEY (controller, kind));
+"""
+
+
+class Snapshot:
+    def __init__(self, path=DEFAULT_SNAPSHOT_FILE, controller='https://localhost'):
+        self.path = os.path.expanduser(path)
+        self.controller = controller.rstrip('/')
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shared with the manager's worker threads; every access holds the lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Whether this run has refreshed (or, offline, decided not to); lookups
+        # from parallel setup tasks wait on _refresh_lock for the first refresh
+        self._ready = False
+        self._refresh_lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # -- refresh
+
+    def ready(self, manager, kind, filters):
+        """Return the snapshot if it can answer this lookup, refreshing it once per run"""
+        if not self.covers(kind, filters):
+            return None
+        if not self._ready:
+            with self._refresh_lock:
+                if not self._ready:
+                    if not manager.offline:
+                        refresh_snapshot(manager)
+                    self._ready = True
+        return self
+
+    def mark_ready(self):
+        """Note that the snapshot is up to date for the rest of this run"""
+        self._ready = True
+
+    def refresh(self, manager, full=False):
+        """Bring the snapshot up to date through the manager; return {kind: changed count}"""
+        changed = {}
+        new_hosts = set()
+        for kind in KINDS:
+            changed[kind] = self._refresh_kind(manager, kind, full, new_hosts)
+        changed['members'] = self._refresh_members(manager, full, new_hosts)
+        return changed
+
+    def _refresh_kind(self, manager, kind, full, new_hosts):
+        mark = self._mark(kind)
+        known = self._ids(kind)
+        if not full and mark:
+            # Newest object and total count in one request
+            response = manager.client.get(f"{kind}/", params={'page_size': 1,
+                                                              'order_by': '-modified'})
+            response.raise_for_status()
+            head = response.json()
+            newest = head['results'][0]['modified'] if head['results'] else mark
+            if newest == mark and head['count'] == len(known):
+                self._set_mark(kind, mark)
+                return 0
+            objects = list(manager.iter_resources(kind, modified__gt=mark, order_by='modified'))
+            self._store(kind, objects)
+            if head['count'] == len(self._ids(kind)):
+                new_hosts.update(obj['id'] for obj in objects if obj['id'] not in known)
+                self._set_mark(kind, max([mark] + [obj['modified'] for obj in objects]))
+                return len(objects)
+
+        # First refresh (or the collection was empty), --full, or something was deleted:
+        # list everything
+        objects = list(manager.iter_resources(kind))
+        self._store(kind, objects, replace=True)
+        new_hosts.update(obj['id'] for obj in objects if obj['id'] not in known)
+        marks = [obj['modified'] for obj in objects if obj.get('modified')]
+        self._set_mark(kind, max(marks) if marks else '')
+        return len(objects)
+
+    def _refresh_members(self, manager, full, new_hosts):
+        """Fetch members of groups whose membership is unknown or may have changed"""
+        with self._lock:
+            if full:
+                self._db.execute("DELETE FROM member_groups WHERE controller = ?",
+                                 (self.controller,))
+            if new_hosts:
+                # A new host may have been added to any group of its inventory
+                marks = ','.join('?' * len(new_hosts))
+                self._db.execute(
+                    f"DELETE FROM member_groups WHERE controller = ? AND group_id IN ("
+                    f"SELECT id FROM objects WHERE controller = ? AND kind = 'groups' AND "
+                    f"parent IN (SELECT DISTINCT parent FROM objects WHERE controller = ? AND "
+                    f"kind = 'hosts' AND id IN ({marks})))",
+                    (self.controller, self.controller, self.controller, *new_hosts))
+            stale = [row[0] for row in self._db.execute(
+                "SELECT id FROM objects WHERE controller = ? AND kind = 'groups' AND id NOT IN "
+                "(SELECT group_id FROM member_groups WHERE controller = ?)",
+                (self.controller, self.controller))]
+        for group_id in stale:
+            host_ids = [host['id'] for host in manager.iter_resources(f"groups/{group_id}/hosts")]
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM members WHERE controller = ? AND group_id = ?",
+                                 (self.controller, group_id))
+                self._db.executemany("INSERT OR IGNORE INTO members VALUES (?, ?, ?)",
+                                     [(self.controller, group_id, host_id)
+                                      for host_id in host_ids])
+                self._db.execute("INSERT OR IGNORE INTO member_groups VALUES (?, ?)",
+                                 (self.controller, group_id))
+        return len(stale)
+
+    def _mark(self, kind):
+        with self._lock:
+            row = self._db.execute("SELECT modified FROM marks WHERE controller = ? AND kind = ?",
+                                   (self.controller, kind)).fetchone()
+        return row[0] if row else None
+
+    def _set_mark(self, kind, modified):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO marks VALUES (?, ?, ?, ?)",
+                             (self.controller, kind, modified, time.time()))
+
+    def _ids(self, kind):
+        with self._lock:
+            return {row[0] for row in self._db.execute(
+                "SELECT id FROM objects WHERE controller = ? AND kind = ?",
+                (self.controller, kind))}
+
+    def _store(self, kind, objects, replace=False):
+        parent_field = KINDS[kind]
+        rows = [(self.controller, kind, obj['id'], obj['name'],
+                 obj.get(parent_field) if parent_field else None, obj.get('modified'),
+                 json.dumps(obj)) for obj in objects]
+        with self._lock, self._db:
+            if replace:
+                self._db.execute("DELETE FROM objects WHERE controller = ? AND kind = ?",
+                                 (self.controller, kind))
+            self._db.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 rows)
+            if replace and kind in ('hosts', 'groups'):
+                # Memberships of objects that are gone
+                column = 'host_id' if kind == 'hosts' else 'group_id'
+                self._db.execute(
+                    f"DELETE FROM members WHERE controller = ? AND {column} NOT IN "
+                    f"(SELECT id FROM objects WHERE controller = ? AND kind = ?)",
+                    (self.controller, self.controller, kind))
+
+    # -- lookups
+
+    def refreshed(self):
+        """Epoch seconds of the last refresh, or None if the snapshot is empty"""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(refreshed) FROM marks WHERE controller = ?",
+                                   (self.controller,)).fetchone()
+        return row[0]
+
+    def covers(self, kind, filters):
+        """Whether a lookup on kind with these list filters can be answered locally"""
+        return kind in KINDS and set(filters) <= ({KINDS[kind]} if KINDS[kind] else set())
+
+    def find(self, kind, name, **filters):
+        """Return the object with this name (or None)"""
+        query = "SELECT data FROM objects WHERE controller = ? AND kind = ? AND name = ?"
+        params = [self.controller, kind, name]
+        if filters:
+            query += " AND parent = ?"
+            params.append(int(filters[KINDS[kind]]))
+        with self._lock:
+            row = self._db.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def index(self, kind, **filters):
+        """Return a name -> object dict"""
+        query = "SELECT data FROM objects WHERE controller = ? AND kind = ?"
+        params = [self.controller, kind]
+        if filters:
+            query += " AND parent = ?"
+            params.append(int(filters[KINDS[kind]]))
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+        objects = [json.loads(row[0]) for row in rows]
+        return {obj['name']: obj for obj in objects}
+
+    def objects(self, kind):
+        """Return every stored object of a kind, by name"""
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM objects WHERE controller = ? AND kind = ? "
+                                    "ORDER BY name, id", (self.controller, kind)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def members(self, group_id):
+        """Return the host objects in a group, or None if its membership is unknown"""
+        with self._lock:
+            if not self._db.execute(
+                    "SELECT 1 FROM member_groups WHERE controller = ? AND group_id = ?",
+                    (self.controller, group_id)).fetchone():
+                return None
+            rows = self._db.execute(
+                "SELECT data FROM objects JOIN members ON objects.id = members.host_id "
+                "AND objects.controller = members.controller WHERE objects.controller = ? "
+                "AND kind = 'hosts' AND group_id = ? ORDER BY name",
+                (self.controller, group_id)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # -- write-through from the manager
+
+    def put(self, kind, obj):
+        """Record an object this run created or changed"""
+        if kind in KINDS and 'id' in obj and 'name' in obj:
+            self._store(kind, [obj])
+
+    def remove(self, kind, name):
+        """Drop objects this run deleted (a later refresh restores any namesake still there)"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM objects WHERE controller = ? AND kind = ? AND name = ?",
+                             (self.controller, kind, name))
+
+    def invalidate_members(self, group_id):
+        """Mark a group's membership as unknown so the next refresh reads it again"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM member_groups WHERE controller = ? AND group_id = ?",
+                             (self.controller, group_id))
+
+
+def refresh_snapshot(manager, full=False):
+    """Bring the manager's snapshot up to date; return {kind: objects fetched}"""
+    before = manager.client.request_count
+    changed = manager.snapshot.refresh(manager, full=full)
+    manager.snapshot.mark_ready()
+    fetched = ', '.join(f"{kind} {count}" for kind, count in changed.items() if count)
+    print(f"Snapshot {'rebuilt' if full else 'refreshed'} in "
+          f"{manager.client.request_count - before} requests ({fetched or 'no changes'})",
+          file=sys.stderr)
+    return changed
+
+
+def print_query(snapshot, kind, name=None):
+    """Print stored objects of a kind (or one of them in full, or a group's members)"""
+    refreshed = snapshot.refreshed()
+    if refreshed is None:
+        print("Snapshot is empty; run with --refresh-snapshot first")
+        return False
+    print(f"Snapshot of {snapshot.controller}, refreshed "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(refreshed))}")
+    inventories = {obj['id']: obj['name'] for obj in snapshot.objects('inventories')}
+
+    if kind == 'members':
+        groups = [group for group in snapshot.objects('groups') if group['name'] == name]
+        if not groups:
+            print(f"No group named {name}")
+            return False
+        for group in groups:
+            members = snapshot.members(group['id'])
+            label = f"{group['name']} ({inventories.get(group['inventory'], '?')})"
+            if members is None:
+                print(f"{label}: membership not loaded yet")
+                continue
+            print(f"{label}: {', '.join(host['name'] for host in members) or '(empty)'}")
+        return True
+
+    objects = snapshot.objects(kind)
+    if name is not None:
+        matches = [obj for obj in objects if obj['name'] == name]
+        for obj in matches:
+            print(json.dumps(obj, indent=2, sort_keys=True))
+        if not matches:
+            print(f"No {kind[:-1].replace('_', ' ')} named {name}")
+        return bool(matches)
+
+    for obj in objects:
+        parent = f"  inventory: {inventories.get(obj['inventory'], obj['inventory'])}" if (
+            KINDS[kind]) else ''
+        print(f"{obj['id']:>6}  {obj['name']:<32}{parent}")
+    print(f"{len(objects)} {kind}")
+    return True
+
+
+def add_snapshot_arguments(parser):
+    """Add the snapshot options to the inventory manager's parser"""
+    parser.add_argument('--snapshot', nargs='?', const=DEFAULT_SNAPSHOT_FILE, metavar='FILE',
+                        default=os.environ.get('AWX_SNAPSHOT'),
+                        help="answer lookups from a local snapshot, refreshed incrementally "
+                             f"(default: {DEFAULT_SNAPSHOT_FILE}; env: AWX_SNAPSHOT)")
+    parser.add_argument('--refresh-snapshot', nargs='?', const='incremental',
+                        choices=('incremental', 'full'),
+                        help="refresh the snapshot and exit (full: re-list everything)")
+    parser.add_argument('--offline', action='store_true',
+                        help="use the snapshot as is, without contacting AWX (--plan, --query)")
+    parser.add_argument('--query', nargs='+', metavar=('KIND', 'NAME'),
+                        help=f"show snapshot objects: KIND is one of {', '.join(KINDS)}, or "
+                             "'members GROUP'")
+
+
+def check_snapshot_arguments(parser, args):
+    """Validate the snapshot options; the snapshot options imply --snapshot"""
+    if (args.offline or args.query or args.refresh_snapshot) and not args.snapshot:
+        args.snapshot = DEFAULT_SNAPSHOT_FILE
+    if args.offline and not (args.plan or args.query):
+        parser.error("--offline works with --plan and --query only")
+    if args.query and (args.query[0] not in (*KINDS, 'members') or len(args.query) > 2 or (
+            args.query[0] == 'members' and len(args.query) != 2)):
+        parser.error(f"--query KIND [NAME] with KIND one of {', '.join(KINDS)}; "
+                     "or --query members GROUP")
+
+
+def run_snapshot(manager, args):
+    """Run --refresh-snapshot or --query; return the exit status"""
+    if args.refresh_snapshot:
+        refresh_snapshot(manager, full=args.refresh_snapshot == 'full')
+        return 0
+    if not args.offline:
+        refresh_snapshot(manager)
+    return 0 if print_query(manager.snapshot, *args.query) else 1
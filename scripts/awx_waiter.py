@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Wait for AWX units (project updates, jobs, workflow jobs) to finish
+
+Follows the specific unit IDs returned by a launch instead of scanning global
+lists. Polling backs off adaptively and batches every pending unit of a kind
+into one `?id__in=` request per round, so waiting on many units costs about
+the same as waiting on one. An optional event source (the AWX websocket, or
+any object with the same `messages()` interface such as a local stub) replaces
+polling with pushed status changes.
+"""
+
+import json
+import time
+
+# Unit statuses after which AWX will not change the status again
+TERMINAL_STATUSES = ('successful', 'failed', 'error', 'canceled')
+
+# Adaptive polling: start fast, slow down while nothing changes
+MIN_INTERVAL = 1.0
+MAX_INTERVAL = 15.0
+BACKOFF = 1.5
+
+# IDs per `id__in` request, kept well under URL length limits
+ID_BATCH = 100
+
+# Websocket message `type` -> API collection
+EVENT_KINDS = {'job': 'jobs', 'project_update': 'project_updates',
+               'workflow_job': 'workflow_jobs', 'inventory_update': 'inventory_updates'}
+
+
+class WebsocketEvents:
+    """Status-change stream from AWX's /websocket/ endpoint (needs websocket-client)"""
+
+    def __init__(self, base_url, token):
+        self.url = base_url.replace('https://', 'wss://').replace('http://', 'ws://')
+        self.url = f"{self.url}/websocket/"
+        self.token = token
+
+    def messages(self, idle_timeout=1.0):
+        """Yield status_changed messages; yield None whenever idle_timeout passes quietly"""
+        import websocket  # pylint: disable=import-outside-toplevel
+
+        try:
+            conn = websocket.create_connection(
+                self.url, header=[f"Authorization: Bearer {self.token}"],
+                sslopt={'cert_reqs': 0}, timeout=idle_timeout)
+        except websocket.WebSocketException as error:
+            raise OSError(str(error)) from error
+        try:
+            conn.send(json.dumps({'groups': {'jobs': ['status_changed']}}))
+            while True:
+                try:
+                    raw = conn.recv()
+                except websocket.WebSocketTimeoutException:
+                    yield None
+                    continue
+                except websocket.WebSocketException as error:
+                    raise OSError(str(error)) from error
+                message = json.loads(raw)
+                if 'unified_job_id' in message and 'status' in message:
+                    yield message
+        finally:
+            conn.close()
+
+
+class UnitWaiter:
+    def __init__(self, client, events=None, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, backoff=BACKOFF):
+        self.client = client
+        self.events = events
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+    def wait(self, kind, unit_id, timeout=300, on_status=None):
+        """Wait for one unit; return its final status, or None on timeout"""
+        return self.wait_all([(kind, unit_id)], timeout=timeout, on_status=on_status)[
+            (kind, unit_id)]
+
+    def wait_all(self, units, timeout=300, on_status=None):
+        """Wait for many (kind, id) units at once; return {(kind, id): status or None}
+
+        on_status(kind, unit_id, status) is called each time a unit's status changes.
+        """
+        statuses = {unit: None for unit in units}
+        deadline = time.time() + timeout
+
+        def update(unit, status):
+            if statuses[unit] == status:
+                return False
+            statuses[unit] = status
+            if on_status:
+                on_status(unit[0], unit[1], status)
+            return True
+
+        # One poll first: units may already be done before any event could arrive
+        self._poll(statuses, update)
+        if self.events is not None and not self._done(statuses):
+            try:
+                self._consume_events(statuses, update, deadline)
+            except (ImportError, OSError, ValueError) as error:
+                print(f"Event stream unavailable ({error}), falling back to polling")
+
+        interval = self.min_interval
+        while not self._done(statuses) and time.time() < deadline:
+            time.sleep(min(interval, max(deadline - time.time(), 0)))
+            changed = self._poll(statuses, update)
+            interval = self.min_interval if changed else min(interval * self.backoff,
+                                                             self.max_interval)
+
+        return {unit: status if status in TERMINAL_STATUSES else None
+                for unit, status in statuses.items()}
+
+    @staticmethod
+    def _done(statuses):
+        return all(status in TERMINAL_STATUSES for status in statuses.values())
+
+    def _poll(self, statuses, update):
+        """Refresh every pending unit with one request per kind and ID batch"""
+        pending = {}
+        for (kind, unit_id), status in statuses.items():
+            if status not in TERMINAL_STATUSES:
+                pending.setdefault(kind, []).append(unit_id)
+
+        changed = False
+        for kind, ids in pending.items():
+            for start in range(0, len(ids), ID_BATCH):
+                batch = ids[start:start + ID_BATCH]
+                if len(batch) == 1:
+                    response = self.client.get(f"{kind}/{batch[0]}/")
+                    response.raise_for_status()
+                    results = [response.json()]
+                else:
+                    response = self.client.get(f"{kind}/", params={
+                        'id__in': ','.join(str(i) for i in batch), 'page_size': len(batch)})
+                    response.raise_for_status()
+                    results = response.json()['results']
+                for unit in results:
+                    changed |= update((kind, unit['id']), unit['status'])
+        return changed
+
+    def _consume_events(self, statuses, update, deadline):
+        """Apply pushed status changes until every unit is terminal or time runs out"""
+        stream = self.events.messages()
+        subscribed = False
+        try:
+            for message in stream:
+                if not subscribed:
+                    # The first item arrives once the stream is subscribed; a unit that
+                    # finished between the first poll and then sends no event
+                    self._poll(statuses, update)
+                    subscribed = True
+                if message is not None:
+                    unit = (EVENT_KINDS.get(message.get('type')),
+                            int(message['unified_job_id']))
+                    if unit in statuses:
+                        update(unit, message['status'])
+                if self._done(statuses) or time.time() >= deadline:
+                    return
+        finally:
+            stream.close()
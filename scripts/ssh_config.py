@@ -1,21 +1,218 @@
 #!/usr/bin/env python3
+"""
+Set up SSH on WSL instances for AWX
+
+Single host (run inside the instance):
+    python3 ssh_config.py <hostname> <port>
+Every host in the inventory, concurrently (run from Windows or any WSL instance;
+commands go through `wsl.exe -d <distro> -u root`):
+    python3 ssh_config.py --fleet [--limit HOST ...] [--workers N]
+
+Every step checks first and only runs when needed: apt only when openssh-server
+is missing, sshd_config only when a setting differs, and ssh is restarted only
+when its config changed or it is not running. Each step's result and time are
+reported per host.
+"""
+
+import argparse
+import os
+import shlex
 import subprocess
 import sys
-import os
-if len(sys.argv) != 3:
-    print("Usage: python3 ssh_config.py <hostname> <port>")
-    sys.exit(1)
-hostname, port, user = sys.argv[1], sys.argv[2], os.environ.get('USER', 'daniv')
-print(f"Configuring SSH: {hostname}:{port}")
-for cmd in [
-    "sudo apt update -y && sudo apt install -y openssh-server",
-    f"sudo hostnamectl set-hostname {hostname}",
-    f"sudo sed -i 's/#Port 22/Port {port}/; s/#ListenAddress 0.0.0.0/ListenAddress 0.0.0.0/; s/#PubkeyAuthentication yes/PubkeyAuthentication yes/; s/#PermitRootLogin yes/PermitRootLogin no/' /etc/ssh/sshd_config",
-    "mkdir -p ~/.ssh && chmod 700 ~/.ssh",
-    f'echo "{user} ALL=(ALL) NOPASSWD: ALL" | sudo tee /etc/sudoers.d/{user}-nopasswd',
-    "sudo systemctl enable ssh && sudo systemctl restart ssh"
-]:
-    print(f"Running: {cmd}")
-    subprocess.run(cmd, shell=True, check=False)
-print(f"\nDone! Next: ssh-copy-id -i ~/.ssh/awx_wsl_key_traditional.pub "
-      f"-p {port} {user}@172.22.192.129")
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from awx_reconcile import DEFAULT_HOSTS_FILE, load_inventory_file
+
+# Hosts provisioned at once in --fleet mode
+DEFAULT_WORKERS = 4
+
+# Seconds one step may take (apt install on a fresh instance is the slow one)
+STEP_TIMEOUT = 900
+
+SSHD_CONFIG = '/etc/ssh/sshd_config'
+
+# check: exits 0 when the step is already done; apply: makes it so.
+# after: steps whose change forces this one to run even if its check passes.
+Step = namedtuple('Step', 'name check apply after')
+
+
+def build_steps(hostname, port, user):
+    """Return the provisioning steps for one host, in order"""
+    # (keyword, value, regex of the existing value to replace); only the IPv4
+    # ListenAddress line is touched so the IPv6 one is not turned into a duplicate
+    settings = [('Port', port, '.*'), ('ListenAddress', '0.0.0.0', r'0\.0\.0\.0'),
+                ('PubkeyAuthentication', 'yes', '.*'), ('PermitRootLogin', 'no', '.*')]
+    sudoers_line = f"{user} ALL=(ALL) NOPASSWD: ALL"
+    sudoers_file = f"/etc/sudoers.d/{user}-nopasswd"
+    ssh_dir = f'"$(getent passwd {shlex.quote(user)} | cut -d: -f6)/.ssh"'
+    return [
+        Step('openssh-server',
+             "dpkg-query -W -f='${Status}' openssh-server 2>/dev/null | grep -q 'ok installed'",
+             "apt-get update -q && DEBIAN_FRONTEND=noninteractive apt-get install -y -q "
+             "openssh-server", ()),
+        Step('hostname',
+             f'[ "$(hostname)" = {shlex.quote(hostname)} ]',
+             f"hostnamectl set-hostname {shlex.quote(hostname)}", ()),
+        Step('sshd_config',
+             ' && '.join(f"grep -qx '{key} {value}' {SSHD_CONFIG}" for key, value, _ in settings),
+             # Replace the commented or current setting, append it if absent, then validate
+             "sed -i -E '" + '; '.join(f's/^#?{key} {match}$/{key} {value}/'
+                                      for key, value, match in settings) + f"' {SSHD_CONFIG} && "
+             + ' && '.join(f"(grep -qx '{key} {value}' {SSHD_CONFIG} || "
+                           f"echo '{key} {value}' >> {SSHD_CONFIG})"
+                           for key, value, _ in settings)
+             + " && sshd -t", ()),
+        Step('ssh directory',
+             f'[ "$(stat -c %a:%U {ssh_dir} 2>/dev/null)" = 700:{user} ]',
+             f"install -d -m 700 -o {shlex.quote(user)} -g {shlex.quote(user)} {ssh_dir}", ()),
+        Step('sudoers',
+             f'[ "$(cat {sudoers_file} 2>/dev/null)" = {shlex.quote(sudoers_line)} ]',
+             f"echo {shlex.quote(sudoers_line)} > {sudoers_file} && chmod 440 {sudoers_file}",
+             ()),
+        Step('ssh service',
+             "systemctl is-enabled --quiet ssh && systemctl is-active --quiet ssh",
+             "systemctl enable ssh && systemctl restart ssh", ('sshd_config',)),
+    ]
+
+
+def root_command(command, distro=None, wsl='wsl.exe'):
+    """argv running a shell command as root here (sudo) or in another WSL distro"""
+    if distro is None:
+        return ['sudo', 'sh', '-c', command]
+    return [wsl, '-d', distro, '-u', 'root', '--', 'sh', '-c', command]
+
+
+def run(command, distro, wsl):
+    """Run a command as root; return (exit code, combined output)"""
+    try:
+        completed = subprocess.run(root_command(command, distro, wsl), capture_output=True,
+                                   text=True, timeout=STEP_TIMEOUT, check=False)
+    except (OSError, subprocess.TimeoutExpired) as error:
+        return 1, str(error)
+    return completed.returncode, (completed.stdout + completed.stderr).strip()
+
+
+def provision(hostname, port, user, distro=None, wsl='wsl.exe'):
+    """Run every step for one host; return a list of per-step results
+
+    A step's status is 'ok' (already done), 'changed', 'failed', or 'skipped'
+    when an earlier step failed.
+    """
+    results = []
+    changed = set()
+    failed = False
+    for step in build_steps(hostname, port, user):
+        result = {'host': hostname, 'step': step.name, 'status': 'skipped', 'seconds': 0.0,
+                  'output': ''}
+        results.append(result)
+        if failed:
+            continue
+        start = time.monotonic()
+        forced = changed.intersection(step.after)
+        code, output = (1, '') if forced else run(step.check, distro, wsl)
+        if code == 0:
+            result['status'] = 'ok'
+        else:
+            code, output = run(step.apply, distro, wsl)
+            result['status'] = 'changed' if code == 0 else 'failed'
+            result['output'] = output
+            if code == 0:
+                changed.add(step.name)
+            else:
+                failed = True
+        result['seconds'] = time.monotonic() - start
+    return results
+
+
+def print_results(results):
+    """Print one line per step"""
+    for result in results:
+        print(f"  {result['step']:<16} {result['status']:<8} "
+              f"{result['seconds']:>7.2f}s")
+        if result['status'] == 'failed' and result['output']:
+            for line in result['output'].splitlines()[-5:]:
+                print(f"      {line}")
+
+
+def fleet(inventory_file, limit=None, workers=DEFAULT_WORKERS, user=None, wsl='wsl.exe'):
+    """Provision every inventory host concurrently; return True if all succeeded"""
+    inventory = load_inventory_file(inventory_file)
+    hosts = {name: host_vars for name, host_vars in inventory['hosts'].items()
+             if not limit or name in limit}
+    if not hosts:
+        print("No hosts to configure")
+        return False
+    user = user or inventory['variables'].get('ansible_user') or os.environ.get('USER', 'daniv')
+
+    def one(name):
+        host_vars = hosts[name]
+        # The WSL distro defaults to the inventory host name
+        distro = host_vars.get('wsl_distro', name)
+        start = time.monotonic()
+        results = provision(name, host_vars.get('ansible_port', 22), user, distro, wsl)
+        return name, results, time.monotonic() - start
+
+    print(f"Configuring SSH on {len(hosts)} host(s), {workers} at a time")
+    start = time.monotonic()
+    summary = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for name, results, seconds in pool.map(one, sorted(hosts)):
+            print(f"\n{name} ({seconds:.1f}s)")
+            print_results(results)
+            summary.append((name, results, seconds))
+
+    print(f"\n{'host':<16} {'ok':>3} {'changed':>7} {'failed':>6} {'seconds':>8}")
+    all_ok = True
+    for name, results, seconds in summary:
+        counts = {status: sum(1 for r in results if r['status'] == status)
+                  for status in ('ok', 'changed', 'failed')}
+        all_ok = all_ok and not counts['failed']
+        print(f"{name:<16} {counts['ok']:>3} {counts['changed']:>7} {counts['failed']:>6} "
+              f"{seconds:>8.1f}")
+    print(f"Total: {time.monotonic() - start:.1f}s")
+
+    print("\nNext, copy the AWX key to each host:")
+    for name in sorted(hosts):
+        host_vars = hosts[name]
+        print(f"  ssh-copy-id -i ~/.ssh/awx_wsl_key_traditional.pub "
+              f"-p {host_vars.get('ansible_port', 22)} "
+              f"{user}@{host_vars.get('ansible_host', name)}")
+    return all_ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Set up SSH on this WSL instance, or on every "
+                                                 "instance in the inventory with --fleet")
+    parser.add_argument('hostname', nargs='?', help="hostname to set on this instance")
+    parser.add_argument('port', nargs='?', type=int, help="SSH port for this instance")
+    parser.add_argument('--fleet', action='store_true',
+                        help="configure every inventory host through wsl.exe, concurrently")
+    parser.add_argument('--inventory', default=DEFAULT_HOSTS_FILE,
+                        help="inventory with hosts and ansible_port (default: "
+                             "inventory/wsl_instances.yml)")
+    parser.add_argument('--limit', action='append', metavar='HOST',
+                        help="only these hosts (repeatable)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="hosts configured at once (default: 4)")
+    parser.add_argument('--user', help="login user (default: the inventory's ansible_user)")
+    parser.add_argument('--wsl', default='wsl.exe', help="wsl.exe to run commands with")
+    args = parser.parse_args(argv)
+    if not args.fleet and (args.hostname is None or args.port is None):
+        parser.error("give <hostname> <port>, or --fleet")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.fleet:
+        sys.exit(0 if fleet(args.inventory, args.limit, args.workers, args.user, args.wsl) else 1)
+
+    login_user = args.user or os.environ.get('USER', 'daniv')
+    print(f"Configuring SSH: {args.hostname}:{args.port}")
+    host_results = provision(args.hostname, args.port, login_user)
+    print_results(host_results)
+    if any(result['status'] == 'failed' for result in host_results):
+        sys.exit(1)
+    print(f"\nDone! Next: ssh-copy-id -i ~/.ssh/awx_wsl_key_traditional.pub "
+          f"-p {args.port} {login_user}@172.22.192.129")
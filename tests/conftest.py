@@ -0,0 +1,29 @@
+"""Make the scripts importable the way they import each other, and share a fake AWX"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'scripts'))
+
+from awx_fake import FakeAWX  # pylint: disable=wrong-import-position
+
+
+@pytest.fixture(name='fake')
+def fixture_fake():
+    """A fake AWX on a thread, with project syncs, jobs and deletes that finish quickly"""
+    server = FakeAWX(sync_seconds=0.05, job_seconds=0.1, delete_seconds=0.1).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(name='manager')
+def fixture_manager(fake):
+    """An inventory manager talking to the fake"""
+    from awx_inventory_manager import AWXInventoryManager  # pylint: disable=C0415
+
+    awx = AWXInventoryManager(base_url=fake.url, token=fake.token)
+    yield awx
+    awx.client.close()
@@ -0,0 +1,31 @@
+"""BatchLauncher against the fake AWX, with launches that fail"""
+
+from awx_batch import BatchLauncher, build_matrix, print_table
+from awx_reconcile import reconcile
+
+
+def test_failed_launches_isolated(fake, manager, monkeypatch, capsys):
+    reconcile(manager)
+    launch = manager.jobs.launch
+
+    def flaky(template_name, limit=None, **kwargs):
+        if limit == 'wslkali1':
+            raise OSError("connection reset")
+        return launch(template_name, limit=limit, **kwargs)
+    monkeypatch.setattr(manager.jobs, 'launch', flaky)
+    # The second launch request is refused outright
+    fake.errors[('POST', 'job_templates')] = [500]
+    matrix = build_matrix(['sshd'], ['started'], ['wslkali1', 'wslubuntu1', 'argo_cd_mgt'])
+
+    result = BatchLauncher(manager, workers=1).run(matrix, timeout=30)
+
+    assert result['failed_launches'] == 2
+    assert list(result['statuses'].values()) == ['successful']
+    failed = [row for row in result['rows'] if row['active_state'] == 'launch failed']
+    assert sorted(row['limit'] for row in failed) == ['wslkali1', 'wslubuntu1']
+    assert all(row['failed'] and row['job'] is None for row in failed)
+    launched = [row for row in result['rows'] if row['job']]
+    assert [(row['host'], row['failed']) for row in launched] == [('argo_cd_mgt', False)]
+
+    print_table(result)
+    assert "2 launches failed" in capsys.readouterr().out
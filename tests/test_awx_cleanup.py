@@ -0,0 +1,57 @@
+"""cleanup_all reports against the fake AWX"""
+
+import pytest
+
+from awx_reconcile import reconcile
+
+
+@pytest.fixture(name='lab')
+def fixture_lab(manager):
+    """The default desired state (WSL Lab, 4 hosts in all_servers) set up on the fake"""
+    reconcile(manager)
+    return manager
+
+
+def counts(report):
+    return {kind: summary['deleted'] for kind, summary in report.items()}
+
+
+def test_cascade_cleanup(fake, lab):
+    report = lab.cleanup_all()
+
+    assert counts(report) == {'job_templates': 1, 'projects': 1, 'hosts': 4, 'groups': 1,
+                              'inventories': 1}
+    assert not any(summary['failed'] for summary in report.values())
+    for collection in ('inventories', 'hosts', 'groups', 'projects', 'job_templates'):
+        assert not fake.data[collection]
+
+
+def test_explicit_cleanup(fake, lab):
+    report = lab.cleanup_all(cascade=False, workers=2)
+
+    assert counts(report) == {'job_templates': 1, 'projects': 1, 'hosts': 4, 'groups': 1,
+                              'inventories': 1}
+    assert not fake.data['hosts'] and not fake.data['inventories']
+
+
+def test_failures_are_reported(fake, lab):
+    fake.errors[('DELETE', 'projects')] = [409]
+    fake.errors[('DELETE', 'hosts')] = [500]
+
+    report = lab.cleanup_all(cascade=False)
+
+    # The failed project delete does not stop the rest of the teardown
+    assert report['job_templates'] == {'deleted': 1, 'failed': {}}
+    assert report['projects']['deleted'] == 0
+    assert report['projects']['failed']['WSL Automation'].startswith('409')
+    assert report['hosts']['deleted'] == 3
+    assert list(report['hosts']['failed'].values())[0].startswith('500')
+    assert report['inventories']['deleted'] == 1
+    assert list(fake.data['projects'].values())[0]['name'] == 'WSL Automation'
+
+
+def test_nothing_to_clean(manager):
+    report = manager.cleanup_all()
+
+    assert report == {'job_templates': {'deleted': 0, 'failed': {}},
+                      'projects': {'deleted': 0, 'failed': {}}}
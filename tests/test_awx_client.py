@@ -0,0 +1,104 @@
+"""AWXClient retries, POST safety and token refresh against the fake AWX"""
+
+import socket
+
+import pytest
+
+from awx_client import AWXClient
+from awx_fake import FakeAWX
+
+
+class StubProvider:
+    """Token provider that hands out one replacement token"""
+
+    def __init__(self, token):
+        self.token = token
+        self.rejected = []
+
+    def refresh(self, rejected):
+        self.rejected.append(rejected)
+        return self.token
+
+
+def make_client(url, token, **kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    return AWXClient(url, token, **kwargs)
+
+
+def test_get_retries_transient(fake):
+    fake.errors[('GET', 'inventories')] = [503, 502]
+    client = make_client(fake.url, fake.token)
+
+    response = client.get('inventories/')
+
+    assert response.status_code == 200
+    assert client.stats()['requests'] == 3 and client.stats()['retries'] == 2
+
+
+def test_retries_run_out(fake):
+    fake.errors[('GET', 'inventories')] = [504] * 5
+    client = make_client(fake.url, fake.token, retries=2)
+
+    assert client.get('inventories/').status_code == 504
+    assert client.request_count == 3
+
+
+def test_post_gateway_error(fake):
+    # A 502 may come back after AWX created the object: retrying could create it twice
+    fake.errors[('POST', 'inventories')] = [502]
+    client = make_client(fake.url, fake.token)
+
+    assert client.post('inventories/', json={'name': 'once'}).status_code == 502
+    assert client.request_count == 1
+
+
+def test_post_refused(fake):
+    fake.errors[('POST', 'inventories')] = [429, 503]
+    client = make_client(fake.url, fake.token)
+
+    assert client.post('inventories/', json={'name': 'once'}).status_code == 201
+    assert client.request_count == 3
+    assert [inv['name'] for inv in fake.data['inventories'].values()] == ['once']
+
+
+def test_post_read_timeout():
+    # The slow fake still creates the inventory after the client gave up waiting
+    slow = FakeAWX(latency=0.3).start()
+    try:
+        client = make_client(slow.url, slow.token, timeout=0.1)
+        with pytest.raises(OSError):
+            client.post('inventories/', json={'name': 'once'})
+        assert client.request_count == 1
+    finally:
+        slow.stop()
+
+
+def test_post_never_connected():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    client = make_client(f"http://127.0.0.1:{port}", 'token', retries=2)
+
+    with pytest.raises(OSError):
+        client.post('inventories/', json={'name': 'once'})
+    assert client.request_count == 3 and client.retry_count == 2
+
+
+def test_token_refreshed_once(fake):
+    provider = StubProvider(fake.token)
+    client = make_client(fake.url, 'stale', token_provider=provider)
+
+    assert client.get('inventories/').status_code == 200
+    assert client.get('inventories/').status_code == 200
+    assert provider.rejected == ['stale']
+    assert client.token == fake.token
+    assert client.request_count == 3
+
+
+def test_bad_replacement_token(fake):
+    provider = StubProvider('also-wrong')
+    client = make_client(fake.url, 'stale', token_provider=provider)
+
+    assert client.get('inventories/').status_code == 401
+    assert provider.rejected == ['stale']
+    assert client.request_count == 2
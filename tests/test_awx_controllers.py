@@ -0,0 +1,99 @@
+"""run_all against three fake AWX controllers, one of them with a token AWX rejects"""
+
+import pytest
+
+import awx_auth
+import awx_controllers
+from awx_client import AWXClient
+from awx_fake import FakeAWX
+
+TOKENS = {'lab': 'tok-lab', 'staging': 'tok-staging', 'broken': 'tok-broken'}
+
+
+@pytest.fixture(name='fleet')
+def fixture_fleet(monkeypatch):
+    """Three fakes and the controller list for them; 'broken' sends the wrong token"""
+    # The kubectl fallback must not find a real token for the broken controller
+    monkeypatch.setattr(awx_auth.TokenProvider, '_from_cluster', lambda self: None)
+    fakes = {name: FakeAWX(token=token, sync_seconds=0.05, job_seconds=0.1,
+                           delete_seconds=0.1).start()
+             for name, token in TOKENS.items()}
+    controllers = []
+    for name, fake in fakes.items():
+        env_var = f"{name.upper()}_TOKEN"
+        monkeypatch.setenv(env_var, 'tok-wrong' if name == 'broken' else TOKENS[name])
+        controllers.append({'name': name, 'url': fake.url, 'token_env': env_var,
+                            'namespace': 'nowhere'})
+    yield controllers, fakes
+    for fake in fakes.values():
+        fake.stop()
+
+
+def names(fake, collection):
+    return sorted(obj['name'] for obj in fake.data[collection].values())
+
+
+def rejected(result):
+    return result.startswith('error: 401')
+
+
+def check_rows(rows, action, good_result, broken_result=rejected):
+    """Rows in list order; lab and staging succeed, broken fails with its own result"""
+    assert [row['controller'] for row in rows] == ['lab', 'staging', 'broken']
+    for row in rows[:2]:
+        assert row['ok'], f"{action}: {row}"
+        assert good_result(row['result']), f"{action}: {row['result']}"
+        assert row['requests'] > 0
+    broken = rows[2]
+    assert not broken['ok']
+    assert broken_result(broken['result']), f"{action}: {broken['result']}"
+
+
+def test_controller_isolation(fleet, capsys):
+    controllers, fakes = fleet
+
+    rows = awx_controllers.run_all(controllers, 'setup')
+    check_rows(rows, 'setup', lambda result: result.startswith('job template'))
+    for name in ('lab', 'staging'):
+        fake = fakes[name]
+        assert names(fake, 'inventories') == ['WSL Lab']
+        assert names(fake, 'projects') == ['WSL Automation']
+        assert names(fake, 'job_templates') == ['WSL Service Management']
+        # Each controller's hosts once: nothing written twice or to the wrong fake
+        assert len(fake.data['hosts']) == 4
+    for collection in ('inventories', 'hosts', 'projects', 'job_templates'):
+        assert not fakes['broken'].data[collection]
+    output = capsys.readouterr().out
+    assert '[broken] ' in output and '[lab] ' in output and '[staging] ' in output
+
+    rows = awx_controllers.run_all(controllers, 'plan')
+    check_rows(rows, 'plan', lambda result: result == 'no changes')
+
+    # Drift on lab only: reconcile puts the host back there and leaves staging alone
+    host_id = min(fakes['lab'].data['hosts'])
+    client = AWXClient(fakes['lab'].url, TOKENS['lab'])
+    client.delete(f"hosts/{host_id}/").raise_for_status()
+    client.close()
+    staging_requests = fakes['staging'].request_count
+
+    rows = awx_controllers.run_all(controllers, 'reconcile')
+    check_rows(rows, 'reconcile', lambda result: True)
+    # Create the host, then put it back in its group
+    assert rows[0]['result'] == '2 of 2 change(s) applied'
+    assert rows[1]['result'] == 'no changes'
+    assert len(fakes['lab'].data['hosts']) == 4
+    assert fakes['staging'].request_count - staging_requests == rows[1]['requests']
+
+    rows = awx_controllers.run_all(controllers, 'cleanup')
+    # cleanup reports each rejected delete instead of stopping at the first
+    check_rows(rows, 'cleanup', lambda result: result.endswith('deleted, 0 failed'),
+               lambda result: result.startswith('0 deleted') and not result.endswith(' 0 failed'))
+    for name in ('lab', 'staging'):
+        for collection in ('inventories', 'projects', 'job_templates'):
+            assert not [obj for obj in fakes[name].data[collection].values()
+                        if not obj.get('pending_deletion')]
+
+    awx_controllers.print_report('cleanup', rows, 1.0)
+    report = capsys.readouterr().out
+    assert 'broken           FAILED' in report
+    assert '2 ok, 1 failed (broken)' in report
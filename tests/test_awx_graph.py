@@ -0,0 +1,70 @@
+"""TaskGraph: failures skip their dependents, and the timeline shows the critical path"""
+
+import contextlib
+import time
+
+from awx_graph import TaskGraph
+
+
+def sleeper(seconds, result='done'):
+    def task(_results):
+        time.sleep(seconds)
+        return result
+    return task
+
+
+def broken(_results):
+    raise KeyError('id')
+
+
+def test_failures_skip_dependents(capsys):
+    graph = TaskGraph()
+    graph.add('none', lambda results: None)
+    graph.add('raises', broken)
+    graph.add('independent', sleeper(0.01))
+    graph.add('after_none', sleeper(0), after=['none'])
+    graph.add('after_raises', sleeper(0), after=['raises'])
+    graph.add('chained', sleeper(0), after=['after_raises', 'independent'])
+
+    assert graph.run() is False
+
+    statuses = {name: timing['status'] for name, timing in graph.timings.items()}
+    assert statuses == {'none': 'failed', 'raises': 'failed', 'independent': 'ok',
+                        'after_none': 'skipped', 'after_raises': 'skipped',
+                        'chained': 'skipped'}
+    assert graph.results['independent'] == 'done'
+    assert "Task raises failed: KeyError: 'id'" in capsys.readouterr().out
+
+
+def test_results_reach_dependents():
+    graph = TaskGraph()
+    graph.add('first', sleeper(0, 41))
+    graph.add('second', lambda results: results['first'] + 1, after=['first'])
+
+    assert graph.run() is True
+    assert graph.results['second'] == 42
+
+
+def test_critical_path_timeline(capsys):
+    graph = TaskGraph()
+    graph.add('inventory', sleeper(0.05))
+    graph.add('hosts', sleeper(0.05), after=['inventory'])
+    graph.add('project', sleeper(0.3))
+    graph.add('template', sleeper(0.01), after=['hosts', 'project'])
+    phases = []
+
+    @contextlib.contextmanager
+    def phase(name):
+        phases.append(name)
+        yield
+
+    assert graph.run(phase=phase)
+
+    assert sorted(phases) == ['hosts', 'inventory', 'project', 'template']
+    assert graph.critical_path() == ['project', 'template']
+    # The branches overlapped
+    assert graph.seconds < 0.4
+    graph.print_timeline()
+    out = capsys.readouterr().out
+    assert "Critical path (*): project -> template" in out
+    assert [line[:2] for line in out.splitlines()[2:6]] == ['  ', '  ', '* ', '* ']
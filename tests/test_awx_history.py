@@ -0,0 +1,94 @@
+"""Service outcome history: ingest from the fake AWX, then query offline"""
+
+import pytest
+
+from awx_history import History, print_latency, print_rates
+from awx_metrics import percentile
+from awx_reconcile import reconcile
+
+
+@pytest.fixture(name='history')
+def fixture_history(tmp_path, fake, manager):
+    reconcile(manager)
+    store = History(str(tmp_path / 'history.db'), controller=fake.url)
+    yield store
+    store.close()
+
+
+def run_job(manager, service, state='started'):
+    """Launch the service template on every host and wait for it; return the job id"""
+    _, job_id = manager.jobs.launch(extra_vars={'service_name': service,
+                                                'service_state': state})
+    assert manager.waiter.wait('jobs', job_id, timeout=30) in ('successful', 'failed')
+    return job_id
+
+
+def test_ingest_stores_outcomes(fake, manager, history):
+    fake.failing = {('wslkali1', 'sshd')}
+    job_id = run_job(manager, 'sshd', 'restarted')
+
+    assert history.ingest(manager) == (1, 4)
+
+    rows = history.select("job, host, service, state, failed, active_state",
+                          tail=" ORDER BY host")
+    assert rows == [(job_id, 'argo_cd_mgt', 'sshd', 'restarted', 0, 'active'),
+                    (job_id, 'ubuntuAWX', 'sshd', 'restarted', 0, 'active'),
+                    (job_id, 'wslkali1', 'sshd', 'restarted', 1, 'failed'),
+                    (job_id, 'wslubuntu1', 'sshd', 'restarted', 0, 'active')]
+    assert [row[0] for row in history.select("host", failed_only=True)] == ['wslkali1']
+
+
+def test_ingest_resumes(manager, history):
+    first = run_job(manager, 'sshd')
+    assert history.ingest(manager) == (1, 4)
+    assert history.ingest(manager) == (0, 0)
+
+    second = run_job(manager, 'cron')
+
+    assert history.ingest(manager) == (1, 4)
+    assert history.has_job(first) and history.has_job(second)
+    assert history.summary()[:2] == (2, 8)
+
+
+def test_unsaved_events_wait(fake, manager, history):
+    job_id = run_job(manager, 'sshd')
+    with fake.lock:
+        fake.data['jobs'][job_id]['event_processing_finished'] = False
+
+    assert history.ingest(manager) == (0, 0)
+    assert not history.has_job(job_id)
+
+    with fake.lock:
+        fake.data['jobs'][job_id]['event_processing_finished'] = True
+    assert history.ingest(manager) == (1, 4)
+
+
+def test_queries_scoped(fake, manager, history, capsys):
+    fake.failing = {('wslubuntu1', 'cron')}
+    run_job(manager, 'sshd')
+    latest = run_job(manager, 'cron')
+    history.ingest(manager)
+
+    assert not history.select("host", template='Other Template')
+    assert {row[0] for row in history.select("job", last=1)} == {latest}
+    assert len(history.select("job", template='WSL Service Management')) == 8
+
+    rates = print_rates(history, 'host', template='WSL Service Management')
+    # Worst failure rate first
+    assert [row[0] for row in rates] == [
+        'wslubuntu1', 'argo_cd_mgt', 'ubuntuAWX', 'wslkali1']
+    assert rates[0][1:3] == (2, 1)
+    assert "50.0%" in capsys.readouterr().out
+
+    groups = print_latency(history, 'service', host='wslkali1')
+    assert sorted(groups) == [('cron',), ('sshd',)]
+    assert all(len(durations) == 1 for durations in groups.values())
+
+
+def test_percentile_nearest_rank():
+    values = [4.0, 1.0, 3.0, 2.0]
+
+    assert percentile(values, 0.5) == 2.0
+    assert percentile(values, 0.95) == 4.0
+    assert percentile(values, 0.0) == 1.0
+    assert percentile([], 0.5) == 0.0
@@ -0,0 +1,37 @@
+"""Metrics export: one Prometheus series per name and label set"""
+
+from awx_metrics import Metrics, endpoint_name, percentile
+
+
+def series(text):
+    return [line.rsplit(' ', 1)[0] for line in text.splitlines() if not line.startswith('#')]
+
+
+def test_prometheus_unique_series(manager):
+    metrics = Metrics()
+    manager.client.hooks.append(metrics)
+    # The same phase twice, as in two runs in one process
+    for _ in range(2):
+        manager.client.get('inventories/', params={'name': 'WSL Lab'})
+        metrics.on_phase('inventory', 0.5, 1, True)
+    manager.client.get('hosts/12/')
+    manager.client.get('hosts/13/')
+
+    text = metrics.prometheus_text()
+
+    assert len(series(text)) == len(set(series(text)))
+    assert 'awx_phase_duration_seconds_count{phase="inventory"} 2' in text
+    assert 'awx_phase_duration_seconds_sum{phase="inventory"} 1.000000' in text
+    assert 'awx_phase_requests{phase="inventory"} 2' in text
+    assert 'awx_requests_total{method="GET",endpoint="hosts/{id}/",status="404"} 2' in text
+
+
+def test_endpoint_names():
+    assert endpoint_name('https://awx/api/v2/groups/7/hosts/?page=2') == 'groups/{id}/hosts/'
+    assert endpoint_name('https://awx/api/v2/') == '/'
+
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3]
+    assert [percentile(values, f) for f in (0.0, 0.2, 0.5, 0.95, 1.0)] == [1, 1, 3, 5, 5]
+    assert percentile([], 0.5) == 0.0
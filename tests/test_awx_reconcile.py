@@ -0,0 +1,121 @@
+"""Reconcile plan and apply against the fake AWX"""
+
+import json
+
+import pytest
+
+from awx_inventory_manager import AWXInventoryManager
+from awx_reconcile import Reconciler, describe, load_desired_state
+
+INVENTORY = """\
+all:
+  children:
+    web:
+      hosts:
+        web1: {ansible_host: 10.0.0.1}
+        web2: {ansible_host: 10.0.0.2}
+    db:
+      hosts:
+        db1: {ansible_host: 10.0.0.3, ansible_port: 2222}
+      vars: {role: database}
+  vars: {ansible_user: awx}
+"""
+
+STATE = """\
+inventory: {name: Test Lab, organization: 1, source: hosts.yml}
+project: {name: Test Project, organization: 1, scm_type: git, scm_url: https://example.com/repo}
+job_template: {name: Test Template, playbook: site.yml, job_type: run}
+"""
+
+
+@pytest.fixture(name='state_file')
+def fixture_state_file(tmp_path):
+    (tmp_path / 'hosts.yml').write_text(INVENTORY, encoding='utf-8')
+    path = tmp_path / 'state.yml'
+    path.write_text(STATE, encoding='utf-8')
+    return str(path)
+
+
+def plan(manager, state_file):
+    reconciler = Reconciler(manager, load_desired_state(state_file))
+    return reconciler, reconciler.plan()
+
+
+def test_plan_from_empty(manager, state_file):
+    _, changes = plan(manager, state_file)
+
+    assert [describe(change) for change in changes] == [
+        'create inventory Test Lab', 'create group db', 'create group web',
+        'create host db1', 'create host web1', 'create host web2',
+        'associate db1 -> group db', 'associate web1 -> group web',
+        'associate web2 -> group web', 'create project Test Project',
+        'sync project Test Project', 'create job_template Test Template']
+
+
+def test_apply_converges(fake, manager, state_file):
+    reconciler, changes = plan(manager, state_file)
+
+    result = reconciler.apply(changes)
+
+    assert result == {'applied': len(changes), 'failed': {}}
+    inventory = next(iter(fake.data['inventories'].values()))
+    assert json.loads(inventory['variables']) == {'ansible_user': 'awx'}
+    template = next(iter(fake.data['job_templates'].values()))
+    assert template['inventory'] == inventory['id']
+    assert template['project'] == next(iter(fake.data['projects']))
+    assert plan(manager, state_file)[1] == []
+
+
+def test_drift_is_minimal(fake, manager, state_file):
+    reconciler, changes = plan(manager, state_file)
+    reconciler.apply(changes)
+    hosts = {host['name']: host for host in fake.data['hosts'].values()}
+    inventory_id = hosts['web1']['inventory']
+    manager.client.patch(f"hosts/{hosts['web1']['id']}/",
+                         json={'variables': json.dumps({'ansible_host': '10.9.9.9'})})
+    manager.client.post('hosts/', json={'name': 'stray', 'inventory': inventory_id})
+    web = next(group for group in fake.data['groups'].values() if group['name'] == 'web')
+    manager.client.post(f"groups/{web['id']}/hosts/", json={'id': hosts['db1']['id'],
+                                                           'disassociate': False})
+    manager.client.patch(f"job_templates/{next(iter(fake.data['job_templates']))}/",
+                         json={'playbook': 'other.yml'})
+
+    # A new run: the first manager remembers the objects it looked up
+    manager = AWXInventoryManager(base_url=fake.url, token=fake.token)
+    reconciler, changes = plan(manager, state_file)
+
+    assert sorted(describe(change) for change in changes) == [
+        'delete host stray', 'disassociate db1 -> group web',
+        'update host web1: variables', 'update job_template Test Template: playbook']
+    assert reconciler.apply(changes) == {'applied': 4, 'failed': {}}
+    manager = AWXInventoryManager(base_url=fake.url, token=fake.token)
+    assert plan(manager, state_file)[1] == []
+
+
+def test_failed_project_create(fake, manager, state_file):
+    # The job template needs the project's ID: it is skipped, not a KeyError
+    fake.errors[('POST', 'projects')] = [400]
+    reconciler, changes = plan(manager, state_file)
+
+    result = reconciler.apply(changes)
+
+    assert result['applied'] == len(changes) - 3
+    assert result['failed']['create project Test Project'].startswith('400')
+    assert result['failed'] == {
+        'create project Test Project': result['failed']['create project Test Project'],
+        'sync project Test Project': 'skipped: project Test Project was not created',
+        'create job_template Test Template': 'skipped: project Test Project was not created'}
+    assert not fake.data['job_templates']
+    assert len(fake.data['hosts']) == 3
+
+
+def test_failed_inventory_create(fake, manager, state_file):
+    fake.errors[('POST', 'inventories')] = [400]
+    reconciler, changes = plan(manager, state_file)
+
+    result = reconciler.apply(changes)
+
+    assert result['applied'] == 0
+    assert len(result['failed']) == len(changes)
+    assert result['failed']['create host web1'] == 'skipped: inventory Test Lab was not created'
+    assert not fake.data['projects']
@@ -0,0 +1,74 @@
+"""Setup through awx_setup.main, and the one sync policy it shares with reconcile"""
+
+from awx_inventory_manager import AWXInventoryManager
+from awx_reconcile import DEFAULT_STATE_FILE, load_yaml, reconcile
+from awx_setup import main, parse_args
+
+
+def state_project():
+    with open(DEFAULT_STATE_FILE, encoding='utf-8') as handle:
+        return load_yaml(handle)['project']
+
+
+def project(fake):
+    return next(iter(fake.data['projects'].values()))
+
+
+def plan(fake, **policy):
+    """Plan with a new manager (a later run) under the given sync policy override"""
+    later = AWXInventoryManager(base_url=fake.url, token=fake.token)
+    if policy:
+        later.set_sync_policy(state_project(), **policy)
+    return reconcile(later, plan_only=True)
+
+
+def test_setup_then_no_changes(fake, manager):
+    main(manager)
+
+    assert manager.sync_policy == 'revision'
+    assert project(fake)['scm_update_on_launch'] is False
+    assert plan(fake) == []
+
+
+def test_override_wins_everywhere(fake, manager):
+    manager.set_sync_policy(state_project(), policy='always', scm_clean=True)
+    main(manager)
+    assert project(fake)['scm_update_on_launch'] is True
+    assert project(fake)['scm_clean'] is True
+
+    # reconcile under the same override does not put the state file's fields back
+    assert plan(fake, policy='always', scm_clean=True) == []
+
+
+def test_project_follows_state(fake, manager):
+    main(manager)
+    manager.client.patch(f"projects/{project(fake)['id']}/",
+                         json={'scm_update_on_launch': True, 'scm_update_cache_timeout': 60})
+
+    # A new run without overrides takes the policy from the state file
+    rerun = AWXInventoryManager(base_url=fake.url, token=fake.token)
+    main(rerun)
+
+    assert project(fake)['scm_update_on_launch'] is False
+    assert project(fake)['scm_update_cache_timeout'] == 0
+    assert rerun.sync_policy == 'revision'
+    assert plan(fake) == []
+
+
+def test_policy_from_fields():
+    manager = AWXInventoryManager(base_url='http://127.0.0.1:1', token='unused')
+    for fields, policy in (({'scm_update_on_launch': True}, 'always'),
+                           ({'scm_update_on_launch': True, 'scm_update_cache_timeout': 60},
+                            'cache'),
+                           ({'scm_update_on_launch': False}, 'revision'), ({}, 'revision')):
+        manager.set_sync_policy(fields)
+        assert manager.sync_policy == policy
+    manager.set_sync_policy({'scm_update_on_launch': False}, cache_timeout=600, policy='cache')
+    assert manager.project_sync_fields() == {'scm_update_on_launch': True,
+                                             'scm_update_cache_timeout': 600, 'scm_clean': False}
+
+
+def test_sync_project_name():
+    assert parse_args(['--sync-project']).sync_project == "WSL Automation"
+    assert parse_args(['--sync-project', 'Other']).sync_project == "Other"
+    assert parse_args([]).sync_policy is None
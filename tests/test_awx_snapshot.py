@@ -0,0 +1,112 @@
+"""Snapshot refresh against the fake AWX: full first, then only what changed"""
+
+import pytest
+
+from awx_snapshot import KINDS, Snapshot, refresh_snapshot
+
+
+@pytest.fixture(name='lab')
+def fixture_lab(fake):
+    """An inventory with two groups and three hosts, web1 and web2 in web"""
+    with fake.lock:
+        inventory = fake.add('inventories', {'name': 'Lab', 'organization': 1})
+        web = fake.add('groups', {'name': 'web', 'inventory': inventory['id']})
+        fake.add('groups', {'name': 'db', 'inventory': inventory['id']})
+        hosts = {name: fake.add('hosts', {'name': name, 'inventory': inventory['id']})
+                 for name in ('web1', 'web2', 'db1')}
+        fake.members[web['id']] = {hosts['web1']['id'], hosts['web2']['id']}
+    return {'inventory': inventory, 'web': web, 'hosts': hosts}
+
+
+@pytest.fixture(name='snapshot')
+def fixture_snapshot(tmp_path, fake, manager):
+    snap = Snapshot(str(tmp_path / 'snapshot.db'), controller=fake.url)
+    manager.snapshot = snap
+    yield snap
+    snap.close()
+
+
+def refresh(fake, manager):
+    """Refresh the manager's snapshot; return (changed counts, requests it took)"""
+    before = fake.request_count
+    changed = refresh_snapshot(manager)
+    return changed, fake.request_count - before
+
+
+def test_first_refresh_lists_all(fake, manager, snapshot, lab):
+    changed, _ = refresh(fake, manager)
+
+    assert changed == {'inventories': 1, 'groups': 2, 'hosts': 3, 'projects': 0,
+                       'job_templates': 0, 'members': 2}
+    assert snapshot.find('hosts', 'db1')['id'] == lab['hosts']['db1']['id']
+    assert sorted(snapshot.index('groups', inventory=lab['inventory']['id'])) == ['db', 'web']
+    assert [host['name'] for host in snapshot.members(lab['web']['id'])] == ['web1', 'web2']
+    assert snapshot.refreshed() is not None
+
+
+def test_unchanged_head_requests(fake, manager, snapshot, lab):
+    refresh(fake, manager)
+
+    changed, requests = refresh(fake, manager)
+
+    assert set(changed.values()) == {0}
+    assert requests == len(KINDS)
+    assert snapshot.find('groups', 'web')['id'] == lab['web']['id']
+
+
+def test_changed_host_fetched_alone(fake, manager, snapshot, lab):
+    refresh(fake, manager)
+    db1 = lab['hosts']['db1']
+    manager.client.patch(f"hosts/{db1['id']}/", json={'variables': 'role: db'})
+
+    changed, requests = refresh(fake, manager)
+
+    assert changed == {'inventories': 0, 'groups': 0, 'hosts': 1, 'projects': 0,
+                       'job_templates': 0, 'members': 0}
+    # A head request per kind and one page of changed hosts
+    assert requests == len(KINDS) + 1
+    assert snapshot.find('hosts', 'db1')['variables'] == 'role: db'
+
+
+def test_new_host_rereads_groups(fake, manager, snapshot, lab):
+    refresh(fake, manager)
+    inventory_id = lab['inventory']['id']
+    web3 = manager.client.post('hosts/', json={'name': 'web3', 'inventory': inventory_id}).json()
+    manager.client.post(f"groups/{lab['web']['id']}/hosts/", json={'id': web3['id']})
+
+    changed, _ = refresh(fake, manager)
+
+    assert changed['hosts'] == 1
+    # Both groups of web3's inventory may have gained it
+    assert changed['members'] == 2
+    assert [host['name'] for host in snapshot.members(lab['web']['id'])] == [
+        'web1', 'web2', 'web3']
+
+
+def test_delete_relists_the_kind(fake, manager, snapshot, lab):
+    refresh(fake, manager)
+    web2 = lab['hosts']['web2']
+    manager.client.delete(f"hosts/{web2['id']}/")
+
+    changed, _ = refresh(fake, manager)
+
+    # The count no longer matches, so every remaining host is listed again
+    assert changed['hosts'] == 2
+    assert snapshot.find('hosts', 'web2') is None
+    assert [host['name'] for host in snapshot.members(lab['web']['id'])] == ['web1']
+
+
+def test_offline_lookups_stay_local(fake, manager, snapshot, lab):
+    refresh(fake, manager)
+    fresh = Snapshot(snapshot.path, controller=fake.url)
+    manager.snapshot = fresh
+    manager.offline = True
+    before = fake.request_count
+
+    try:
+        assert fresh.ready(manager, 'hosts', {'inventory': 1}) is fresh
+        assert fresh.find('hosts', 'web1')['id'] == lab['hosts']['web1']['id']
+        assert fresh.ready(manager, 'hosts', {'name': 'web1'}) is None
+    finally:
+        fresh.close()
+    assert fake.request_count == before
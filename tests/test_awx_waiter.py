@@ -0,0 +1,121 @@
+"""UnitWaiter fed by a local event stream instead of the AWX websocket"""
+
+import awx_waiter
+from awx_waiter import UnitWaiter
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class StubClient:
+    """Answers unit polls from a dict of (kind, id) -> status, counting requests"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.requests = 0
+
+    def get(self, path, params=None):
+        self.requests += 1
+        kind, _, unit_id = path.strip('/').partition('/')
+        if unit_id:
+            unit = (kind, int(unit_id))
+            return StubResponse({'id': unit[1], 'status': self.statuses[unit]})
+        ids = [int(i) for i in params['id__in'].split(',')]
+        return StubResponse({'results': [{'id': i, 'status': self.statuses[(kind, i)]}
+                                         for i in ids]})
+
+
+class StubEvents:
+    """Same messages() interface as WebsocketEvents, yielding a fixed list"""
+
+    def __init__(self, messages=(), error=None, on_subscribe=None):
+        self.queued = list(messages)
+        self.error = error
+        self.on_subscribe = on_subscribe
+        self.closed = False
+
+    def messages(self, idle_timeout=1.0):
+        del idle_timeout
+        if self.error:
+            raise self.error
+        if self.on_subscribe:
+            self.on_subscribe()
+        try:
+            yield from self.queued
+            while True:
+                yield None
+        finally:
+            self.closed = True
+
+
+def event(kind, unit_id, status):
+    return {'type': kind, 'unified_job_id': unit_id, 'status': status}
+
+
+def test_events_finish_units():
+    client = StubClient({('jobs', 7): 'running', ('project_updates', 3): 'pending'})
+    events = StubEvents([event('job', 7, 'running'), None, event('job', 99, 'failed'),
+                         event('project_update', 3, 'running'), event('job', 7, 'successful'),
+                         event('project_update', 3, 'failed')])
+    seen = []
+    waiter = UnitWaiter(client, events=events)
+
+    result = waiter.wait_all([('jobs', 7), ('project_updates', 3)], timeout=5,
+                             on_status=lambda kind, unit_id, status: seen.append(
+                                 (kind, unit_id, status)))
+
+    assert result == {('jobs', 7): 'successful', ('project_updates', 3): 'failed'}
+    # The first poll and the one once subscribed, then events only; unit 99 is not
+    # waited on, repeated statuses are not reported
+    assert client.requests == 4
+    assert seen == [('jobs', 7, 'running'), ('project_updates', 3, 'pending'),
+                    ('project_updates', 3, 'running'), ('jobs', 7, 'successful'),
+                    ('project_updates', 3, 'failed')]
+    assert events.closed
+
+
+def test_done_units_skip_stream():
+    client = StubClient({('jobs', 7): 'successful'})
+    events = StubEvents(error=AssertionError("stream opened"))
+
+    assert UnitWaiter(client, events=events).wait('jobs', 7) == 'successful'
+
+
+def test_finished_before_subscribe():
+    # The job finishes after the first poll but before the stream is subscribed
+    client = StubClient({('jobs', 7): 'running'})
+    events = StubEvents(on_subscribe=lambda: client.statuses.update({('jobs', 7): 'successful'}))
+
+    assert UnitWaiter(client, events=events).wait('jobs', 7, timeout=2) == 'successful'
+    assert events.closed
+
+
+def test_quiet_stream_times_out():
+    client = StubClient({('jobs', 7): 'running'})
+    events = StubEvents()
+
+    assert UnitWaiter(client, events=events, min_interval=0.01).wait('jobs', 7,
+                                                                     timeout=0.2) is None
+    assert events.closed
+
+
+def test_broken_stream_polls(capsys, monkeypatch):
+    client = StubClient({('jobs', 7): 'running'})
+
+    def finish(seconds):
+        del seconds
+        client.statuses[('jobs', 7)] = 'successful'
+    monkeypatch.setattr(awx_waiter.time, 'sleep', finish)
+    waiter = UnitWaiter(client, events=StubEvents(error=OSError("connection refused")))
+
+    assert waiter.wait('jobs', 7, timeout=5) == 'successful'
+    assert client.requests == 2
+    assert "falling back to polling" in capsys.readouterr().out
@@ -0,0 +1,85 @@
+"""The wsl_inventory plugin through ansible-inventory, from the file and from the fake AWX"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from awx_reconcile import REPO_ROOT, reconcile
+
+pytestmark = pytest.mark.skipif(not shutil.which('ansible-inventory'),
+                                reason="ansible-inventory is not installed")
+
+PLUGIN = 'dji_ansible.dji_administration.wsl_inventory'
+
+
+@pytest.fixture(name='collections')
+def fixture_collections(tmp_path):
+    """A collections path holding this repo's collection"""
+    namespace = tmp_path / 'collections' / 'ansible_collections' / 'dji_ansible'
+    namespace.mkdir(parents=True)
+    os.symlink(os.path.join(REPO_ROOT, 'dji_ansible', 'dji_administration'),
+               namespace / 'dji_administration')
+    return str(tmp_path / 'collections')
+
+
+def inventory(collections, config, **env):
+    """Run ansible-inventory --list on a config file and return the parsed output"""
+    env = {**os.environ, 'ANSIBLE_COLLECTIONS_PATH': collections,
+           'ANSIBLE_INVENTORY_ENABLED': PLUGIN, **env}
+    output = subprocess.run(['ansible-inventory', '-i', str(config), '--list'], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def write_config(tmp_path, name, **options):
+    config = tmp_path / name
+    config.write_text(json.dumps({'plugin': PLUGIN, **options}), encoding='utf-8')
+    return config
+
+
+def test_file_source(tmp_path, collections):
+    source = os.path.join(REPO_ROOT, 'inventory', 'wsl_instances.yml')
+    config = write_config(tmp_path, 'lab.wsl_inventory.yml', inventory_file=source)
+
+    data = inventory(collections, config)
+
+    assert sorted(data['all_servers']['hosts']) == ['argo_cd_mgt', 'ubuntuAWX', 'wslkali1',
+                                                     'wslubuntu1']
+    assert data['_meta']['hostvars']['wslkali1']['ansible_port'] == 2224
+
+
+def test_edited_file_skips_cache(tmp_path, collections):
+    source = tmp_path / 'hosts.yml'
+    source.write_text("all:\n  hosts:\n    one: {ansible_port: 1}\n", encoding='utf-8')
+    config = write_config(tmp_path, 'lab.wsl_inventory.yml', inventory_file='hosts.yml',
+                          cache=True, cache_plugin='ansible.builtin.jsonfile',
+                          cache_connection=str(tmp_path / 'cache'), cache_timeout=3600)
+    assert sorted(inventory(collections, config)['_meta']['hostvars']) == ['one']
+
+    source.write_text("all:\n  hosts:\n    one: {ansible_port: 1}\n    two: {ansible_port: 2}\n",
+                      encoding='utf-8')
+    os.utime(source, (0, 0))
+
+    assert sorted(inventory(collections, config)['_meta']['hostvars']) == ['one', 'two']
+
+
+def test_awx_source_cached(tmp_path, collections, fake, manager):
+    reconcile(manager)
+    config = write_config(tmp_path, 'awx.wsl_inventory.yml', source='awx', cache=True,
+                          cache_plugin='ansible.builtin.jsonfile',
+                          cache_connection=str(tmp_path / 'cache'), cache_timeout=600)
+    env = {'AWX_HOST': fake.url, 'AWX_TOKEN': fake.token}
+
+    before = fake.request_count
+    data = inventory(collections, config, **env)
+    # The name lookup and the script/ export
+    assert fake.request_count - before == 2
+    assert len(data['all_servers']['hosts']) == 4
+    assert data['_meta']['hostvars']['wslubuntu1']['ansible_port'] == 2223
+
+    before = fake.request_count
+    assert inventory(collections, config, **env) == data
+    assert fake.request_count == before